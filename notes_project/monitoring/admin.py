@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from monitoring.models import RequestProfile, SlowQuery
+from monitoring.profiling import PROFILE_HEADER, PROFILE_PARAM, profile_token
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Profiles can be viewed, downloaded and deleted, but not changed."""
+
+    list_display = (
+        "created",
+        "method",
+        "url",
+        "user",
+        "status_code",
+        "total_time",
+        "queries",
+        "download",
+    )
+    list_filter = ("method", "status_code", "profiler")
+    list_select_related = ("user",)
+    search_fields = ("url",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Total time", ordering="duration")
+    def total_time(self, obj):
+        return f"{obj.duration * 1000:.1f} ms"
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        url = reverse(
+            f"{self.admin_site.name}:monitoring_requestprofile_download",
+            args=[obj.pk],
+        )
+        return format_html('<a href="{}">{}</a>', url, obj.filename)
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:object_id>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="monitoring_requestprofile_download",
+            ),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request, object_id):
+        profile = self.get_object(request, object_id)
+        if (
+            profile is None
+            or not self.has_view_permission(request, profile)
+            or not profile.path.exists()
+        ):
+            raise Http404("No profile found")
+        return FileResponse(
+            profile.path.open("rb"),
+            as_attachment=True,
+            filename=profile.filename,
+        )
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            "profile_param": PROFILE_PARAM,
+            "profile_header": PROFILE_HEADER,
+            "profile_token": profile_token(request.user),
+            "profile_token_max_age": (
+                settings.MONITORING_PROFILE_TOKEN_MAX_AGE // 60
+            ),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Slow queries can be viewed and deleted, but not changed."""
+
+    list_display = (
+        "normalized_sql",
+        "calls",
+        "total_time",
+        "mean_time",
+        "max_time",
+        "view",
+        "last_seen",
+    )
+    list_filter = ("database", "view")
+    search_fields = ("normalized_sql",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Total time", ordering="total_duration")
+    def total_time(self, obj):
+        return f"{obj.total_duration * 1000:.0f} ms"
+
+    @admin.display(description="Mean time")
+    def mean_time(self, obj):
+        return f"{obj.mean_duration * 1000:.0f} ms"
+
+    @admin.display(description="Longest time", ordering="max_duration")
+    def max_time(self, obj):
+        return f"{obj.max_duration * 1000:.0f} ms"
@@ -0,0 +1,76 @@
+import textwrap
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from monitoring.models import SlowQuery
+
+ORDERINGS = {
+    "total": "-total_duration",
+    "max": "-max_duration",
+    "calls": "-calls",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "List the slow queries recorded by the monitoring middleware, "
+        "grouped by normalized SQL, with the slowest in total first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Number of queries to list.",
+        )
+        parser.add_argument(
+            "--order",
+            choices=ORDERINGS,
+            default="total",
+            help="Sort by total time, longest time or number of calls.",
+        )
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Show the latest SQL, parameters and query plan of each.",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the recorded queries instead of listing them.",
+        )
+
+    def handle(self, *args, **options):
+        queries = SlowQuery.objects.using(DEFAULT_DB_ALIAS)
+        if options["clear"]:
+            count, _ = queries.all().delete()
+            self.stdout.write(f"Deleted {count} slow queries.")
+            return
+        if options["limit"] < 1:
+            raise CommandError("--limit must be at least 1.")
+
+        if not queries.exists():
+            self.stdout.write("No slow queries have been recorded.")
+            return
+        queries = queries.order_by(ORDERINGS[options["order"]])
+        for rank, query in enumerate(queries[: options["limit"]], start=1):
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{rank}. {query.total_duration * 1000:.0f} ms total, "
+                    f"{query.calls} calls, "
+                    f"{query.mean_duration * 1000:.0f} ms mean, "
+                    f"{query.max_duration * 1000:.0f} ms max"
+                )
+            )
+            self.stdout.write(f"   {query.normalized_sql}")
+            self.stdout.write(
+                f"   Latest: {query.view} at {query.origin or 'unknown'} "
+                f"on {query.database}, {query.last_seen:%Y-%m-%d %H:%M:%S}"
+            )
+            if options["plans"]:
+                self.stdout.write(f"   SQL: {query.sql}")
+                self.stdout.write(f"   Parameters: {query.params}")
+                if query.plan:
+                    self.stdout.write(textwrap.indent(query.plan, "   "))
+            self.stdout.write("")
@@ -0,0 +1,185 @@
+"""In-process request metrics, exported in the Prometheus text format.
+
+Each process keeps its own metrics, so with several worker processes every
+one of them must be scraped, or the workers run with a single process.
+"""
+
+import threading
+from bisect import bisect_left
+
+DURATION_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        + "}"
+    )
+
+
+def _format_number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = (
+                self._values.get(label_values, 0) + amount
+            )
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        # Label values -> [count per bucket, with +Inf last], sum
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                label_values, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[index] += 1
+            self._values[label_values] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total))
+                for labels, (counts, total) in self._values.items()
+            )
+        for label_values, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _format_labels(
+                        self.labels,
+                        label_values,
+                        [("le", _format_number(bound))],
+                    ),
+                    cumulative,
+                )
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self.metrics:
+            with metric._lock:
+                metric._values.clear()
+
+
+registry = Registry()
+
+REQUEST_LABELS = ("view", "method")
+
+requests_total = registry.register(
+    Counter(
+        "notes_requests_total",
+        "Requests handled, by view, method and status code.",
+        [*REQUEST_LABELS, "status"],
+    )
+)
+request_duration = registry.register(
+    Histogram(
+        "notes_request_duration_seconds",
+        "Total time taken to handle requests.",
+        DURATION_BUCKETS,
+        REQUEST_LABELS,
+    )
+)
+request_db_duration = registry.register(
+    Histogram(
+        "notes_request_db_duration_seconds",
+        "Time spent running SQL queries per request.",
+        DURATION_BUCKETS,
+        REQUEST_LABELS,
+    )
+)
+request_template_duration = registry.register(
+    Histogram(
+        "notes_request_template_duration_seconds",
+        "Time spent rendering templates per request, excluding SQL.",
+        DURATION_BUCKETS,
+        REQUEST_LABELS,
+    )
+)
+request_queries = registry.register(
+    Histogram(
+        "notes_request_queries",
+        "SQL queries run per request.",
+        QUERY_BUCKETS,
+        REQUEST_LABELS,
+    )
+)
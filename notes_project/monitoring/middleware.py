@@ -0,0 +1,174 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from monitoring import metrics
+from monitoring.slow_queries import record_slow_queries, sample
+
+
+class RequestTiming:
+    """Time spent on SQL, templates and everything else in one request.
+
+    Queries that take at least slow_query_ms are kept in slow_queries.
+    """
+
+    def __init__(self, slow_query_ms=None):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.total = 0.0
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = []
+        self.sampling = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Used as a database execute wrapper
+        if self.sampling:
+            # The query plan of a slow query
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.db += duration
+            self.queries += 1
+
+        if (
+            self.slow_query_ms is not None
+            and duration * 1000 >= self.slow_query_ms
+            and not many
+        ):
+            self.sampling = True
+            try:
+                self.slow_queries.append(
+                    sample(context["connection"], sql, params, duration)
+                )
+            finally:
+                self.sampling = False
+        return result
+
+    @property
+    def app(self) -> float:
+        return max(self.total - self.db - self.template, 0.0)
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+                f"tpl;dur={self.template * 1000:.1f}",
+                f"app;dur={self.app * 1000:.1f}",
+                f"total;dur={self.total * 1000:.1f}",
+            ]
+        )
+
+
+class RequestMetricsMiddleware:
+    """Measure each request's SQL, template and total time.
+
+    The times are sent in a Server-Timing header, which browsers show in
+    their developer tools, and added to the histograms served at /metrics,
+    by URL name. Slow queries are saved, see monitoring.slow_queries. Put
+    this first, so it covers the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.MONITORING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = request.timing = RequestTiming(
+            settings.MONITORING_SLOW_QUERY_MS
+        )
+        started = time.perf_counter()
+        with self.wrap_connections(timing):
+            response = self.get_response(request)
+        timing.total = time.perf_counter() - started
+
+        if timing.slow_queries:
+            record_slow_queries(timing.slow_queries, self.view_name(request))
+        return self.process_response(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = request.timing = RequestTiming(
+            settings.MONITORING_SLOW_QUERY_MS
+        )
+        started = time.perf_counter()
+        # Connections belong to a thread, so the queries are timed on the
+        # connections of the thread that runs the request's sync code
+        stack = await sync_to_async(self.wrap_connections)(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        timing.total = time.perf_counter() - started
+
+        if timing.slow_queries:
+            await sync_to_async(record_slow_queries)(
+                timing.slow_queries, self.view_name(request)
+            )
+        return self.process_response(request, response, timing)
+
+    @staticmethod
+    def wrap_connections(timing) -> ExitStack:
+        """Time the queries run on this thread's connections until the
+        returned stack is closed.
+        """
+
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timing))
+        return stack
+
+    def process_response(self, request, response, timing):
+        self.record(request, response, timing)
+        if settings.MONITORING_SERVER_TIMING:
+            response.headers["Server-Timing"] = timing.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        timing = request.timing
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            db_started = timing.db
+            try:
+                return render()
+            finally:
+                # Queries run while rendering count as SQL time
+                timing.template += (
+                    time.perf_counter() - started - (timing.db - db_started)
+                )
+
+        response.render = timed_render
+        return response
+
+    def record(self, request, response, timing):
+        labels = (self.view_name(request), request.method)
+        metrics.requests_total.inc(*labels, str(response.status_code))
+        metrics.request_duration.observe(timing.total, *labels)
+        metrics.request_db_duration.observe(timing.db, *labels)
+        metrics.request_template_duration.observe(timing.template, *labels)
+        metrics.request_queries.observe(timing.queries, *labels)
+
+    @staticmethod
+    def view_name(request) -> str:
+        match = request.resolver_match
+        return match.view_name if match else "unmatched"
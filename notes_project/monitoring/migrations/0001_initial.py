@@ -0,0 +1,74 @@
+# Generated by Django 4.2.9 on 2026-10-17 08:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Created"
+                    ),
+                ),
+                (
+                    "method",
+                    models.CharField(max_length=10, verbose_name="Method"),
+                ),
+                ("url", models.CharField(max_length=2048, verbose_name="URL")),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(verbose_name="Status"),
+                ),
+                ("duration", models.FloatField(verbose_name="Total time (s)")),
+                (
+                    "queries",
+                    models.PositiveIntegerField(
+                        null=True, verbose_name="Queries"
+                    ),
+                ),
+                (
+                    "profiler",
+                    models.CharField(max_length=20, verbose_name="Profiler"),
+                ),
+                (
+                    "filename",
+                    models.CharField(max_length=255, verbose_name="File"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="request_profiles",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Request profile",
+                "ordering": ("-created", "-id"),
+            },
+        ),
+    ]
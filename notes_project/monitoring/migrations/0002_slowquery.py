@@ -0,0 +1,76 @@
+# Generated by Django 4.2.9 on 2026-10-17 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("monitoring", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        max_length=40, unique=True, verbose_name="Fingerprint"
+                    ),
+                ),
+                (
+                    "normalized_sql",
+                    models.TextField(verbose_name="Normalized SQL"),
+                ),
+                ("calls", models.PositiveIntegerField(verbose_name="Calls")),
+                (
+                    "total_duration",
+                    models.FloatField(verbose_name="Total time (s)"),
+                ),
+                (
+                    "max_duration",
+                    models.FloatField(verbose_name="Longest time (s)"),
+                ),
+                (
+                    "first_seen",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="First seen"
+                    ),
+                ),
+                ("last_seen", models.DateTimeField(verbose_name="Last seen")),
+                (
+                    "database",
+                    models.CharField(max_length=100, verbose_name="Database"),
+                ),
+                ("sql", models.TextField(verbose_name="Latest SQL")),
+                ("params", models.TextField(verbose_name="Latest parameters")),
+                (
+                    "view",
+                    models.CharField(
+                        max_length=200, verbose_name="Latest view"
+                    ),
+                ),
+                (
+                    "origin",
+                    models.CharField(
+                        max_length=500, verbose_name="Latest origin"
+                    ),
+                ),
+                ("plan", models.TextField(verbose_name="Latest query plan")),
+            ],
+            options={
+                "verbose_name": "Slow query",
+                "verbose_name_plural": "Slow queries",
+                "ordering": ("-total_duration",),
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """A profiled request. See monitoring.profiling."""
+
+    created = models.DateTimeField("Created", auto_now_add=True)
+    method = models.CharField("Method", max_length=10)
+    url = models.CharField("URL", max_length=2048)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="request_profiles",
+        verbose_name="User",
+    )
+    status_code = models.PositiveSmallIntegerField("Status")
+    duration = models.FloatField("Total time (s)")
+    queries = models.PositiveIntegerField("Queries", null=True)
+    profiler = models.CharField("Profiler", max_length=20)
+    filename = models.CharField("File", max_length=255)
+
+    class Meta:
+        ordering = ("-created", "-id")
+        verbose_name = "Request profile"
+
+    def __str__(self):
+        return f"{self.method} {self.url}"
+
+    @property
+    def path(self) -> Path:
+        return Path(settings.MONITORING_PROFILE_DIR) / self.filename
+
+
+class SlowQuery(models.Model):
+    """Queries with the same normalized SQL that ran slowly, with the latest
+    example. See monitoring.slow_queries.
+    """
+
+    fingerprint = models.CharField("Fingerprint", max_length=40, unique=True)
+    normalized_sql = models.TextField("Normalized SQL")
+    calls = models.PositiveIntegerField("Calls")
+    total_duration = models.FloatField("Total time (s)")
+    max_duration = models.FloatField("Longest time (s)")
+    first_seen = models.DateTimeField("First seen", auto_now_add=True)
+    last_seen = models.DateTimeField("Last seen")
+    database = models.CharField("Database", max_length=100)
+    sql = models.TextField("Latest SQL")
+    params = models.TextField("Latest parameters")
+    view = models.CharField("Latest view", max_length=200)
+    origin = models.CharField("Latest origin", max_length=500)
+    plan = models.TextField("Latest query plan")
+
+    class Meta:
+        ordering = ("-total_duration",)
+        verbose_name = "Slow query"
+        verbose_name_plural = "Slow queries"
+
+    def __str__(self):
+        return self.normalized_sql[:100]
+
+    @property
+    def mean_duration(self) -> float:
+        return self.total_duration / self.calls
@@ -0,0 +1,236 @@
+"""Profile single requests on demand.
+
+Staff turn profiling on for one request by sending the token from
+profile_token() in an X-Profile header or a "profile" query parameter. The
+token is signed with the user's id and expires after
+MONITORING_PROFILE_TOKEN_MAX_AGE seconds, so a shared link can't be used to
+profile someone else's requests.
+
+Profiles are written to MONITORING_PROFILE_DIR and listed in the admin, which
+keeps the newest MONITORING_PROFILE_KEEP. The "cprofile" profiler writes
+pstats files, for snakeviz, flameprof or the pstats module. The "sampling"
+profiler records the request thread's stack every
+MONITORING_PROFILE_INTERVAL seconds and writes collapsed stacks, which
+flamegraph.pl and speedscope read. It slows the request down less, but
+misses short calls.
+
+Only one thread is profiled: the one that runs the request's sync code, the
+views and queries. Code that runs in the event loop under ASGI, like async
+views, isn't profiled, and neither are async views under WSGI, which run in
+a thread of their own.
+"""
+
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from uuid import uuid4
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from monitoring.models import RequestProfile
+
+PROFILE_PARAM = "profile"
+PROFILE_HEADER = "X-Profile"
+
+
+def _signer():
+    return signing.TimestampSigner(salt="monitoring.profiling")
+
+
+def profile_token(user) -> str:
+    """Return a token that lets a staff user profile their own requests."""
+
+    return _signer().sign(str(user.pk))
+
+
+def check_token(token: str, user) -> bool:
+    if not (user.is_authenticated and user.is_staff):
+        return False
+    try:
+        user_id = _signer().unsign(
+            token, max_age=settings.MONITORING_PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return user_id == str(user.pk)
+
+
+class CallProfiler:
+    """Profile every function call with cProfile."""
+
+    suffix = ".prof"
+
+    def __enter__(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """Sample the current thread's stack from a background thread."""
+
+    suffix = ".collapsed"
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.sampler = threading.Thread(target=self.run, daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.sampler.join()
+
+    def run(self):
+        interval = settings.MONITORING_PROFILE_INTERVAL
+        while not self.stopped.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:"
+                    f"{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.items():
+                file.write(f"{stack} {count}\n")
+
+
+PROFILERS = {"cprofile": CallProfiler, "sampling": StackSampler}
+
+
+class ProfiledRequest:
+    """A profiler running on the current thread for one request."""
+
+    def __init__(self, request):
+        self.request = request
+        # Set by RequestMetricsMiddleware
+        self.timing = getattr(request, "timing", None)
+        self.queries = self.timing.queries if self.timing else None
+        self.profiler = PROFILERS[settings.MONITORING_PROFILER]()
+        self.started = time.perf_counter()
+        self.profiler.__enter__()
+
+    def stop(self):
+        self.profiler.__exit__(None, None, None)
+        self.duration = time.perf_counter() - self.started
+        if self.timing:
+            self.queries = self.timing.queries - self.queries
+
+    def save(self, response):
+        save_profile(
+            self.request, response, self.profiler, self.duration, self.queries
+        )
+
+
+class RequestProfilingMiddleware:
+    """Profile requests that carry a valid profiling token.
+
+    Put this after the authentication middleware. Other requests only pay
+    for looking for the token.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.MONITORING_PROFILER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.get_token(request)
+        if not token or not check_token(token, request.user):
+            return self.get_response(request)
+
+        profiled = ProfiledRequest(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiled.stop()
+        profiled.save(response)
+        return response
+
+    async def __acall__(self, request):
+        token = self.get_token(request)
+        # The user is loaded from the database
+        if not token or not await sync_to_async(check_token)(
+            token, request.user
+        ):
+            return await self.get_response(request)
+
+        # Profilers follow one thread, so the profile is of the thread that
+        # runs the request's sync code
+        profiled = await sync_to_async(ProfiledRequest)(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(profiled.stop)()
+        await sync_to_async(profiled.save)(response)
+        return response
+
+    @staticmethod
+    def get_token(request):
+        return request.headers.get(PROFILE_HEADER) or request.GET.get(
+            PROFILE_PARAM
+        )
+
+
+def save_profile(request, response, profiler, duration, queries):
+    """Write a profile, record it and remove the oldest ones."""
+
+    directory = Path(settings.MONITORING_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    filename = (
+        f"{timezone.now():%Y%m%d-%H%M%S}-{uuid4().hex[:8]}{profiler.suffix}"
+    )
+    profiler.dump(directory / filename)
+
+    params = request.GET.copy()
+    params.pop(PROFILE_PARAM, None)
+    url = request.path + (f"?{params.urlencode()}" if params else "")
+    RequestProfile.objects.create(
+        method=request.method,
+        url=url[: RequestProfile._meta.get_field("url").max_length],
+        user=request.user,
+        status_code=response.status_code,
+        duration=duration,
+        queries=queries,
+        profiler=settings.MONITORING_PROFILER,
+        filename=filename,
+    )
+
+    keep = settings.MONITORING_PROFILE_KEEP
+    stale = RequestProfile.objects.values_list("pk", flat=True)[keep:]
+    # Deleting the rows deletes their files, see monitoring.signals
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
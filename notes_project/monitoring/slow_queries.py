@@ -0,0 +1,135 @@
+"""Record queries slower than MONITORING_SLOW_QUERY_MS.
+
+RequestMetricsMiddleware times every query. Slow ones are kept with their
+SQL, parameters, the line of project code that ran them and, on SQLite,
+their EXPLAIN QUERY PLAN, and saved to the SlowQuery table at the end of the
+request. Queries that differ only in their literals and parameters are
+grouped together, keeping totals and the latest example.
+"""
+
+import hashlib
+import re
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    IntegrityError,
+    transaction,
+)
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from monitoring.models import SlowQuery
+
+NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    # IN lists of any length
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+MAX_PARAMS_LENGTH = 2000
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literals and parameters with "?" and IN lists with "(...)"."""
+
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def find_origin() -> str:
+    """Return the innermost line of project code in the current stack."""
+
+    base = str(settings.BASE_DIR)
+    monitoring = str(Path(__file__).parent)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(base) and not frame.filename.startswith(
+            monitoring
+        ):
+            path = Path(frame.filename).relative_to(base)
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return ""
+
+
+def explain(connection, sql: str, params) -> str:
+    """Return SQLite's query plan for a query, indented like the sqlite3
+    shell shows it, or "" on other databases.
+    """
+
+    if connection.vendor != "sqlite":
+        return ""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return ""
+
+    depths = {}
+    lines = []
+    for node, parent, _, detail in rows:
+        depths[node] = depths.get(parent, -1) + 1
+        lines.append(f"{'  ' * depths[node]}{detail}")
+    return "\n".join(lines)
+
+
+def sample(connection, sql: str, params, duration: float) -> dict:
+    """Describe a slow query, while the code that ran it is on the stack."""
+
+    return {
+        "database": connection.alias,
+        "sql": sql,
+        "params": repr(params)[:MAX_PARAMS_LENGTH],
+        "duration": duration,
+        "origin": find_origin(),
+        "plan": explain(connection, sql, params),
+    }
+
+
+def record_slow_queries(samples, view: str):
+    """Add a request's slow queries to the SlowQuery table."""
+
+    now = timezone.now()
+    for query in samples:
+        duration = query.pop("duration")
+        normalized = normalize_sql(query["sql"])
+        key = fingerprint(normalized)
+        latest = {**query, "view": view, "last_seen": now}
+        if _add_call(key, duration, latest):
+            continue
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                SlowQuery.objects.using(DEFAULT_DB_ALIAS).create(
+                    fingerprint=key,
+                    normalized_sql=normalized,
+                    calls=1,
+                    total_duration=duration,
+                    max_duration=duration,
+                    **latest,
+                )
+        except IntegrityError:
+            # Another request recorded it first
+            _add_call(key, duration, latest)
+
+
+def _add_call(key: str, duration: float, latest: dict) -> int:
+    return (
+        SlowQuery.objects.using(DEFAULT_DB_ALIAS)
+        .filter(fingerprint=key)
+        .update(
+            calls=F("calls") + 1,
+            total_duration=F("total_duration") + duration,
+            max_duration=Greatest("max_duration", duration),
+            **latest,
+        )
+    )
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+from monitoring.metrics import Counter, Histogram, Registry
+
+
+class MetricsTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_histograms_are_rendered_with_cumulative_buckets(self):
+        histogram = self.registry.register(
+            Histogram("duration", "How long.", [0.1, 1], ["view"])
+        )
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value, "notes")
+        assert self.registry.render().splitlines() == [
+            "# HELP duration How long.",
+            "# TYPE duration histogram",
+            'duration_bucket{view="notes",le="0.1"} 1',
+            'duration_bucket{view="notes",le="1"} 3',
+            'duration_bucket{view="notes",le="+Inf"} 4',
+            'duration_sum{view="notes"} 6.05',
+            'duration_count{view="notes"} 4',
+        ]
+
+    def test_bucket_bounds_are_inclusive(self):
+        histogram = self.registry.register(
+            Histogram("queries", "How many.", [0, 1], ["view"])
+        )
+        histogram.observe(1, "notes")
+        assert (
+            'queries_bucket{view="notes",le="0"} 0' in self.registry.render()
+        )
+        assert (
+            'queries_bucket{view="notes",le="1"} 1' in self.registry.render()
+        )
+
+    def test_counters_are_kept_per_label_value(self):
+        counter = self.registry.register(
+            Counter("requests", "How many.", ["view", "status"])
+        )
+        counter.inc("notes", "200")
+        counter.inc("notes", "200")
+        counter.inc("notes", "404")
+        assert self.registry.render().splitlines()[2:] == [
+            'requests{view="notes",status="200"} 2',
+            'requests{view="notes",status="404"} 1',
+        ]
+
+    def test_label_values_are_escaped(self):
+        counter = self.registry.register(Counter("c", "C.", ["view"]))
+        counter.inc('a"b\\c')
+        assert 'c{view="a\\"b\\\\c"} 1' in self.registry.render()
@@ -0,0 +1,104 @@
+import re
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from monitoring.metrics import registry
+from monitoring.middleware import RequestMetricsMiddleware
+from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", tpl;dur=([\d.]+), '
+    r"app;dur=[\d.]+, total;dur=[\d.]+"
+)
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.note = NoteFactory(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client.force_login(self.user)
+
+    def test_responses_have_a_server_timing_header(self):
+        response = self.client.get(f"/{self.note.pk}/")
+        match = SERVER_TIMING.fullmatch(response.headers["Server-Timing"])
+        assert match
+        # The session, the user and the note
+        assert match.group(1) == "3"
+        assert float(match.group(2)) > 0
+
+    async def test_async_requests_are_measured(self):
+        async def view(request):
+            await Note.objects.filter(pk=self.note.pk).aexists()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        response = await middleware(RequestFactory().get("/"))
+        match = SERVER_TIMING.fullmatch(response.headers["Server-Timing"])
+        assert match
+        assert match.group(1) == "1"
+
+    @override_settings(MONITORING_SERVER_TIMING=False)
+    def test_the_server_timing_header_can_be_turned_off(self):
+        response = self.client.get(f"/{self.note.pk}/")
+        assert "Server-Timing" not in response.headers
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.get("/")
+        self.client.get(f"/{self.note.pk}/update/")
+        self.client.post(f"/{self.note.pk}/update/", {"title": "a"})
+        self.client.get("/missing/page/")
+
+        metrics = registry.render()
+        assert 'notes_requests_total{view="notes",method="GET",' in metrics
+        for line in [
+            'notes_requests_total{view="note-update",method="GET",'
+            'status="200"} 1',
+            'notes_requests_total{view="note-update",method="POST",'
+            'status="302"} 1',
+            'notes_requests_total{view="unmatched",method="GET",'
+            'status="404"} 1',
+            'notes_request_queries_bucket{view="notes",method="GET",'
+            'le="+Inf"} 1',
+        ]:
+            assert line in metrics
+
+    def test_query_counts_are_recorded(self):
+        self.client.get(f"/{self.note.pk}/")
+        metrics = registry.render()
+        labels = 'view="note-detail",method="GET"'
+        assert f'notes_request_queries_bucket{{{labels},le="2"}} 0' in metrics
+        assert f'notes_request_queries_bucket{{{labels},le="5"}} 1' in metrics
+        assert f"notes_request_queries_sum{{{labels}}} 3" in metrics
+
+
+@override_settings(MONITORING_METRICS_ALLOWED_IPS=["10.0.0.1", "127.0.0.1"])
+class MetricsViewTest(TestCase):
+    def test_metrics_are_served_to_allowed_addresses(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.1")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+
+    def test_other_addresses_are_forbidden(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.2")
+        assert response.status_code == 403
+
+    def test_loopback_addresses_need_the_token(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="127.0.0.1")
+        assert response.status_code == 403
+
+    @override_settings(MONITORING_METRICS_TOKEN="secret")
+    def test_a_token_is_required_if_set(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.1")
+        assert response.status_code == 403
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+        )
+        assert response.status_code == 200
@@ -0,0 +1,139 @@
+import pstats
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from monitoring.models import RequestProfile
+from monitoring.profiling import check_token, profile_token
+from notes.factories import NoteFactory
+from users.factories import UserFactory
+
+
+class ProfilingTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = UserFactory(is_staff=True)
+        cls.note = NoteFactory(user=cls.staff)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            MONITORING_PROFILE_DIR=directory.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.staff)
+        self.async_client.force_login(self.staff)
+        self.token = profile_token(self.staff)
+
+
+class ProfileTokenTest(ProfilingTestCase):
+    def test_tokens_only_work_for_their_staff_user(self):
+        other = UserFactory(is_staff=True)
+        assert check_token(self.token, self.staff)
+        assert not check_token(self.token, other)
+        assert not check_token("1:abc:def", self.staff)
+
+    def test_tokens_stop_working_if_the_user_is_not_staff(self):
+        self.staff.is_staff = False
+        assert not check_token(self.token, self.staff)
+
+    def test_tokens_expire(self):
+        with mock.patch("time.time", return_value=time.time() + 7200):
+            assert not check_token(self.token, self.staff)
+
+
+class RequestProfilingMiddlewareTest(ProfilingTestCase):
+    def test_requests_with_a_token_are_profiled(self):
+        response = self.client.get(f"/?q=a&profile={self.token}")
+        assert response.status_code == 200
+        profile = RequestProfile.objects.get()
+        assert profile.url == "/?q=a"
+        assert profile.user == self.staff
+        assert profile.status_code == 200
+        assert profile.duration > 0
+        assert profile.queries > 0
+        stats = pstats.Stats(str(profile.path))
+        assert any(
+            name == "get" and file.endswith("notes/views.py")
+            for file, _, name in stats.stats
+        )
+
+    async def test_async_requests_profile_the_views_thread(self):
+        response = await self.async_client.get(f"/?profile={self.token}")
+        assert response.status_code == 200
+        profile = await RequestProfile.objects.aget()
+        assert profile.queries > 0
+        stats = pstats.Stats(str(profile.path))
+        assert any(
+            name == "get" and file.endswith("notes/views.py")
+            for file, _, name in stats.stats
+        )
+
+    def test_the_token_can_be_sent_in_a_header(self):
+        self.client.get(f"/{self.note.pk}/", HTTP_X_PROFILE=self.token)
+        assert RequestProfile.objects.get().url == f"/{self.note.pk}/"
+
+    @override_settings(
+        MONITORING_PROFILER="sampling", MONITORING_PROFILE_INTERVAL=0.0001
+    )
+    def test_the_sampling_profiler_writes_collapsed_stacks(self):
+        self.client.get(f"/?profile={self.token}")
+        profile = RequestProfile.objects.get()
+        assert profile.filename.endswith(".collapsed")
+        for line in profile.path.read_text().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        self.client.get("/")
+        self.client.get("/?profile=wrong")
+        self.client.force_login(UserFactory())
+        self.client.get(f"/?profile={self.token}")
+        assert not RequestProfile.objects.exists()
+
+    @override_settings(MONITORING_PROFILE_KEEP=2)
+    def test_only_the_newest_profiles_are_kept(self):
+        for _ in range(3):
+            self.client.get(f"/?profile={self.token}")
+        profiles = list(RequestProfile.objects.all())
+        assert len(profiles) == 2
+        directory = profiles[0].path.parent
+        assert sorted(path.name for path in directory.iterdir()) == sorted(
+            profile.filename for profile in profiles
+        )
+
+
+class RequestProfileAdminTest(ProfilingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.get(f"/?profile={self.token}")
+        self.profile = RequestProfile.objects.get()
+        self.client.force_login(User.objects.create_superuser("admin"))
+
+    def test_profiles_are_listed(self):
+        response = self.client.get("/admin/monitoring/requestprofile/")
+        assert list(response.context["cl"].result_list) == [self.profile]
+        assert "?profile=" in response.content.decode()
+
+    def test_profiles_can_be_downloaded(self):
+        response = self.client.get(
+            f"/admin/monitoring/requestprofile/{self.profile.pk}/download/"
+        )
+        assert response.status_code == 200
+        assert b"".join(response.streaming_content) == (
+            self.profile.path.read_bytes()
+        )
+
+    def test_deleting_a_profile_deletes_its_file(self):
+        self.client.post(
+            f"/admin/monitoring/requestprofile/{self.profile.pk}/delete/",
+            {"post": "yes"},
+        )
+        assert not RequestProfile.objects.exists()
+        assert not self.profile.path.exists()
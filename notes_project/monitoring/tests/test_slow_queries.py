@@ -0,0 +1,84 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from monitoring.models import SlowQuery
+from monitoring.slow_queries import normalize_sql
+from notes.factories import NoteFactory
+from users.factories import UserFactory
+
+
+class NormalizeSqlTest(TestCase):
+    def test_literals_and_parameters_are_replaced(self):
+        assert normalize_sql(
+            "SELECT * FROM t WHERE a = %s AND b = 'it''s'\n  LIMIT 21"
+        ) == ("SELECT * FROM t WHERE a = ? AND b = ? LIMIT ?")
+
+    def test_in_lists_of_any_length_are_the_same(self):
+        assert normalize_sql("id IN (%s, %s, %s)") == normalize_sql(
+            "id IN (%s)"
+        )
+
+    def test_numbers_in_names_are_kept(self):
+        assert normalize_sql('SELECT "t1"."col2" FROM t1') == (
+            'SELECT "t1"."col2" FROM t1'
+        )
+
+
+@override_settings(MONITORING_SLOW_QUERY_MS=0)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.notes = NoteFactory.create_batch(2, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def note_query(self):
+        return SlowQuery.objects.get(
+            normalized_sql__startswith='SELECT "notes_note"."id"',
+            view="note-detail",
+        )
+
+    def test_slow_queries_are_recorded_with_their_origin_and_plan(self):
+        self.client.get(f"/{self.notes[0].pk}/")
+        query = self.note_query()
+        assert query.calls == 1
+        assert query.database == "default"
+        assert str(self.notes[0].pk) in query.params
+        assert query.origin.startswith("notes/")
+        assert "notes_note" in query.plan
+
+    def test_queries_are_grouped_by_normalized_sql(self):
+        for note in self.notes:
+            self.client.get(f"/{note.pk}/")
+        query = self.note_query()
+        assert query.calls == 2
+        assert query.total_duration >= query.max_duration > 0
+        assert str(self.notes[1].pk) in query.params
+
+    @override_settings(MONITORING_SLOW_QUERY_MS=None)
+    def test_the_log_can_be_turned_off(self):
+        self.client.get("/")
+        assert not SlowQuery.objects.exists()
+
+    def test_the_query_plan_is_not_counted(self):
+        response = self.client.get(f"/{self.notes[0].pk}/")
+        assert 'desc="3 queries"' in response.headers["Server-Timing"]
+
+    def test_the_command_lists_the_slowest_queries(self):
+        self.client.get(f"/{self.notes[0].pk}/")
+        stdout = io.StringIO()
+        call_command("slow_queries", limit=1, plans=True, stdout=stdout)
+        output = stdout.getvalue()
+        assert output.startswith("1. ")
+        assert "2. " not in output
+        assert "Parameters: " in output
+
+        call_command("slow_queries", clear=True, stdout=io.StringIO())
+        stdout = io.StringIO()
+        call_command("slow_queries", stdout=stdout)
+        assert "No slow queries" in stdout.getvalue()
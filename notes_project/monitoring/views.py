@@ -0,0 +1,41 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from monitoring.metrics import registry
+
+
+def metrics_view(request):
+    """Serve the request metrics in the Prometheus text format.
+
+    If MONITORING_METRICS_TOKEN is set, requests need it as a bearer token.
+    Otherwise they must come from MONITORING_METRICS_ALLOWED_IPS. Loopback
+    addresses there don't count, since behind a proxy on the same machine
+    every request comes from one.
+    """
+
+    token = settings.MONITORING_METRICS_TOKEN
+    if token:
+        allowed = constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    else:
+        address = request.META.get("REMOTE_ADDR")
+        allowed = (
+            address in settings.MONITORING_METRICS_ALLOWED_IPS
+            and not _is_loopback(address)
+        )
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
+
+
+def _is_loopback(address: str) -> bool:
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
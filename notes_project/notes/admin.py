@@ -1,13 +1,308 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
 from notes.models import Note
+from notes.search import (
+    FTS_TABLE,
+    build_match_expression,
+    fts5_enabled,
+    note_match,
+)
+from notes.sharding import find_notes
+
+
+class ShardedResults:
+    """A queryset run on every shard, merged into one ordered result.
+
+    Supports slicing, which is all the note changelist needs. Each shard
+    returns rows up to the end of the requested slice.
+    """
+
+    def __init__(self, queryset):
+        self.querysets = [
+            queryset.using(alias) for alias in settings.NOTES_SHARDS
+        ]
+        self.ordering = [
+            (field.lstrip("-"), field.startswith("-"))
+            for field in queryset.query.order_by
+        ]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            stop = index + 1
+            return self[index:stop][0]
+        rows = heapq.merge(
+            *(queryset[: index.stop] for queryset in self.querysets),
+            key=self.sort_key,
+        )
+        return list(islice(rows, index.start, index.stop))
+
+    def sort_key(self, note):
+        return SortKey(
+            [getattr(note, self.attname(name)) for name, _ in self.ordering],
+            [descending for _, descending in self.ordering],
+        )
+
+    @staticmethod
+    def attname(name: str) -> str:
+        if name == "pk":
+            return "pk"
+        return Note._meta.get_field(name).attname
+
+
+class SortKey:
+    """Compare rows like an ORDER BY with mixed directions, with nulls
+    sorted first, as SQLite does.
+    """
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other):
+        for value, other_value, descending in zip(
+            self.values, other.values, self.descending
+        ):
+            if value == other_value:
+                continue
+            if value is None or other_value is None:
+                less = value is None
+            else:
+                less = value < other_value
+            return less != descending
+        return False
+
+
+class NoteChangeList(ChangeList):
+    """List notes newest first, a page at a time, from every shard.
+
+    Pages are fetched with ?after= and ?before= id cursors instead of page
+    numbers, so each one is a seek on the primary key, and at most
+    NOTES_ADMIN_COUNT_LIMIT matching notes are counted. A page costs about
+    the same however many notes there are.
+    """
+
+    cursor_params = ("after", "before")
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for name in self.cursor_params:
+            lookup_params.pop(name, None)
+        return lookup_params
+
+    def get_results(self, request):
+        per_page = self.list_per_page
+        before = self.get_cursor("before")
+        rows = []
+        if before is not None:
+            rows = self.fetch(
+                self.queryset.filter(pk__gt=before).order_by("pk"),
+                per_page + 1,
+            )
+        if len(rows) > per_page:
+            rows = rows[:per_page][::-1]
+            has_previous = has_next = True
+        else:
+            # Past the first page, or no cursor
+            after = None if before is not None else self.get_cursor("after")
+            queryset = self.queryset.order_by("-pk")
+            if after is not None:
+                queryset = queryset.filter(pk__lt=after)
+            rows = self.fetch(queryset, per_page + 1)
+            has_next = len(rows) > per_page
+            has_previous = after is not None
+            rows = rows[:per_page]
+
+        self.result_count, self.result_count_is_exact = self.get_count()
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_next or has_previous
+        self.paginator = None
+        remove = [*self.cursor_params, PAGE_VAR]
+        self.next_url = (
+            self.get_query_string({"after": rows[-1].pk}, remove)
+            if has_next
+            else None
+        )
+        self.previous_url = (
+            self.get_query_string({"before": rows[0].pk}, remove)
+            if has_previous and rows
+            else None
+        )
+
+    def get_cursor(self, name: str):
+        try:
+            return int(self.params[name])
+        except (KeyError, ValueError):
+            return None
+
+    def get_count(self):
+        """Return the number of matching notes, up to the count limit, and
+        whether that's all of them.
+        """
+
+        limit = settings.NOTES_ADMIN_COUNT_LIMIT
+        count = sum(
+            queryset.order_by()[: limit + 1].count()
+            for queryset in self.shard_querysets(self.queryset)
+        )
+        return min(count, limit), count <= limit
+
+    def fetch(self, queryset, limit: int) -> list:
+        querysets = self.shard_querysets(queryset)
+        if len(querysets) == 1:
+            return list(queryset[:limit])
+        return ShardedResults(queryset)[:limit]
+
+    @staticmethod
+    def shard_querysets(queryset) -> list:
+        # List every shard's notes, unless the list is filtered to one shard
+        if queryset._db is None and len(settings.NOTES_SHARDS) > 1:
+            return [queryset.using(alias) for alias in settings.NOTES_SHARDS]
+        return [queryset]
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in settings.NOTES_SHARDS]
+
+    def queryset(self, request, queryset):
+        if self.value() in settings.NOTES_SHARDS:
+            return queryset.using(self.value())
+        return queryset
+
+
+class UserListFilter(admin.SimpleListFilter):
+    """Filter by a user id or username typed into the sidebar, rather than
+    listing every user. Notes aren't joined to users, which are in another
+    database on most shards.
+    """
+
+    title = "user"
+    parameter_name = "user"
+    template = "admin/notes/user_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # Kept by the filter's form
+        self.other_params = [
+            (name, value)
+            for name, value in request.GET.items()
+            if name not in (self.parameter_name, *NoteChangeList.cursor_params)
+        ]
+
+    def lookups(self, request, model_admin):
+        if self.user_id() is None:
+            return []
+        username = (
+            User.objects.filter(pk=self.user_id())
+            .values_list("username", flat=True)
+            .first()
+        )
+        return [(self.value(), username or self.value())]
+
+    def has_output(self):
+        return True
+
+    def user_id(self):
+        value = self.value()
+        if not value:
+            return None
+        if value.isdigit():
+            return int(value)
+        if not hasattr(self, "_user_id"):
+            self._user_id = (
+                User.objects.filter(username=value)
+                .values_list("pk", flat=True)
+                .first()
+            ) or 0
+        return self._user_id
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user_id=self.user_id())
+        return queryset
 
 
 class NoteAdmin(admin.ModelAdmin):
     fields = ("user", "title", "content", "created", "modified")
     list_display = ("id", "user", "title", "created", "modified")
-    list_filter = ("user__username",)
+    list_filter = (ShardListFilter, UserListFilter)
+    # Users are loaded separately, as they can't be joined to notes
+    list_select_related = ()
+    # Only the primary key order has an index that covers every note
+    ordering = ("-id",)
+    sortable_by = ()
+    raw_id_fields = ("user",)
     readonly_fields = ("created", "modified")
-    search_fields = ("id", "user__username", "title")
+    # Searched by get_search_results
+    search_fields = ("title",)
+    search_help_text = (
+        "Search by id, exact username, or words in the title or content."
+    )
+
+    def get_changelist(self, request, **kwargs):
+        return NoteChangeList
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("user")
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search with indexes only: the id, the username and the full-text
+        search index, instead of LIKE '%term%' on every note.
+        """
+
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        user_ids = User.objects.filter(username=search_term).values_list(
+            "pk", flat=True
+        )
+        q = Q(user_id__in=list(user_ids))
+        if search_term.isdigit():
+            q |= Q(pk=int(search_term))
+        match = build_match_expression(search_term)
+        if match and fts5_enabled():
+            q |= Q(
+                pk__in=RawSQL(
+                    f"SELECT rowid FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s",
+                    [note_match(match)],
+                )
+            )
+        elif match:
+            q |= Q(title__icontains=search_term)
+        return queryset.filter(q), False
+
+    def get_object(self, request, object_id, from_field=None):
+        try:
+            pk = Note._meta.pk.to_python(object_id)
+        except ValidationError:
+            return None
+        return find_notes([pk]).get(pk)
+
+    def get_actions(self, request):
+        # Actions run on a single queryset, so they need a single shard
+        if len(settings.NOTES_SHARDS) > 1 and "shard" not in request.GET:
+            return {}
+        return super().get_actions(request)
 
 
 admin.site.register(Note, NoteAdmin)
@@ -0,0 +1,441 @@
+"""JSON API for notes.
+
+Ownership rules match BelongsToUserMixin: missing notes are 404s and notes
+that belong to other users are 403s. The batch endpoint applies hundreds of
+creates, updates and deletes in one request and one transaction, the
+autosave endpoint takes small diffs of a note's content, the sync endpoint
+returns what changed since a client last synced, and the autocomplete
+endpoint suggests titles as the user types.
+"""
+
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
+from notes.autocomplete import title_indexes
+from notes.cache import note_list_cache
+from notes.diffs import DiffError, apply_diff
+from notes.events import publish_note_event
+from notes.forms import NoteForm
+from notes.models import Note, make_preview
+from notes.pagination import KeysetPaginator
+from notes.sharding import find_notes, get_shard
+from notes.sync import ResyncRequired, get_changes
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, error, **extra):
+        self.status = status
+        self.error = error
+        self.extra = extra
+
+    def response(self) -> JsonResponse:
+        key = "errors" if isinstance(self.error, dict) else "error"
+        return JsonResponse(
+            {key: self.error, **self.extra}, status=self.status
+        )
+
+
+def note_version(note: Note):
+    """Return the version of a note that autosave diffs are made against."""
+
+    return note.modified.isoformat() if note.modified else None
+
+
+def serialize_note(note: Note, content: bool = True) -> dict:
+    data = {
+        "id": note.pk,
+        "title": note.title,
+        "preview": note.preview,
+        "created": note.created.isoformat(),
+        "modified": note_version(note),
+        "url": note.get_absolute_url(),
+    }
+    if content:
+        data["content"] = note.content
+    return data
+
+
+class NoteApiView(View):
+    """Base view for API endpoints.
+
+    Requests must come from an authenticated user, and errors are returned
+    as JSON rather than as redirects or HTML error pages.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return ApiError(401, "Authentication required.").response()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return error.response()
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        response = super().http_method_not_allowed(request, *args, **kwargs)
+        return JsonResponse(
+            {"error": "Method not allowed."},
+            status=405,
+            headers={"Allow": response.headers["Allow"]},
+        )
+
+    def get_json(self):
+        try:
+            data = json.loads(self.request.body)
+        except (UnicodeDecodeError, ValueError):
+            raise ApiError(400, "Request body must be valid JSON.")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Request body must be a JSON object.")
+        return data
+
+    def get_note(self, pk: int) -> Note:
+        note = find_notes([pk], self.request.user.pk).get(pk)
+        if note is None:
+            raise ApiError(404, "Note not found.")
+        if note.user_id != self.request.user.pk:
+            raise ApiError(403, "You do not have access to this note.")
+        return note
+
+    def validate(self, data: dict, instance: Note = None) -> NoteForm:
+        if instance is not None:
+            # Fields that aren't given keep their current values
+            data = {
+                "title": instance.title,
+                "content": instance.content,
+                **data,
+            }
+        form = NoteForm(data, instance=instance)
+        if not form.is_valid():
+            raise ApiError(400, form.errors)
+        return form
+
+
+class NoteListApiView(NoteApiView):
+    def get(self, request, *args, **kwargs):
+        queryset = Note.objects.for_user(request.user).only(
+            "id", "title", "preview", "created", "modified"
+        )
+        page = KeysetPaginator(queryset, settings.NOTES_PAGE_SIZE).get_page(
+            after=request.GET.get("after"), before=request.GET.get("before")
+        )
+        return JsonResponse(
+            {
+                "results": [
+                    serialize_note(note, content=False)
+                    for note in page.object_list
+                ],
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        )
+
+    def post(self, request, *args, **kwargs):
+        form = self.validate(self.get_json())
+        form.instance.user = request.user
+        note = form.save()
+        return JsonResponse(serialize_note(note), status=201)
+
+
+class NoteDetailApiView(NoteApiView):
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(serialize_note(self.get_note(kwargs["pk"])))
+
+    def patch(self, request, *args, **kwargs):
+        note = self.get_note(kwargs["pk"])
+        note = self.validate(self.get_json(), instance=note).save()
+        return JsonResponse(serialize_note(note))
+
+    def delete(self, request, *args, **kwargs):
+        self.get_note(kwargs["pk"]).delete()
+        return HttpResponse(status=204)
+
+
+class NoteSyncApiView(NoteApiView):
+    """Return the notes created, changed or deleted since a change token.
+
+    Clients start from ?since=0 and then pass the token from the previous
+    response, asking again while "more" is true. Deleted notes are listed by
+    id. A 410 means the token is too old, and the client must discard its
+    notes and sync from 0 again.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.GET.get("since", 0))
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            raise ApiError(400, "'since' must be a change token.")
+
+        try:
+            changes = get_changes(
+                request.user, since, settings.NOTES_SYNC_PAGE_SIZE
+            )
+        except ResyncRequired:
+            raise ApiError(410, "The change token has expired, sync from 0.")
+        return JsonResponse(
+            {
+                "notes": [serialize_note(note) for note in changes["notes"]],
+                "deleted": changes["deleted"],
+                "token": changes["token"],
+                "more": changes["more"],
+            }
+        )
+
+
+class NoteAutocompleteApiView(NoteApiView):
+    """Return the titles of the user's notes that start with ?q=, or that
+    have a word starting with it, from the in-memory title index.
+    """
+
+    def get(self, request, *args, **kwargs):
+        prefix = request.GET.get("q", "").strip()
+        try:
+            limit = int(
+                request.GET.get("limit", settings.NOTES_AUTOCOMPLETE_LIMIT)
+            )
+        except ValueError:
+            raise ApiError(400, "'limit' must be a number.")
+        limit = max(1, min(limit, settings.NOTES_AUTOCOMPLETE_LIMIT))
+
+        matches = (
+            title_indexes.search(request.user, prefix, limit) if prefix else []
+        )
+        return JsonResponse(
+            {
+                "results": [
+                    {
+                        "id": pk,
+                        "title": title,
+                        "url": reverse("note-detail", args=[pk]),
+                    }
+                    for pk, title in matches
+                ]
+            }
+        )
+
+
+class NoteAutosaveApiView(NoteApiView):
+    """Save a change to a note as a diff of its content.
+
+    The request body looks like:
+
+        {"version": "...", "diff": [120, -4, "new", 300], "title": "..."}
+
+    version is the note's modified time as the API returns it, and the diff
+    (see notes.diffs) is made against the content of that version. diff and
+    title are optional. If the note has changed since, nothing is saved and
+    the response is a 409 with the current note, to merge with. Otherwise
+    only the changed columns are written, and the response has the new
+    version but not the content.
+    """
+
+    def patch(self, request, *args, **kwargs):
+        data = self.get_json()
+        if "version" not in data:
+            raise ApiError(400, "'version' is required.")
+
+        shard = get_shard(request.user.pk, assign=True)
+        # Reads in a transaction come from the primary, not a replica
+        with transaction.atomic(using=shard):
+            note = self.get_note(kwargs["pk"])
+            if data["version"] != note_version(note):
+                raise self.conflict(note)
+            changes = self.get_changes(note, data)
+            if not changes:
+                return JsonResponse(self.serialize_version(note))
+
+            base_version = note.modified
+            form = self.validate(changes, instance=note)
+            changes = {field: form.cleaned_data[field] for field in changes}
+            note.modified = timezone.now()
+            updated = (
+                Note.objects.on_shard(shard)
+                .filter(pk=note.pk, modified=base_version)
+                .update(**changes, modified=note.modified)
+            )
+        if not updated:
+            raise self.conflict(self.get_note(note.pk))
+
+        if "content" in changes:
+            note.preview = make_preview(changes["content"])
+        # Queryset updates don't send the signals that normally do these
+        note_list_cache.bump_version(request.user.pk)
+        publish_note_event("updated", note)
+        return JsonResponse(self.serialize_version(note))
+
+    def get_changes(self, note: Note, data: dict) -> dict:
+        changes = {}
+        if "diff" in data:
+            try:
+                content = apply_diff(note.content, data["diff"])
+            except DiffError as error:
+                raise ApiError(400, str(error))
+            if content != note.content:
+                changes["content"] = content
+        if "title" in data and data["title"] != note.title:
+            changes["title"] = data["title"]
+        return changes
+
+    @staticmethod
+    def conflict(note: Note) -> ApiError:
+        return ApiError(
+            409,
+            "The note has changed since this version.",
+            note=serialize_note(note),
+        )
+
+    @staticmethod
+    def serialize_version(note: Note) -> dict:
+        return {
+            "id": note.pk,
+            "version": note_version(note),
+            "preview": note.preview,
+        }
+
+
+class NoteBatchApiView(NoteApiView):
+    """Apply many operations at once.
+
+    The request body looks like:
+
+        {
+            "create": [{"title": "...", "content": "..."}],
+            "update": [{"id": 1, "version": "...", "title": "..."}],
+            "delete": [2, 3]
+        }
+
+    Either every operation is applied or none are. An update's version is
+    optional, and is the note's modified time as the API returns it. If a
+    note has changed since, nothing is saved and the response is a 409 with
+    the current notes.
+    """
+
+    def post(self, request, *args, **kwargs):
+        data = self.get_json()
+        creates = self._get_list(data, "create")
+        updates = self._get_list(data, "update")
+        deletes = self._get_list(data, "delete")
+        if len(creates) + len(updates) + len(deletes) > (
+            settings.NOTES_API_BATCH_LIMIT
+        ):
+            raise ApiError(
+                400,
+                "A batch can have at most "
+                f"{settings.NOTES_API_BATCH_LIMIT} operations.",
+            )
+
+        update_ids = [self._get_id(item, "update") for item in updates]
+        delete_ids = [self._get_id(pk, "delete") for pk in deletes]
+        if len(set(update_ids)) != len(update_ids):
+            raise ApiError(400, "Notes can only be updated once per batch.")
+
+        shard = get_shard(request.user.pk, assign=True)
+        # Reads in a transaction come from the primary, not a replica, and
+        # the notes are locked until they're written
+        with transaction.atomic(using=shard):
+            notes = self._get_notes({*update_ids, *delete_ids}, shard)
+            self._check_versions(updates, notes)
+
+            new_notes = []
+            for index, item in enumerate(creates):
+                form = self._validate_item(item, "create", index)
+                form.instance.user = request.user
+                new_notes.append(form.instance)
+
+            now = timezone.now()
+            changed_notes = []
+            for index, item in enumerate(updates):
+                fields = {
+                    key: value
+                    for key, value in item.items()
+                    if key not in ("id", "version")
+                }
+                note = notes[item["id"]]
+                form = self._validate_item(fields, "update", index, note)
+                form.instance.modified = now
+                changed_notes.append(form.instance)
+
+            queryset = Note.objects.using(shard)
+            created = queryset.bulk_create(new_notes)
+            queryset.bulk_update(
+                changed_notes, ["title", "content", "modified"]
+            )
+            queryset.filter(pk__in=delete_ids).delete()
+
+        # Bulk writes don't send the signals that normally do these.
+        # Deleting sends post_delete, which publishes the deleted events
+        note_list_cache.bump_version(request.user.pk)
+        for note in created:
+            publish_note_event("created", note)
+        for note in changed_notes:
+            publish_note_event("updated", note)
+
+        return JsonResponse(
+            {
+                "created": [serialize_note(note) for note in created],
+                "updated": [serialize_note(note) for note in changed_notes],
+                "deleted": delete_ids,
+            }
+        )
+
+    def _validate_item(self, item, operation, index, instance=None):
+        try:
+            if not isinstance(item, dict):
+                raise ApiError(400, "Each operation must be a JSON object.")
+            return self.validate(item, instance=instance)
+        except ApiError as error:
+            error.extra.update(operation=operation, index=index)
+            raise
+
+    def _get_notes(self, pks: set, shard: str) -> dict:
+        notes = Note.objects.on_shard(shard).select_for_update().in_bulk(pks)
+        if missing := pks - notes.keys():
+            # Other users' notes, on other shards
+            notes.update(find_notes(missing))
+        if missing := sorted(pks - notes.keys()):
+            raise ApiError(404, "Notes not found.", ids=missing)
+        if foreign := sorted(
+            pk
+            for pk, note in notes.items()
+            if note.user_id != self.request.user.pk
+        ):
+            raise ApiError(
+                403, "You do not have access to these notes.", ids=foreign
+            )
+        return notes
+
+    @staticmethod
+    def _check_versions(updates: list, notes: dict):
+        changed = [
+            notes[item["id"]]
+            for item in updates
+            if isinstance(item, dict)
+            and "version" in item
+            and item["version"] != note_version(notes[item["id"]])
+        ]
+        if changed:
+            raise ApiError(
+                409,
+                "Notes have changed since these versions.",
+                ids=[note.pk for note in changed],
+                notes=[serialize_note(note) for note in changed],
+            )
+
+    @staticmethod
+    def _get_list(data: dict, key: str) -> list:
+        value = data.get(key, [])
+        if not isinstance(value, list):
+            raise ApiError(400, f"'{key}' must be a list.")
+        return value
+
+    @staticmethod
+    def _get_id(value, operation: str) -> int:
+        pk = value.get("id") if isinstance(value, dict) else value
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            raise ApiError(400, f"Every {operation} needs an integer id.")
+        return pk
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class NotesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "notes"
+
+    def ready(self):
+        from notes import signals  # noqa: F401
+        from notes.fields import register_sql_functions
+        from notes.sharding import reserve_note_ids
+
+        post_migrate.connect(reserve_note_ids, sender=self)
+        connection_created.connect(register_sql_functions)
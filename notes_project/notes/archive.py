@@ -0,0 +1,86 @@
+"""Build ZIP archives of notes as they're downloaded.
+
+Each note is compressed and sent as soon as it's read, so memory use doesn't
+grow with the size of the archive, only with the number of notes, by the
+entry kept for each one until the archive's index is written at the end.
+"""
+
+import zipfile
+from typing import Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.text import slugify
+from notes.fields import decompress
+
+# Bytes collected before they're sent
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamOutput:
+    """A write-only file that keeps what's written until it's taken.
+
+    It can't seek or tell, so zipfile writes each entry's sizes after its
+    data instead of going back to fill them in.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def note_filename(pk: int, title: str) -> str:
+    return f"{slugify(title)[:80] or 'note'}-{pk}.md"
+
+
+def note_markdown(title: str, content: str) -> str:
+    return f"# {title}\n\n{content}\n"
+
+
+def iter_archive(notes: Iterable[tuple]) -> Iterator[bytes]:
+    """Yield a ZIP archive of (pk, title, content, modified) rows, with a
+    Markdown file for each, in chunks of about CHUNK_SIZE bytes.
+    """
+
+    output = StreamOutput()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for pk, title, content, modified in notes:
+            info = zipfile.ZipInfo(
+                note_filename(pk, title),
+                date_time=timezone.localtime(modified).timetuple()[:6],
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, note_markdown(title, decompress(content)))
+            if output.size >= CHUNK_SIZE:
+                yield output.take()
+    yield output.take()
+
+
+async def aiter_chunks(chunks: Iterator[bytes]):
+    """Iterate over chunks from an async response.
+
+    Django reads all of a sync iterator into a list before sending it from
+    ASGI, so chunks are made one at a time in the request's sync thread,
+    which is the thread the database cursor belongs to.
+    """
+
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
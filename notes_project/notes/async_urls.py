@@ -0,0 +1,24 @@
+from django.urls import path
+from notes.async_views import (
+    AsyncNoteCreateView,
+    AsyncNoteDeleteView,
+    AsyncNoteDetailView,
+    AsyncNoteListView,
+    AsyncNoteUpdateView,
+)
+from notes.views import NoteExportView
+
+# The same pages as notes.urls, served by the async views
+urlpatterns = [
+    path("", AsyncNoteListView.as_view(), name="notes"),
+    path("create/", AsyncNoteCreateView.as_view(), name="note-create"),
+    path("<int:pk>/", AsyncNoteDetailView.as_view(), name="note-detail"),
+    path(
+        "<int:pk>/update/", AsyncNoteUpdateView.as_view(), name="note-update"
+    ),
+    path(
+        "<int:pk>/delete/", AsyncNoteDeleteView.as_view(), name="note-delete"
+    ),
+    # Streams from ASGI without an async version
+    path("export/", NoteExportView.as_view(), name="note-export"),
+]
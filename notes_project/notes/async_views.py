@@ -0,0 +1,222 @@
+"""Async versions of the notes pages for ASGI deployments.
+
+These behave like the views in notes.views, but use the async ORM and cache
+APIs so a request waiting on the database doesn't tie up a worker thread.
+Set NOTES_ASYNC_VIEWS to route the notes pages to these views.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.template.response import TemplateResponse
+from django.views import View
+from notes.cache import note_list_cache
+from notes.events import get_broker, stream_events
+from notes.forms import NoteForm, SearchForm
+from notes.models import Note
+from notes.sharding import find_notes
+from notes.views import (
+    NOTE_LIST_SUMMARY,
+    NOTE_LIST_SUMMARY_PARAMS,
+    NoteSearchMixin,
+    get_not_modified_response,
+    note_list_validators,
+    note_validators,
+    set_validators,
+)
+
+
+async def aget_user(request):
+    """Async version of django.contrib.auth.get_user.
+
+    Django 4.2 has no async session API, so the session and user are loaded
+    in a worker thread, once per request.
+    """
+
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
+
+
+class AsyncLoginRequiredMixin:
+    """Users must be authenticated, as with LoginRequiredMixin."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await aget_user(request)
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncBelongsToUserMixin(AsyncLoginRequiredMixin):
+    """Users must be authenticated and own the requested note, as with
+    BelongsToUserMixin.
+    """
+
+    async def aget_object(self) -> Note:
+        if not hasattr(self, "object"):
+            pk = self.kwargs["pk"]
+            notes = await sync_to_async(find_notes)([pk], self.request.user.pk)
+            note = notes.get(pk)
+            if note is None:
+                raise Http404("No note found matching the query")
+            if note.user_id != self.request.user.pk:
+                raise PermissionDenied
+            self.object = note
+        return self.object
+
+
+class AsyncNoteListView(AsyncLoginRequiredMixin, NoteSearchMixin, View):
+    template_name = "notes/note_list.html"
+
+    async def get(self, request, *args, **kwargs):
+        user = request.user
+        # Finding the user's shard may need the database
+        notes = await sync_to_async(Note.objects.for_user)(user)
+        summary = await note_list_cache.aget_or_set(
+            user.pk,
+            NOTE_LIST_SUMMARY_PARAMS,
+            lambda: notes.aaggregate(**NOTE_LIST_SUMMARY),
+        )
+        etag, last_modified = note_list_validators(user.pk, summary)
+        response = get_not_modified_response(request, etag, last_modified)
+
+        if response is None:
+            search_query = request.GET.get("q", "")
+            params = {
+                "q": search_query,
+                "after": request.GET.get("after"),
+                "before": request.GET.get("before"),
+            }
+            # Choosing the paginator may need to check the database for the
+            # search index, which can't be done from async code
+            paginator = await sync_to_async(self.get_paginator)(search_query)
+            page = await note_list_cache.aget_or_set(
+                user.pk,
+                params,
+                lambda: paginator.aget_page(
+                    after=params["after"], before=params["before"]
+                ),
+            )
+            context = {
+                "form": SearchForm(request.GET),
+                "notes": page.object_list,
+                "page": page,
+            }
+            response = TemplateResponse(request, self.template_name, context)
+
+        set_validators(response, etag, last_modified)
+        return response
+
+
+class AsyncNoteDetailView(AsyncBelongsToUserMixin, View):
+    template_name = "notes/note_detail.html"
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.aget_object()
+        etag, last_modified = note_validators(note)
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            response = TemplateResponse(
+                request, self.template_name, {"note": note}
+            )
+        set_validators(response, etag, last_modified)
+        return response
+
+
+class AsyncNoteFormMixin:
+    """Render and handle the note form, as CreateView and UpdateView do."""
+
+    template_name = "notes/note_form.html"
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        return self.render_form(NoteForm(instance=note), note)
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.aget_note()
+        form = NoteForm(request.POST, instance=note)
+        if not form.is_valid():
+            return self.render_form(form, note)
+
+        form.instance.user = request.user
+        await form.instance.asave()
+        await note_list_cache.abump_version(request.user.pk)
+        return HttpResponseRedirect(form.instance.get_absolute_url())
+
+    async def aget_note(self):
+        return None
+
+    def render_form(self, form, note):
+        return TemplateResponse(
+            self.request, self.template_name, {"form": form, "note": note}
+        )
+
+
+class AsyncNoteCreateView(AsyncLoginRequiredMixin, AsyncNoteFormMixin, View):
+    pass
+
+
+class AsyncNoteUpdateView(AsyncBelongsToUserMixin, AsyncNoteFormMixin, View):
+    async def aget_note(self):
+        return await self.aget_object()
+
+
+class AsyncNoteDeleteView(AsyncBelongsToUserMixin, View):
+    template_name = "notes/note_confirm_delete.html"
+    success_url = "/"
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.aget_object()
+        return TemplateResponse(request, self.template_name, {"note": note})
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.aget_object()
+        await note.adelete()
+        await note_list_cache.abump_version(request.user.pk)
+        return HttpResponseRedirect(self.success_url)
+
+
+class NoteEventsView(View):
+    """Stream changes to the user's notes as Server-Sent Events.
+
+    This needs ASGI. Under WSGI the events would only be sent once the stream
+    closed, so requests get a 501 instead.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(
+                "Event streams need the ASGI server.", status=501
+            )
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return HttpResponse("Authentication required.", status=401)
+
+        broker = get_broker()
+        if broker.count() >= settings.NOTES_EVENTS_MAX_CONNECTIONS:
+            return HttpResponse(
+                "Too many open event streams.",
+                status=503,
+                headers={
+                    "Retry-After": settings.NOTES_EVENTS_RETRY_MS // 1000
+                },
+            )
+        return StreamingHttpResponse(
+            stream_events(broker, user.pk),
+            content_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # Stop nginx from buffering the events
+                "X-Accel-Buffering": "no",
+            },
+        )
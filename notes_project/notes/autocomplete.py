@@ -0,0 +1,170 @@
+"""Suggest note titles as the user types, from an in-memory index.
+
+Each user's titles are kept sorted by their lowercase text, once from the
+start of the title and once from the start of each later word, so the titles
+with a prefix are found by bisecting rather than by scanning every note.
+
+A user's index is built the first time they search, and the indexes of the
+users who searched least recently are evicted past NOTES_AUTOCOMPLETE_USERS.
+Indexes remember the change number (see notes.sync) they're up to date with.
+Before each search the user's change counter is read, and the notes saved
+and deleted since, by any process, are applied to the index. As in
+notes.sync, they're read from the primary after the counter, without a
+transaction, and capped at it.
+"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from notes.models import Note, NoteChangeCounter, NoteTombstone
+from notes.sharding import get_shard
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def title_keys(title: str):
+    """Return the title's key and the keys for its later words."""
+
+    key = title.casefold()
+    starts = [match.start() for match in WORD_RE.finditer(key)]
+    return key, [key[start:] for start in starts[1:]]
+
+
+class TitleIndex:
+    """Sorted (key, pk) lists of one user's note titles."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.titles = {}
+        self.starts = []
+        self.words = []
+
+    def build(self, rows, seq: int):
+        """Replace the index with the given (pk, title) rows."""
+
+        self.seq = seq
+        self.titles = {}
+        self.starts = []
+        self.words = []
+        for pk, title in rows:
+            key, word_keys = title_keys(title)
+            self.titles[pk] = title
+            self.starts.append((key, pk))
+            self.words.extend((word_key, pk) for word_key in word_keys)
+        self.starts.sort()
+        self.words.sort()
+
+    def add(self, pk: int, title: str):
+        if self.titles.get(pk) == title:
+            return
+        self.remove(pk)
+        key, word_keys = title_keys(title)
+        self.titles[pk] = title
+        insort(self.starts, (key, pk))
+        for word_key in word_keys:
+            insort(self.words, (word_key, pk))
+
+    def remove(self, pk: int):
+        title = self.titles.pop(pk, None)
+        if title is None:
+            return
+        key, word_keys = title_keys(title)
+        del self.starts[bisect_left(self.starts, (key, pk))]
+        for word_key in word_keys:
+            del self.words[bisect_left(self.words, (word_key, pk))]
+
+    def search(self, prefix: str, limit: int) -> list:
+        """Return up to limit (pk, title) pairs whose title, or a word in it,
+        starts with prefix. Titles that start with it come first.
+        """
+
+        prefix = prefix.casefold()
+        found = {}
+        for keys in (self.starts, self.words):
+            for i in range(bisect_left(keys, (prefix,)), len(keys)):
+                key, pk = keys[i]
+                if len(found) == limit or not key.startswith(prefix):
+                    break
+                found.setdefault(pk, self.titles[pk])
+        return list(found.items())
+
+
+class TitleIndexCache:
+    """The title indexes of the users who searched most recently."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indexes = OrderedDict()
+
+    def search(self, user, prefix: str, limit: int) -> list:
+        index = self.get_index(user.pk)
+        self.update(user, index)
+        with index.lock:
+            return index.search(prefix, limit)
+
+    def get_index(self, user_id: int) -> TitleIndex:
+        with self.lock:
+            index = self.indexes.get(user_id)
+            if index is None:
+                index = self.indexes[user_id] = TitleIndex()
+            self.indexes.move_to_end(user_id)
+            while len(self.indexes) > settings.NOTES_AUTOCOMPLETE_USERS:
+                self.indexes.popitem(last=False)
+        return index
+
+    def update(self, user, index: TitleIndex):
+        """Apply the user's changes since the index was last updated, or
+        rebuild it if they can't be found.
+        """
+
+        shard = get_shard(user.pk)
+        seq, purged_seq = (
+            NoteChangeCounter.objects.using(shard)
+            .filter(user_id=user.pk)
+            .values_list("seq", "purged_seq")
+            .first()
+        ) or (0, 0)
+        base = index.seq
+        if seq == base:
+            return
+
+        notes = Note.objects.using(shard).filter(
+            user=user, change_seq__lte=seq
+        )
+        # Tombstones older than purged_seq are gone, and a new counter after
+        # a shard move starts past the old one
+        if base == 0 or base < purged_seq or base > seq:
+            rows = list(notes.values_list("pk", "title"))
+            with index.lock:
+                if index.seq == base:
+                    index.build(rows, seq)
+            return
+
+        deleted = list(
+            NoteTombstone.objects.using(shard)
+            .filter(user_id=user.pk, change_seq__gt=base, change_seq__lte=seq)
+            .values_list("note_id", flat=True)
+        )
+        changed = list(
+            notes.filter(change_seq__gt=base).values_list("pk", "title")
+        )
+        with index.lock:
+            # Unless another search updated the index in the meantime
+            if index.seq != base:
+                return
+            for pk in deleted:
+                index.remove(pk)
+            for pk, title in changed:
+                index.add(pk, title)
+            index.seq = seq
+
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
+
+
+title_indexes = TitleIndexCache()
@@ -0,0 +1,248 @@
+"""Benchmarks for the notes pages, run by the benchmark_notes command.
+
+Each scenario makes the same kind of request many times, as one user of a
+seeded dataset, and records latency percentiles and the number of queries.
+Results can be compared with a stored baseline to catch regressions.
+"""
+
+import gc
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from notes.cache import note_list_cache
+from notes.models import Note, keep_timestamps
+
+PERCENTILES = (50, 90, 95, 99)
+# Latency changes smaller than this are treated as noise
+NOISE_MS = 1.0
+# With fewer requests, p95 latency is just the slowest one, so it isn't
+# compared with the baseline
+MIN_LATENCY_ITERATIONS = 20
+
+# Small enough that every word appears in many notes, so searches for
+# SEARCH_WORD return full pages
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliett kilo "
+    "lima mike november oscar papa quebec romeo sierra tango uniform victor "
+    "whiskey xray yankee zulu meeting recipe travel budget project idea"
+).split()
+SEARCH_WORD = "recipe"
+
+
+def seed(notes: int, users: int, batch_size: int = 5000, random_seed=0):
+    """Create users and notes for the benchmarks.
+
+    Notes are spread evenly over the users, with created times spread over
+    the last year. Returns the users' ids.
+    """
+
+    rng = random.Random(random_seed)
+    User.objects.bulk_create(
+        [User(username=f"benchmark-{n}", password="!") for n in range(users)]
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith="benchmark-")
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+    now = timezone.now()
+    with keep_timestamps():
+        for start in range(0, notes, batch_size):
+            batch = []
+            for n in range(start, min(start + batch_size, notes)):
+                created = now - timedelta(seconds=rng.randrange(365 * 86400))
+                batch.append(
+                    Note(
+                        user_id=user_ids[n % len(user_ids)],
+                        title=_words(rng, 4),
+                        content=_words(rng, rng.randrange(20, 200)),
+                        created=created,
+                        modified=created,
+                    )
+                )
+            Note.objects.bulk_create(batch)
+    return user_ids
+
+
+def _words(rng, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count)).capitalize()
+
+
+class Benchmark:
+    """Run the scenarios as one user."""
+
+    def __init__(self, user, iterations: int, warmup: int = 5, random_seed=0):
+        self.user = user
+        self.iterations = iterations
+        self.warmup = warmup
+        self.rng = random.Random(random_seed)
+        self.client = Client()
+        self.client.force_login(user)
+
+    def scenarios(self) -> dict:
+        return {
+            "list": lambda: self.get("/"),
+            "list_next_page": lambda: self.get(self.next_page_url),
+            "list_search": lambda: self.get(f"/?q={SEARCH_WORD}"),
+            "detail": lambda: self.get(f"/{self.random_note()}/"),
+            "create": lambda: self.post(
+                "/create/", {"title": "New", "content": _words(self.rng, 50)}
+            ),
+            "update": lambda: self.post(
+                f"/{self.random_note()}/update/",
+                {"title": "Changed", "content": _words(self.rng, 50)},
+            ),
+            "delete": lambda: self.post(
+                f"/{self.spare_note_ids.pop()}/delete/", {}
+            ),
+        }
+
+    def run(self, names=None) -> dict:
+        self.note_ids = list(
+            Note.objects.for_user(self.user).values_list("pk", flat=True)
+        )
+        page = self.get("/").context["page"]
+        self.next_page_url = (
+            f"/?after={page.next_cursor}" if page.has_next else "/"
+        )
+
+        results = {}
+        for name, request in self.scenarios().items():
+            if names and name not in names:
+                continue
+            if name == "delete":
+                # Delete extra notes, so the dataset doesn't shrink
+                self.spare_note_ids = [
+                    note.pk
+                    for note in Note.objects.bulk_create(
+                        Note(user=self.user, title="Spare")
+                        for _ in range(self.warmup + self.iterations)
+                    )
+                ]
+            results[name] = self.measure(request)
+        return results
+
+    def measure(self, request) -> dict:
+        for _ in range(self.warmup):
+            request()
+
+        durations = []
+        queries = []
+        # A collection in the middle of a request would be timed as part of
+        # it, so collect beforehand and not while measuring, like timeit
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(self.iterations):
+                # Measure uncached list pages, which is the slow path
+                note_list_cache.bump_version(self.user.pk)
+                with ExitStack() as stack:
+                    contexts = [
+                        stack.enter_context(
+                            CaptureQueriesContext(connections[a])
+                        )
+                        for a in {DEFAULT_DB_ALIAS, *settings.NOTES_SHARDS}
+                    ]
+                    started = time.perf_counter()
+                    request()
+                    durations.append((time.perf_counter() - started) * 1000)
+                queries.append(sum(len(context) for context in contexts))
+        finally:
+            gc.enable()
+
+        cut_points = statistics.quantiles(durations, n=100, method="inclusive")
+        return {
+            "iterations": len(durations),
+            "mean_ms": round(statistics.fmean(durations), 3),
+            **{
+                f"p{percentile}_ms": round(cut_points[percentile - 1], 3)
+                for percentile in PERCENTILES
+            },
+            "queries": max(queries),
+        }
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.check(response, url, 200)
+        return response
+
+    def post(self, url, data):
+        response = self.client.post(url, data)
+        self.check(response, url, 302)
+        return response
+
+    def random_note(self) -> int:
+        return self.rng.choice(self.note_ids)
+
+    @staticmethod
+    def check(response, url, status):
+        if response.status_code != status:
+            raise AssertionError(
+                f"{url} returned {response.status_code}, expected {status}"
+            )
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return descriptions of the scenarios that regressed.
+
+    A scenario regresses if its p95 latency is more than threshold (a
+    fraction) and NOISE_MS above the baseline's, or if it makes more queries.
+    Latency is only compared for at least MIN_LATENCY_ITERATIONS requests.
+    """
+
+    regressions = []
+    for name, result in results["scenarios"].items():
+        expected = baseline["scenarios"].get(name)
+        if expected is None:
+            continue
+        limit = max(
+            expected["p95_ms"] * (1 + threshold), expected["p95_ms"] + NOISE_MS
+        )
+        if (
+            result["iterations"] >= MIN_LATENCY_ITERATIONS
+            and result["p95_ms"] > limit
+        ):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.1f} ms is over "
+                f"{limit:.1f} ms (baseline {expected['p95_ms']:.1f} ms)"
+            )
+        if result["queries"] > expected["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries, baseline "
+                f"{expected['queries']}"
+            )
+    return regressions
+
+
+def load(path) -> dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def dump(results: dict, path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+        file.write("\n")
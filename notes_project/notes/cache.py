@@ -0,0 +1,131 @@
+"""Per-user versioned caching of note list and search results.
+
+Each user has a version number stored in the cache and every cached page
+key includes it. Bumping the version when a user's notes change makes all of
+their old pages unreachable at once, without having to find and delete them.
+
+Versions live in NOTES_CACHE_ALIAS, which is only the shared cache when
+NOTES_SHARED_CACHE_URL is set. Otherwise each process has its own, and a
+process can serve pages and ETags from before a change made in another one
+until they time out, so run a single process without a shared cache.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class NoteListCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[settings.NOTES_CACHE_ALIAS]
+
+    def get_version(self, user_id: int) -> int:
+        key = self._version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            # Start from the current time rather than 1, so that if the
+            # version is evicted, pages cached under an old version can't
+            # become reachable again
+            self.cache.add(key, time.time_ns(), timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    async def aget_version(self, user_id: int) -> int:
+        key = self._version_key(user_id)
+        version = await self.cache.aget(key)
+        if version is None:
+            await self.cache.aadd(key, time.time_ns(), timeout=None)
+            version = await self.cache.aget(key)
+        return version
+
+    def bump_version(self, user_id: int):
+        key = self._version_key(user_id)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), timeout=None)
+
+    def get_or_set(self, user_id: int, params: dict, default):
+        """Return the cached value for the user and params, or cache
+        default() if there isn't one.
+        """
+
+        key = self._page_key(user_id, params)
+        value = self.cache.get(key)
+        if value is not None:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        value = default()
+        self.cache.set(key, value, timeout=settings.NOTES_CACHE_TIMEOUT)
+        return value
+
+    async def aget_or_set(self, user_id: int, params: dict, default):
+        """Async version of get_or_set, where default is a coroutine
+        function.
+        """
+
+        key = await self._apage_key(user_id, params)
+        value = await self.cache.aget(key)
+        if value is not None:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        value = await default()
+        await self.cache.aset(key, value, timeout=settings.NOTES_CACHE_TIMEOUT)
+        return value
+
+    async def abump_version(self, user_id: int):
+        key = self._version_key(user_id)
+        try:
+            await self.cache.aincr(key)
+        except ValueError:
+            await self.cache.aset(key, time.time_ns(), timeout=None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _page_key(self, user_id: int, params: dict) -> str:
+        version = self.get_version(user_id)
+        return f"notes:list:{user_id}:{version}:{self._digest(params)}"
+
+    async def _apage_key(self, user_id: int, params: dict) -> str:
+        version = await self.aget_version(user_id)
+        return f"notes:list:{user_id}:{version}:{self._digest(params)}"
+
+    @staticmethod
+    def _digest(params: dict) -> str:
+        return hashlib.sha256(
+            json.dumps(params, sort_keys=True).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"notes:version:{user_id}"
+
+
+note_list_cache = NoteListCache()
@@ -0,0 +1,78 @@
+"""Text diffs sent by clients that autosave notes.
+
+A diff is a list of operations that walk through the old text from the
+start: a positive integer keeps that many characters, a negative integer
+deletes that many, and a string inserts itself. Together the operations
+must cover the whole old text, so a diff made against a different text is
+rejected rather than applied in the wrong place. Lengths count Unicode code
+points, not UTF-16 code units as JavaScript's String.length does.
+
+For example, [5, -3, "abc", 10] keeps 5 characters, replaces the next 3
+with "abc" and keeps the last 10 of an 18 character text.
+"""
+
+
+class DiffError(ValueError):
+    pass
+
+
+def apply_diff(text: str, diff) -> str:
+    """Apply a diff to the text it was made against."""
+
+    if not isinstance(diff, list):
+        raise DiffError("The diff must be a list.")
+    parts = []
+    position = 0
+    for op in diff:
+        if isinstance(op, str):
+            parts.append(op)
+        elif isinstance(op, int) and not isinstance(op, bool) and op:
+            end = position + abs(op)
+            if end > len(text):
+                raise DiffError("The diff is longer than the text.")
+            if op > 0:
+                parts.append(text[position:end])
+            position = end
+        else:
+            raise DiffError(
+                "Diff operations must be strings or non-zero integers."
+            )
+    if position != len(text):
+        raise DiffError("The diff is shorter than the text.")
+    return "".join(parts)
+
+
+def make_diff(old: str, new: str) -> list:
+    """Return a diff that replaces the changed middle of a text.
+
+    The app only applies diffs. This is the reference encoder for clients,
+    which should make the same diffs, and is what the tests send. Edits made
+    between autosaves are usually in one place, so it only keeps the common
+    start and end.
+    """
+
+    limit = min(len(old), len(new))
+    start = _common_length(lambda n: old[:n] == new[:n], limit)
+    end = _common_length(
+        lambda n: n == 0 or old[-n:] == new[-n:], limit - start
+    )
+    new_end = len(new) - end
+    diff = [start, start + end - len(old), new[start:new_end], end]
+    return [op for op in diff if op != 0 and op != ""]
+
+
+def _common_length(matches, limit: int) -> int:
+    """Return the largest n up to limit for which matches(n) is true.
+
+    Binary search, so long texts are compared in C rather than character by
+    character.
+    """
+
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if matches(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
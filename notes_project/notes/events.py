@@ -0,0 +1,174 @@
+"""Push note changes to a user's open pages as they happen.
+
+Saving or deleting a note publishes an event to the broker once the write
+commits, and the event stream view sends the events to the user's open
+connections as Server-Sent Events. The broker is NOTES_EVENTS_BROKER, which
+by default only delivers to connections held by the same process. Running
+more than one process needs a broker with the same publish() and
+subscribe() methods backed by something shared, like Redis pub/sub.
+
+Streams are plain coroutines waiting on the event loop, so under ASGI a
+process can hold thousands of them. They need ASGI: under WSGI, Django reads
+all of an async stream before sending any of it, so nothing would be sent
+until the stream closed. The view answers WSGI requests with a 501.
+"""
+
+import asyncio
+import functools
+import json
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Sent in place of events a subscriber had no room for
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """Events published for a user, waiting to be sent to one connection.
+
+    Subscriptions belong to the event loop they're created on, and events
+    can be delivered to them from any thread.
+    """
+
+    def __init__(self, user_id: int, max_events: int):
+        self.user_id = user_id
+        self.max_events = max_events
+        self.loop = asyncio.get_running_loop()
+        self.events = deque()
+        self.ready = asyncio.Event()
+
+    def deliver(self, event: dict):
+        self.loop.call_soon_threadsafe(self._add, event)
+
+    def _add(self, event: dict):
+        if len(self.events) >= self.max_events:
+            # The client has fallen behind, so it should reload instead
+            self.events.clear()
+            event = RESYNC
+        self.events.append(event)
+        self.ready.set()
+
+    async def get(self) -> dict:
+        while not self.events:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.events.popleft()
+
+
+class InProcessBroker:
+    """Deliver events to the subscriptions in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def publish(self, user_id: int, event: dict):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # Its event loop has closed
+                self.unsubscribe(subscription)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, settings.NOTES_EVENTS_QUEUE_SIZE)
+        with self.lock:
+            self.subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.user_id]
+
+    def count(self) -> int:
+        """Return the number of open subscriptions."""
+
+        with self.lock:
+            return sum(map(len, self.subscriptions.values()))
+
+
+@functools.cache
+def load_broker(path: str):
+    return import_string(path)()
+
+
+def get_broker():
+    return load_broker(settings.NOTES_EVENTS_BROKER)
+
+
+def note_event(event_type: str, note) -> dict:
+    event = {"type": event_type, "id": note.pk}
+    if event_type != "deleted":
+        event.update(
+            title=note.title,
+            preview=note.preview,
+            modified=note.modified.isoformat(),
+        )
+    return event
+
+
+def publish_note_event(event_type: str, note):
+    """Publish a created, updated or deleted event for a note once the
+    current transaction commits.
+    """
+
+    event = note_event(event_type, note)
+    transaction.on_commit(
+        lambda: get_broker().publish(note.user_id, event),
+        using=note._state.db,
+    )
+
+
+def format_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_events(broker, user_id: int):
+    """Yield a user's events in the text/event-stream format.
+
+    A comment is sent every NOTES_EVENTS_HEARTBEAT seconds without events,
+    so proxies keep the connection open. Browsers reconnect on their own,
+    after the retry time sent first.
+
+    Django 4.2 doesn't stop a stream when its client disconnects, and
+    writes to a closed connection don't fail, so a dead stream holds one of
+    the NOTES_EVENTS_MAX_CONNECTIONS until it ends on its own. Streams are
+    kept short for that: they end after NOTES_EVENTS_IDLE_TIMEOUT seconds
+    without events, and after NOTES_EVENTS_MAX_AGE seconds in any case.
+    """
+
+    subscription = broker.subscribe(user_id)
+    try:
+        yield f"retry: {settings.NOTES_EVENTS_RETRY_MS}\n\n"
+        loop = asyncio.get_running_loop()
+        close_at = loop.time() + settings.NOTES_EVENTS_MAX_AGE
+        idle_until = loop.time() + settings.NOTES_EVENTS_IDLE_TIMEOUT
+        while True:
+            timeout = min(
+                settings.NOTES_EVENTS_HEARTBEAT,
+                idle_until - loop.time(),
+                close_at - loop.time(),
+            )
+            if timeout <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(event)
+            if event == RESYNC:
+                return
+            idle_until = loop.time() + settings.NOTES_EVENTS_IDLE_TIMEOUT
+    finally:
+        broker.unsubscribe(subscription)
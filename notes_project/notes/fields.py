@@ -0,0 +1,181 @@
+"""A text field that stores large values compressed.
+
+Values of at least min_length characters are stored as a compressed BLOB,
+with zstd if the zstandard package is installed and zlib otherwise, in the
+same column as smaller values, which stay as text. This needs a column that
+takes either, as SQLite's do. Either kind of BLOB can be read, though zstd
+ones need zstandard.
+
+Values read from the database are only decompressed when the attribute is
+first used, and saving an unchanged value doesn't compress it again. Queries
+that return the column itself, like values(), give the stored CompressedText
+for large values; use decompress() on them.
+
+SQLite connections get notes_compress() and notes_decompress() SQL
+functions, which the search index triggers and Compress and Decompress use.
+Database expressions that read the column, like Concat(F("content"), ...),
+see the compressed bytes of large values unless the column is wrapped in
+Decompress, as decompress_references() does.
+"""
+
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class CompressedText(bytes):
+    """A compressed value read from the database."""
+
+
+def compress(text: str) -> bytes:
+    data = text.encode()
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    return zlib.compress(data)
+
+
+def compress_large(value, min_length: int):
+    """Compress text of at least min_length characters, unless that doesn't
+    make it smaller.
+    """
+
+    if isinstance(value, str) and len(value) >= min_length:
+        compressed = compress(value)
+        # Incompressible text is kept as it is
+        if len(compressed) < len(value.encode()):
+            return compressed
+    return value
+
+
+def decompress(value):
+    """Return the text of a stored value, whether it's compressed or not."""
+
+    if not isinstance(value, bytes):
+        return value
+    if value.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ImproperlyConfigured(
+                "The zstandard package is needed to read this value."
+            )
+        return zstandard.ZstdDecompressor().decompress(value).decode()
+    return zlib.decompress(value).decode()
+
+
+def register_sql_functions(sender, connection, **kwargs):
+    """Add notes_compress() and notes_decompress() to SQLite connections.
+
+    Connected to connection_created.
+    """
+
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "notes_compress", 2, compress_large, deterministic=True
+        )
+        connection.connection.create_function(
+            "notes_decompress", 1, decompress, deterministic=True
+        )
+
+
+class Compress(models.Func):
+    """Compress an expression's text as CompressedTextField does."""
+
+    function = "notes_compress"
+    arity = 2
+    output_field = models.TextField()
+
+    def __init__(self, expression, min_length: int, **extra):
+        super().__init__(expression, models.Value(min_length), **extra)
+
+
+class Decompress(models.Func):
+    """The text of a CompressedTextField column."""
+
+    function = "notes_decompress"
+    arity = 1
+    output_field = models.TextField()
+
+
+def decompress_references(expression, name: str):
+    """Return a copy of expression that reads the text of the named field,
+    rather than its compressed bytes.
+    """
+
+    if isinstance(expression, models.F):
+        if expression.name == name:
+            return Decompress(expression)
+        return expression
+    if not hasattr(expression, "get_source_expressions"):
+        return expression
+    expression = expression.copy()
+    expression.set_source_expressions(
+        [
+            decompress_references(source, name)
+            for source in expression.get_source_expressions()
+        ]
+    )
+    return expression
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Decompress the value the first time it's used.
+
+    This has to be a data descriptor, so it's used even once the value is in
+    the instance's __dict__.
+    """
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, CompressedText):
+            value = instance.__dict__[self.field.attname] = decompress(value)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    descriptor_class = CompressedTextDescriptor
+
+    def __init__(self, *args, min_length: int = 4096, **kwargs):
+        self.min_length = min_length
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.min_length != 4096:
+            kwargs["min_length"] = self.min_length
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, bytes):
+            return CompressedText(value)
+        return value
+
+    def to_python(self, value):
+        if isinstance(value, bytes):
+            return decompress(value)
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Read the stored value, so an unchanged one isn't decompressed
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        # Deferred values are loaded
+        return super().pre_save(model_instance, add)
+
+    def get_prep_value(self, value):
+        if isinstance(value, CompressedText):
+            return bytes(value)
+        return compress_large(super().get_prep_value(value), self.min_length)
+
+    def value_to_string(self, obj):
+        return decompress(self.value_from_object(obj))
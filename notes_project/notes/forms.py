@@ -1,5 +1,20 @@
 from django import forms
+from notes.models import Note
 
 
 class SearchForm(forms.Form):
-    q = forms.CharField(max_length=140, required=False, label="Search")
+    q = forms.CharField(
+        max_length=140,
+        required=False,
+        label="Search",
+        # Suggestions are filled in by notes/autocomplete.js
+        widget=forms.TextInput(
+            attrs={"list": "note-title-suggestions", "autocomplete": "off"}
+        ),
+    )
+
+
+class NoteForm(forms.ModelForm):
+    class Meta:
+        model = Note
+        fields = ("title", "content")
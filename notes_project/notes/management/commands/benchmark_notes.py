@@ -0,0 +1,168 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from notes import benchmarks
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the notes pages against a seeded dataset, in a separate "
+        "test database. Reports latency percentiles and query counts, and "
+        "fails if they regress past the stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--notes",
+            type=int,
+            default=1000,
+            help="Number of notes to seed, e.g. 1000, 100000 or 1000000.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=100,
+            help="Number of users to spread the notes over.",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=50,
+            help="Number of measured requests per scenario.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=[
+                "list",
+                "list_next_page",
+                "list_search",
+                "detail",
+                "create",
+                "update",
+                "delete",
+            ],
+            help="Only run this scenario. Can be given more than once.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the results to this JSON file.",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=settings.BASE_DIR / "benchmarks" / "baseline.json",
+            help="Baseline JSON file to compare the results with.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Fraction that p95 latency can exceed the baseline by "
+            "before it counts as a regression (default 0.25).",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Save the results as the new baseline.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database, and reuse it if it already "
+            "has the requested dataset. Only useful when the database's TEST "
+            "NAME is a file.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 2:
+            raise CommandError("--iterations must be at least 2.")
+        if options["users"] < 1 or options["notes"] < options["users"]:
+            raise CommandError("Every user needs at least one note.")
+
+        setup_test_environment()
+        # Every alias gets a test database, so shards and replicas aren't
+        # written to when users are deleted and seeded
+        old_config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            keepdb=options["keepdb"],
+            serialized_aliases=(),
+        )
+        try:
+            results = self.benchmark(options)
+        finally:
+            teardown_databases(
+                old_config, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        for name, result in results["scenarios"].items():
+            self.stdout.write(
+                f"{name:<16} p50 {result['p50_ms']:>8.2f} ms  "
+                f"p95 {result['p95_ms']:>8.2f} ms  "
+                f"p99 {result['p99_ms']:>8.2f} ms  "
+                f"{result['queries']:>3} queries"
+            )
+        if options["output"]:
+            benchmarks.dump(results, options["output"])
+        if options["update_baseline"]:
+            benchmarks.dump(results, options["baseline"])
+            self.stdout.write(f"Saved the baseline to {options['baseline']}.")
+            return
+        self.compare(results, options)
+
+    def benchmark(self, options) -> dict:
+        dataset = {"notes": options["notes"], "users": options["users"]}
+        if Note.objects.count() != options["notes"]:
+            started = time.perf_counter()
+            Note.objects.all().delete()
+            User.objects.all().delete()
+            benchmarks.seed(**dataset)
+            self.stderr.write(
+                f"Seeded {options['notes']} notes in "
+                f"{time.perf_counter() - started:.1f} s."
+            )
+
+        user = User.objects.order_by("pk").first()
+        benchmark = benchmarks.Benchmark(user, options["iterations"])
+        return {
+            "dataset": dataset,
+            "environment": benchmarks.environment(),
+            "scenarios": benchmark.run(options["scenarios"]),
+        }
+
+    def compare(self, results, options):
+        try:
+            baseline = benchmarks.load(options["baseline"])
+        except FileNotFoundError:
+            self.stderr.write("There is no baseline to compare with.")
+            return
+        if baseline["dataset"] != results["dataset"]:
+            self.stderr.write(
+                "The baseline is for a different dataset "
+                f"({baseline['dataset']}), so it wasn't compared."
+            )
+            return
+
+        if options["iterations"] < benchmarks.MIN_LATENCY_ITERATIONS:
+            self.stderr.write(
+                "Only query counts were compared, as latency needs at least "
+                f"{benchmarks.MIN_LATENCY_ITERATIONS} iterations."
+            )
+        if regressions := benchmarks.compare(
+            results, baseline, options["threshold"]
+        ):
+            raise CommandError(
+                "Performance regressed:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
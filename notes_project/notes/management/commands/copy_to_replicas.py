@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database to each replica in "
+        "DATABASE_REPLICAS. Real replicas are kept up to date by the "
+        "database; this stands in for that when testing locally."
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Only SQLite databases can be copied.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas are configured.")
+
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            # Close Django's connection so it doesn't see a half-made copy
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict["NAME"])
+            try:
+                # The backup API copies a consistent snapshot, even while the
+                # primary is being written to
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"Copied the primary to {alias}.")
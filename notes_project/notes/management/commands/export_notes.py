@@ -0,0 +1,75 @@
+import json
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from notes.fields import decompress
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        "Export notes as newline-delimited JSON, one note per line. Notes are "
+        "read in chunks, so memory use doesn't grow with the number of notes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output",
+            nargs="?",
+            default="-",
+            help="File to write to, or - for standard output (the default).",
+        )
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            metavar="USERNAME",
+            help="Only export notes for this user. Can be given more than "
+            "once.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of notes to read from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        # Users are in the default database, so they can't be joined to notes
+        # on other shards
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        self.usernames = dict(users.values_list("pk", "username"))
+
+        notes = Note.objects.order_by("pk").values(
+            "user_id", "title", "content", "created", "modified"
+        )
+        if options["usernames"]:
+            notes = notes.filter(user_id__in=self.usernames)
+
+        if options["output"] == "-":
+            count = self.export(notes, self.stdout, options)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                count = self.export(notes, output, options)
+
+        self.stderr.write(f"Exported {count} notes.")
+
+    def export(self, notes, output, options) -> int:
+        chunk_size = options["chunk_size"]
+        count = 0
+        rows = chain.from_iterable(
+            notes.on_shard(alias).iterator(chunk_size=chunk_size)
+            for alias in settings.NOTES_SHARDS
+        )
+        for count, note in enumerate(rows, start=1):
+            note["user"] = self.usernames[note.pop("user_id")]
+            note["content"] = decompress(note["content"])
+            output.write(json.dumps(note, cls=DjangoJSONEncoder) + "\n")
+            if options["verbosity"] > 1 and count % chunk_size == 0:
+                self.stderr.write(f"Exported {count} notes...")
+        return count
@@ -0,0 +1,109 @@
+import json
+import sys
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from notes.cache import note_list_cache
+from notes.models import Note, keep_timestamps
+
+
+class Command(BaseCommand):
+    help = (
+        "Import notes from newline-delimited JSON, as written by export_notes. "
+        "Notes are inserted in batches, so memory use doesn't grow with the "
+        "number of notes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input",
+            nargs="?",
+            default="-",
+            help="File to read from, or - for standard input (the default).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of notes to insert at a time.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        if options["input"] == "-":
+            count = self.import_notes(sys.stdin, options)
+        else:
+            with open(options["input"], encoding="utf-8") as input_file:
+                count = self.import_notes(input_file, options)
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} notes."))
+
+    def import_notes(self, lines, options) -> int:
+        self.user_ids = {}
+        rows = (
+            (number, line)
+            for number, line in enumerate(lines, start=1)
+            if line.strip()
+        )
+        count = 0
+        while batch := list(islice(rows, options["batch_size"])):
+            notes = self.build_notes(batch)
+            with keep_timestamps():
+                Note.objects.bulk_create(notes)
+            # bulk_create doesn't send the signals that normally do this
+            for user_id in {note.user_id for note in notes}:
+                note_list_cache.bump_version(user_id)
+
+            count += len(notes)
+            if options["verbosity"] > 0:
+                self.stderr.write(f"Imported {count} notes...")
+        return count
+
+    def build_notes(self, batch: list) -> list:
+        records = []
+        for number, line in batch:
+            try:
+                record = json.loads(line)
+                records.append((number, record, record["user"]))
+            except (ValueError, TypeError, KeyError):
+                raise CommandError(f"Line {number} is not a valid note.")
+
+        self.resolve_users({username for _, _, username in records})
+
+        notes = []
+        for number, record, username in records:
+            if username not in self.user_ids:
+                raise CommandError(
+                    f"Line {number}: user '{username}' does not exist."
+                )
+            try:
+                created = parse_datetime(record["created"])
+                modified = record.get("modified")
+                notes.append(
+                    Note(
+                        user_id=self.user_ids[username],
+                        title=record["title"],
+                        content=record.get("content", ""),
+                        created=created,
+                        modified=modified and parse_datetime(modified),
+                    )
+                )
+            except (ValueError, TypeError, KeyError):
+                raise CommandError(f"Line {number} is not a valid note.")
+            if created is None:
+                raise CommandError(f"Line {number} has an invalid created.")
+        return notes
+
+    def resolve_users(self, usernames: set):
+        """Look up the ids of usernames that haven't been seen yet."""
+
+        if unknown := usernames - self.user_ids.keys():
+            self.user_ids.update(
+                User.objects.filter(username__in=unknown).values_list(
+                    "username", "pk"
+                )
+            )
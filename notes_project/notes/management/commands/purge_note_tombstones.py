@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from notes.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones of notes deleted more than "
+        "NOTES_SYNC_TOMBSTONE_DAYS ago, from every shard. Clients that last "
+        "synced before them will have to sync from the start."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Keep tombstones this many days old or newer, instead.",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is not None and days < 0:
+            raise CommandError("--days can't be negative.")
+        count = sum(
+            purge_tombstones(alias, days) for alias in settings.NOTES_SHARDS
+        )
+        self.stdout.write(f"Deleted {count} tombstones.")
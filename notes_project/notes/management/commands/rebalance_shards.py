@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from notes.models import UserShard
+from notes.sharding import get_shard, hash_shard, move_user_notes
+
+
+class Command(BaseCommand):
+    help = (
+        "Move users' notes between shards while the site is running. By "
+        "default every user is moved to the shard their id hashes to, which "
+        "spreads users over shards that have just been added."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            metavar="USERNAME",
+            help="Users to move. Defaults to every user with notes.",
+        )
+        parser.add_argument(
+            "--from",
+            dest="source",
+            metavar="SHARD",
+            help="Only move users whose notes are on this shard.",
+        )
+        parser.add_argument(
+            "--to",
+            dest="target",
+            metavar="SHARD",
+            help="Move users to this shard, rather than the shard their id "
+            "hashes to.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of notes to copy at a time.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the users that would be moved without moving them.",
+        )
+
+    def handle(self, *args, **options):
+        shards = settings.NOTES_SHARDS
+        for option in ("source", "target"):
+            if options[option] and options[option] not in shards:
+                raise CommandError(f"'{options[option]}' is not a shard.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        moved = failed = 0
+        for user_id, username in self.get_users(options["usernames"]):
+            result = self.move_user(user_id, username, options)
+            moved += result is True
+            failed += result is False
+
+        if not options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Moved {moved} users."))
+        if failed:
+            raise CommandError(
+                f"{failed} users could not be moved. Try again."
+            )
+
+    def move_user(self, user_id: int, username: str, options) -> bool | None:
+        """Move a user's notes and report it. Returns whether they were
+        moved, or None if they didn't need to be or it's a dry run.
+        """
+
+        source = get_shard(user_id)
+        target = options["target"] or hash_shard(user_id)
+        if source == target or options["source"] not in (None, source):
+            return None
+
+        if options["dry_run"]:
+            self.stdout.write(f"Would move {username}: {source} -> {target}")
+            return None
+        try:
+            count = move_user_notes(
+                user_id, target, batch_size=options["batch_size"]
+            )
+        except DatabaseError as error:
+            # Usually a write to the user's notes during the move
+            self.stderr.write(f"Could not move {username}: {error}")
+            return False
+        self.stdout.write(
+            f"Moved {count} notes for {username}: {source} -> {target}"
+        )
+        return True
+
+    def get_users(self, usernames: list):
+        if not usernames:
+            # Users without a shard have no notes to move. Read them all
+            # first, as moving them writes to the same table
+            return list(
+                UserShard.objects.order_by("user_id").values_list(
+                    "user_id", "user__username"
+                )
+            )
+
+        users = dict(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", "pk"
+            )
+        )
+        if missing := sorted(set(usernames) - users.keys()):
+            raise CommandError(f"Unknown users: {', '.join(missing)}")
+        return [(users[username], username) for username in usernames]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.9 on 2026-10-17 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0002_alter_note_title"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["user", "-created", "-id"],
+                name="note_user_created_id_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-17 07:38
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+
+
+def fill_previews(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+    Note.objects.using(schema_editor.connection.alias).update(
+        preview=Case(
+            When(
+                GreaterThan(Length("content"), 180),
+                then=Concat(Substr("content", 1, 177), Value("...")),
+            ),
+            default=F("content"),
+            output_field=models.CharField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0003_note_user_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="note",
+            name="preview",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=180,
+                verbose_name="Preview",
+            ),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
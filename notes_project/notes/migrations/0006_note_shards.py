@@ -0,0 +1,92 @@
+# Generated by Django 4.2.9 on 2026-10-17 08:01
+
+import importlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+fts = importlib.import_module("notes.migrations.0005_note_fts")
+
+
+def recreate_search_triggers(apps, schema_editor):
+    # Altering the user field remakes the notes table on SQLite, which drops
+    # the triggers that keep the search index up to date
+    connection = schema_editor.connection
+    if "notes_note_fts" in connection.introspection.table_names():
+        for statement in fts.FORWARD_SQL:
+            if "CREATE TRIGGER" in statement:
+                schema_editor.execute(
+                    statement.replace(
+                        "CREATE TRIGGER", "CREATE TRIGGER IF NOT EXISTS"
+                    )
+                )
+
+
+def map_existing_users(apps, schema_editor):
+    # Existing notes are all in the default database
+    alias = schema_editor.connection.alias
+    if alias != "default":
+        return
+    Note = apps.get_model("notes", "Note")
+    UserShard = apps.get_model("notes", "UserShard")
+    UserShard.objects.using(alias).bulk_create(
+        [
+            UserShard(user_id=user_id, shard=alias)
+            for user_id in Note.objects.using(alias)
+            .values_list("user_id", flat=True)
+            .distinct()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("notes", "0005_note_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserShard",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="note_shard",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+                (
+                    "shard",
+                    models.CharField(max_length=100, verbose_name="Shard"),
+                ),
+            ],
+            options={
+                "verbose_name": "User shard",
+            },
+        ),
+        migrations.RunPython(
+            migrations.RunPython.noop, recreate_search_triggers
+        ),
+        migrations.AlterField(
+            model_name="note",
+            name="user",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="notes",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="User",
+            ),
+        ),
+        migrations.RunPython(
+            recreate_search_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(map_existing_users, migrations.RunPython.noop),
+    ]
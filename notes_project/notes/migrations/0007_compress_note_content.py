@@ -0,0 +1,123 @@
+# Generated by Django 4.2.9 on 2026-10-17 08:22
+
+import importlib
+
+import notes.fields
+from django.db import migrations
+from django.db.models import CharField, Func
+from django.db.models.functions import Length
+from notes.fields import decompress
+
+fts = importlib.import_module("notes.migrations.0005_note_fts")
+
+BATCH_SIZE = 500
+
+# The search index triggers, indexing the text of compressed content
+SEARCH_TRIGGER_SQL = [
+    statement.replace("new.content", "notes_decompress(new.content)").replace(
+        "old.content", "notes_decompress(old.content)"
+    )
+    for statement in fts.FORWARD_SQL
+    if "CREATE TRIGGER" in statement
+]
+
+
+def replace_search_triggers(schema_editor, statements):
+    connection = schema_editor.connection
+    if "notes_note_fts" not in connection.introspection.table_names():
+        return
+    for statement in fts.REVERSE_SQL:
+        if "DROP TRIGGER" in statement:
+            schema_editor.execute(statement)
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def recreate_search_triggers(apps, schema_editor):
+    # Altering the content field remakes the notes table on SQLite, which
+    # drops the triggers
+    replace_search_triggers(schema_editor, SEARCH_TRIGGER_SQL)
+
+
+def restore_plain_search_triggers(apps, schema_editor):
+    replace_search_triggers(
+        schema_editor,
+        [s for s in fts.FORWARD_SQL if "CREATE TRIGGER" in s],
+    )
+
+
+def stored_notes(apps, schema_editor, storage: str):
+    """Return the notes whose content is stored as storage ("text" or
+    "blob"), by id.
+    """
+
+    Note = apps.get_model("notes", "Note")
+    return (
+        Note.objects.using(schema_editor.connection.alias)
+        .alias(
+            storage=Func(
+                "content", function="typeof", output_field=CharField()
+            )
+        )
+        .filter(storage=storage)
+        .order_by("pk")
+    )
+
+
+def update_content(schema_editor, notes, convert):
+    """Rewrite the stored content of notes in batches, bypassing the field,
+    so modified times are kept.
+    """
+
+    last_pk = 0
+    while batch := list(
+        notes.filter(pk__gt=last_pk).values_list("pk", "content")[:BATCH_SIZE]
+    ):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                "UPDATE notes_note SET content = %s WHERE id = %s",
+                [(convert(content), pk) for pk, content in batch],
+            )
+        last_pk = batch[-1][0]
+
+
+def compress_content(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    field = apps.get_model("notes", "Note")._meta.get_field("content")
+    notes = (
+        stored_notes(apps, schema_editor, "text")
+        .alias(length=Length("content"))
+        .filter(length__gte=field.min_length)
+    )
+    update_content(schema_editor, notes, field.get_prep_value)
+
+
+def decompress_content(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    notes = stored_notes(apps, schema_editor, "blob")
+    update_content(schema_editor, notes, decompress)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0006_note_shards"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_plain_search_triggers
+        ),
+        migrations.AlterField(
+            model_name="note",
+            name="content",
+            field=notes.fields.CompressedTextField(
+                blank=True, verbose_name="Content"
+            ),
+        ),
+        migrations.RunPython(
+            recreate_search_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(compress_content, decompress_content),
+    ]
@@ -0,0 +1,202 @@
+# Generated by Django 4.2.9 on 2026-10-17 08:27
+
+import importlib
+
+from django.db import migrations, models
+
+compression = importlib.import_module(
+    "notes.migrations.0007_compress_note_content"
+)
+
+# Number every write to a user's notes, and keep tombstones of deletes. See
+# notes.sync
+BUMP_COUNTER_SQL = """
+    INSERT INTO notes_notechangecounter (user_id, seq, purged_seq)
+    VALUES ({user}, 1, 0)
+    ON CONFLICT (user_id) DO UPDATE SET seq = seq + 1;
+"""
+COUNTER_SQL = (
+    "(SELECT seq FROM notes_notechangecounter WHERE user_id = {user})"
+)
+TOMBSTONE_SQL = f"""
+    INSERT INTO notes_notetombstone (user_id, note_id, change_seq, deleted)
+    VALUES (
+        old.user_id,
+        old.id,
+        {COUNTER_SQL.format(user="old.user_id")},
+        strftime('%Y-%m-%d %H:%M:%f', 'now')
+    );
+"""
+SET_CHANGE_SQL = f"""
+    UPDATE notes_note SET change_seq = {COUNTER_SQL.format(user="new.user_id")}
+    WHERE id = new.id;
+"""
+
+SYNC_TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER notes_note_sync_insert AFTER INSERT ON notes_note BEGIN
+        {BUMP_COUNTER_SQL.format(user="new.user_id")}
+        {SET_CHANGE_SQL}
+    END
+    """,
+    # change_seq isn't listed, so setting it doesn't fire this again
+    f"""
+    CREATE TRIGGER notes_note_sync_update
+    AFTER UPDATE OF title, content, preview, created, modified, user_id
+    ON notes_note BEGIN
+        {BUMP_COUNTER_SQL.format(user="new.user_id")}
+        {SET_CHANGE_SQL}
+    END
+    """,
+    # To the note's old user, a note given to someone else was deleted
+    f"""
+    CREATE TRIGGER notes_note_sync_reassign AFTER UPDATE OF user_id
+    ON notes_note WHEN old.user_id <> new.user_id BEGIN
+        {BUMP_COUNTER_SQL.format(user="old.user_id")}
+        {TOMBSTONE_SQL}
+    END
+    """,
+    f"""
+    CREATE TRIGGER notes_note_sync_delete AFTER DELETE ON notes_note BEGIN
+        {BUMP_COUNTER_SQL.format(user="old.user_id")}
+        {TOMBSTONE_SQL}
+    END
+    """,
+]
+SYNC_TRIGGER_NAMES = [
+    "notes_note_sync_insert",
+    "notes_note_sync_update",
+    "notes_note_sync_reassign",
+    "notes_note_sync_delete",
+]
+
+# Existing notes are numbered in id order
+NUMBER_NOTES_SQL = [
+    """
+    WITH numbered AS (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY id
+        ) AS seq
+        FROM notes_note
+    )
+    UPDATE notes_note SET change_seq = numbered.seq
+    FROM numbered WHERE numbered.id = notes_note.id
+    """,
+    """
+    INSERT INTO notes_notechangecounter (user_id, seq, purged_seq)
+    SELECT user_id, MAX(change_seq), 0 FROM notes_note GROUP BY user_id
+    """,
+]
+
+
+def recreate_triggers(apps, schema_editor):
+    """Recreate the search and sync triggers on notes_note.
+
+    Migrations that remake the notes table on SQLite drop its triggers, and
+    should run this afterwards.
+    """
+
+    compression.recreate_search_triggers(apps, schema_editor)
+    if schema_editor.connection.vendor == "sqlite":
+        drop_sync_triggers(apps, schema_editor)
+        for statement in SYNC_TRIGGER_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for name in SYNC_TRIGGER_NAMES:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def number_existing_notes(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in NUMBER_NOTES_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0007_compress_note_content"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NoteChangeCounter",
+            fields=[
+                (
+                    "user_id",
+                    models.BigIntegerField(
+                        primary_key=True, serialize=False, verbose_name="User"
+                    ),
+                ),
+                (
+                    "seq",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Last change"
+                    ),
+                ),
+                (
+                    "purged_seq",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Purged changes"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Note change counter",
+            },
+        ),
+        migrations.CreateModel(
+            name="NoteTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.BigIntegerField(verbose_name="User")),
+                ("note_id", models.BigIntegerField(verbose_name="Note")),
+                ("change_seq", models.BigIntegerField(verbose_name="Change")),
+                ("deleted", models.DateTimeField(verbose_name="Deleted")),
+            ],
+            options={
+                "verbose_name": "Note tombstone",
+            },
+        ),
+        migrations.RunPython(
+            migrations.RunPython.noop, compression.recreate_search_triggers
+        ),
+        migrations.AddField(
+            model_name="note",
+            name="change_seq",
+            field=models.BigIntegerField(
+                default=0, editable=False, verbose_name="Change"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["user", "change_seq"], name="note_user_change_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notetombstone",
+            index=models.Index(
+                fields=["user_id", "change_seq"],
+                name="tombstone_user_change_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notetombstone",
+            index=models.Index(
+                fields=["deleted"], name="tombstone_deleted_idx"
+            ),
+        ),
+        migrations.RunPython(number_existing_notes, migrations.RunPython.noop),
+        migrations.RunPython(recreate_triggers, drop_sync_triggers),
+    ]
@@ -0,0 +1,148 @@
+import importlib
+
+from django.db import migrations
+
+fts = importlib.import_module("notes.migrations.0005_note_fts")
+compression = importlib.import_module(
+    "notes.migrations.0007_compress_note_content"
+)
+sync = importlib.import_module("notes.migrations.0008_note_sync")
+
+# The owner column holds a "u<user id>" token, so a search is limited to one
+# user's notes by the index rather than by checking every match's user_id
+SEARCH_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE notes_note_fts USING fts5(
+        title,
+        content,
+        owner,
+        content='notes_note',
+        content_rowid='id',
+        prefix='2 3'
+    )
+    """,
+    # Matches in the title count for more than matches in the content, and
+    # the owner doesn't count
+    """
+    INSERT INTO notes_note_fts(notes_note_fts, rank)
+    VALUES ('rank', 'bm25(10.0, 1.0, 0.0)')
+    """,
+]
+SEARCH_TRIGGER_SQL = [
+    """
+    CREATE TRIGGER notes_note_fts_insert AFTER INSERT ON notes_note BEGIN
+        INSERT INTO notes_note_fts(rowid, title, content, owner)
+        VALUES (
+            new.id,
+            new.title,
+            notes_decompress(new.content),
+            'u' || new.user_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER notes_note_fts_delete AFTER DELETE ON notes_note BEGIN
+        INSERT INTO notes_note_fts(
+            notes_note_fts, rowid, title, content, owner
+        )
+        VALUES (
+            'delete',
+            old.id,
+            old.title,
+            notes_decompress(old.content),
+            'u' || old.user_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER notes_note_fts_update
+    AFTER UPDATE OF title, content, user_id ON notes_note BEGIN
+        INSERT INTO notes_note_fts(
+            notes_note_fts, rowid, title, content, owner
+        )
+        VALUES (
+            'delete',
+            old.id,
+            old.title,
+            notes_decompress(old.content),
+            'u' || old.user_id
+        );
+        INSERT INTO notes_note_fts(rowid, title, content, owner)
+        VALUES (
+            new.id,
+            new.title,
+            notes_decompress(new.content),
+            'u' || new.user_id
+        );
+    END
+    """,
+]
+# The owner column isn't in notes_note, so FTS5's 'rebuild' can't be used
+INDEX_NOTES_SQL = """
+    INSERT INTO notes_note_fts(rowid, title, content, owner)
+    SELECT id, title, notes_decompress(content), 'u' || user_id
+    FROM notes_note
+"""
+PLAIN_INDEX_NOTES_SQL = """
+    INSERT INTO notes_note_fts(rowid, title, content, user_id)
+    SELECT id, title, notes_decompress(content), user_id FROM notes_note
+"""
+
+
+def has_search_index(schema_editor) -> bool:
+    connection = schema_editor.connection
+    return "notes_note_fts" in connection.introspection.table_names()
+
+
+def replace_search_index(schema_editor, statements):
+    if not has_search_index(schema_editor):
+        return
+    for statement in fts.REVERSE_SQL:
+        schema_editor.execute(statement)
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def index_owners(apps, schema_editor):
+    replace_search_index(
+        schema_editor,
+        [*SEARCH_INDEX_SQL, *SEARCH_TRIGGER_SQL, INDEX_NOTES_SQL],
+    )
+
+
+def unindex_owners(apps, schema_editor):
+    replace_search_index(
+        schema_editor,
+        [
+            # The table and its rank function
+            *fts.FORWARD_SQL[:2],
+            *compression.SEARCH_TRIGGER_SQL,
+            PLAIN_INDEX_NOTES_SQL,
+        ],
+    )
+
+
+def recreate_triggers(apps, schema_editor):
+    """Recreate the search and sync triggers on notes_note.
+
+    Migrations that remake the notes table on SQLite drop its triggers, and
+    should run this afterwards, in place of the one in migration 0008.
+    """
+
+    sync.recreate_triggers(apps, schema_editor)
+    if has_search_index(schema_editor):
+        for statement in fts.REVERSE_SQL:
+            if "DROP TRIGGER" in statement:
+                schema_editor.execute(statement)
+        for statement in SEARCH_TRIGGER_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0008_note_sync"),
+    ]
+
+    operations = [
+        migrations.RunPython(index_owners, unindex_owners),
+    ]
@@ -1,6 +1,126 @@
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import Case, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
 from django.urls import reverse
+from notes.fields import (
+    Compress,
+    CompressedText,
+    CompressedTextField,
+    decompress_references,
+)
+
+PREVIEW_LENGTH = 180
+
+
+def make_preview(content: str) -> str:
+    """Shorten note content to at most PREVIEW_LENGTH characters."""
+
+    if len(content) > PREVIEW_LENGTH:
+        return content[: PREVIEW_LENGTH - 3] + "..."
+    return content
+
+
+def content_changed(note) -> bool:
+    """Return True if a note's content is loaded and may have changed.
+
+    Content that's still compressed as it was read from the database hasn't
+    changed, so its preview is up to date.
+    """
+
+    return not isinstance(
+        note.__dict__.get("content", CompressedText()), CompressedText
+    )
+
+
+def preview_expression(content):
+    """Database-side equivalent of make_preview for query expressions."""
+
+    return Case(
+        When(
+            GreaterThan(Length(content), PREVIEW_LENGTH),
+            then=Concat(Substr(content, 1, PREVIEW_LENGTH - 3), Value("...")),
+        ),
+        default=content,
+        output_field=models.CharField(),
+    )
+
+
+class NoteQuerySet(models.QuerySet):
+    """Keep the denormalized preview column in sync on bulk writes, and
+    route notes to their user's shard (see notes.sharding).
+    """
+
+    def for_user(self, user):
+        """Return the user's notes, from the shard that holds them."""
+
+        from notes.sharding import get_shard
+
+        return self.on_shard(get_shard(user.pk)).filter(user=user)
+
+    def on_shard(self, alias: str):
+        # Queries on the default database are left to the routers, so that
+        # reads can go to replicas
+        if alias == DEFAULT_DB_ALIAS:
+            return self.all()
+        return self.using(alias)
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        # Unless a database was chosen, saving routes the note to its user's
+        # shard
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            if content_changed(obj):
+                obj.preview = make_preview(obj.content)
+        if self._db is None and len(settings.NOTES_SHARDS) > 1:
+            from notes.sharding import get_shard
+
+            shards = defaultdict(list)
+            for obj in objs:
+                shards[get_shard(obj.user_id, assign=True)].append(obj)
+            for alias, shard_objs in shards.items():
+                self.using(alias).bulk_create(shard_objs, *args, **kwargs)
+            return objs
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        if "content" in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.preview = make_preview(obj.content)
+            if "preview" not in fields:
+                fields.append("preview")
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if "content" not in kwargs:
+            return super().update(**kwargs)
+        content = kwargs["content"]
+        if hasattr(content, "resolve_expression"):
+            # Expressions work on the text of compressed content, and their
+            # result is compressed like saved values are
+            content = decompress_references(content, "content")
+            kwargs["content"] = Compress(
+                content, self.model._meta.get_field("content").min_length
+            )
+            kwargs.setdefault("preview", preview_expression(content))
+        else:
+            kwargs.setdefault("preview", make_preview(content))
+        return super().update(**kwargs)
+
+    update.alters_data = True
 
 
 class Note(models.Model):
@@ -9,13 +129,24 @@ class Note(models.Model):
         on_delete=models.CASCADE,
         related_name="notes",
         verbose_name="User",
+        # Notes on other shards refer to users in the default database
+        db_constraint=False,
     )
     title = models.CharField("Title", max_length=140)
-    content = models.TextField("Content", blank=True)
+    # Large notes are stored compressed
+    content = CompressedTextField("Content", blank=True)
+    # Stored copy of preview_content so list pages don't need to load content
+    preview = models.CharField(
+        "Preview", max_length=PREVIEW_LENGTH, blank=True, editable=False
+    )
     created = models.DateTimeField("Created", blank=True, auto_now_add=True)
     modified = models.DateTimeField(
         "Modified", blank=True, null=True, auto_now=True
     )
+    # Set by a trigger on every write, see notes.sync
+    change_seq = models.BigIntegerField("Change", default=0, editable=False)
+
+    objects = NoteQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -23,13 +154,96 @@ class Note(models.Model):
     def get_absolute_url(self):
         return reverse("note-detail", kwargs={"pk": self.pk})
 
+    def save(self, *args, **kwargs):
+        if content_changed(self):
+            self.preview = make_preview(self.content)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "content" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "preview"}
+        super().save(*args, **kwargs)
+
     @property
     def preview_content(self):
         """Shorten the content shown on certain pages."""
 
-        if len(self.content) > 180:
-            return self.content[:177] + "..."
-        return self.content
+        return make_preview(self.content)
 
     class Meta:
         verbose_name = "Note"
+        indexes = [
+            # Backs the keyset pagination on the notes list page
+            models.Index(
+                fields=["user", "-created", "-id"],
+                name="note_user_created_id_idx",
+            ),
+            models.Index(
+                fields=["user", "change_seq"], name="note_user_change_idx"
+            ),
+        ]
+
+
+class UserShard(models.Model):
+    """The database that holds a user's notes. See notes.sharding."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="note_shard",
+        verbose_name="User",
+    )
+    shard = models.CharField("Shard", max_length=100)
+
+    class Meta:
+        verbose_name = "User shard"
+
+
+@contextmanager
+def keep_timestamps():
+    """Stop created and modified from being set to the current time."""
+
+    fields = [
+        Note._meta.get_field("created"),
+        Note._meta.get_field("modified"),
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class NoteChangeCounter(models.Model):
+    """The last change number given to a user's notes, on the shard that
+    holds them. See notes.sync.
+    """
+
+    user_id = models.BigIntegerField("User", primary_key=True)
+    seq = models.BigIntegerField("Last change", default=0)
+    # Clients that synced before this change must sync from the start again
+    purged_seq = models.BigIntegerField("Purged changes", default=0)
+
+    class Meta:
+        verbose_name = "Note change counter"
+
+
+class NoteTombstone(models.Model):
+    """A deleted note, kept for a while so clients can sync the deletion."""
+
+    user_id = models.BigIntegerField("User")
+    note_id = models.BigIntegerField("Note")
+    change_seq = models.BigIntegerField("Change")
+    deleted = models.DateTimeField("Deleted")
+
+    class Meta:
+        verbose_name = "Note tombstone"
+        indexes = [
+            models.Index(
+                fields=["user_id", "change_seq"],
+                name="tombstone_user_change_idx",
+            ),
+            models.Index(fields=["deleted"], name="tombstone_deleted_idx"),
+        ]
@@ -0,0 +1,140 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+
+from django.db.models.query import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(values: list) -> str:
+    """Encode a list of JSON-serializable key values as an opaque token."""
+
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> list | None:
+    """Decode a token made by encode_cursor, or None if it's invalid."""
+
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+@dataclass
+class KeysetPage:
+    object_list: list = field(default_factory=list)
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """Paginate a queryset from newest to oldest using (created, id) cursors.
+
+    Unlike OFFSET pagination, every page is a range seek on the
+    (user, -created, -id) index, so fetching page 1000 costs the same as
+    fetching page 1.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, after: str = None, before: str = None) -> KeysetPage:
+        if key := self._parse_key(before):
+            rows = list(self._before_queryset(*key))
+            if len(rows) > self.per_page:
+                return self._page_before(rows)
+            # We're back at the start, so show a full first page instead
+            after = None
+        key = self._parse_key(after)
+        return self._page_after(key, list(self._after_queryset(key)))
+
+    async def aget_page(
+        self, after: str = None, before: str = None
+    ) -> KeysetPage:
+        if key := self._parse_key(before):
+            rows = [note async for note in self._before_queryset(*key)]
+            if len(rows) > self.per_page:
+                return self._page_before(rows)
+            after = None
+        key = self._parse_key(after)
+        rows = [note async for note in self._after_queryset(key)]
+        return self._page_after(key, rows)
+
+    def _after_queryset(self, key) -> QuerySet:
+        queryset = self.queryset.order_by("-created", "-id")
+        if key:
+            created, pk = key
+            # The redundant created__lte lets SQLite seek into the index
+            # instead of scanning every newer row to evaluate the OR
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, id__lt=pk),
+                created__lte=created,
+            )
+        return queryset[: self.per_page + 1]
+
+    def _before_queryset(self, created, pk) -> QuerySet:
+        queryset = self.queryset.order_by("created", "id").filter(
+            Q(created__gt=created) | Q(created=created, id__gt=pk),
+            created__gte=created,
+        )
+        return queryset[: self.per_page + 1]
+
+    def _page_after(self, key, rows: list) -> KeysetPage:
+        notes = rows[: self.per_page]
+        return KeysetPage(
+            object_list=notes,
+            next_cursor=(
+                self._cursor(notes[-1]) if len(rows) > self.per_page else None
+            ),
+            previous_cursor=self._cursor(notes[0]) if key and notes else None,
+        )
+
+    def _page_before(self, rows: list) -> KeysetPage:
+        notes = rows[: self.per_page][::-1]
+        return KeysetPage(
+            object_list=notes,
+            next_cursor=self._cursor(notes[-1]),
+            previous_cursor=self._cursor(notes[0]),
+        )
+
+    @staticmethod
+    def _cursor(note) -> str:
+        return encode_cursor([note.created.isoformat(), note.pk])
+
+    @staticmethod
+    def _parse_key(token: str):
+        values = decode_cursor(token)
+        if not values or len(values) != 2:
+            return None
+        created, pk = values
+        if not isinstance(created, str) or not isinstance(pk, int):
+            return None
+        try:
+            created = parse_datetime(created)
+        except ValueError:
+            return None
+        if created is None:
+            return None
+        return created, pk
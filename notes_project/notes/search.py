@@ -0,0 +1,154 @@
+"""Full-text search for notes using an SQLite FTS5 index.
+
+The notes_note_fts virtual table is created by migration 0005 and kept up to
+date by triggers on notes_note, so bulk and queryset writes are indexed too.
+Databases without FTS5 support fall back to NoteListView's icontains search.
+
+Large note content is stored compressed (see notes.fields), so the triggers
+index notes_decompress(content). Migration 0009 adds an owner column with a
+"u<user id>" token, so searches are limited to a user's notes by the index.
+Neither is a notes_note column, so FTS5's 'rebuild' command mustn't be used.
+"""
+
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.query import QuerySet
+from notes.pagination import KeysetPage, decode_cursor, encode_cursor
+
+FTS_TABLE = "notes_note_fts"
+
+WORD_RE = re.compile(r"\w", re.UNICODE)
+
+
+def fts5_enabled(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Return True if the database has the notes full-text search index."""
+
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    enabled = getattr(connection, "notes_fts5_enabled", None)
+    if enabled is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = %s",
+                [FTS_TABLE],
+            )
+            enabled = cursor.fetchone() is not None
+        connection.notes_fts5_enabled = enabled
+    return enabled
+
+
+def build_match_expression(search_query: str) -> str:
+    """Build an FTS5 MATCH expression from a search query.
+
+    Like the icontains search, each group of characters separated by spaces
+    is a separate search item and a note matches if it matches any of them.
+    Items are prefix matched, so 'shop' finds 'shopping'. Items without any
+    word characters can't be indexed and are left out, so the result may be
+    an empty string.
+    """
+
+    items = [item for item in search_query.split() if WORD_RE.search(item)]
+    return " OR ".join(
+        '"{}"*'.format(item.replace('"', '""')) for item in items
+    )
+
+
+def note_match(match: str, user_id: int = None) -> str:
+    """Limit a MATCH expression to the notes' text, so the owner tokens
+    aren't searched, and to one user's notes if user_id is given.
+    """
+
+    match = f"{{title content}} : ({match})"
+    if user_id is not None:
+        match = f'owner : "u{user_id}" AND {match}'
+    return match
+
+
+class FullTextSearchPaginator:
+    """Paginate a user's search results from best to worst BM25 rank.
+
+    Pages are fetched with (rank, rowid) cursors straight from the FTS index,
+    so the cost of a page depends on the number of matches rather than the
+    total number of notes.
+    """
+
+    def __init__(self, queryset: QuerySet, match: str, user, per_page: int):
+        self.queryset = queryset
+        self.match = match
+        self.user = user
+        self.per_page = per_page
+
+    def get_page(self, after: str = None, before: str = None) -> KeysetPage:
+        if key := self._parse_key(before):
+            return self._page_before(*key)
+        return self._page_after(self._parse_key(after))
+
+    async def aget_page(
+        self, after: str = None, before: str = None
+    ) -> KeysetPage:
+        # FTS queries are raw SQL, which the async ORM doesn't cover
+        return await sync_to_async(self.get_page)(after=after, before=before)
+
+    def _page_after(self, key) -> KeysetPage:
+        rows = self._fetch(key, reverse=False)
+        hits = rows[: self.per_page]
+        return KeysetPage(
+            object_list=self._load(hits),
+            next_cursor=(
+                encode_cursor(list(hits[-1]))
+                if len(rows) > self.per_page
+                else None
+            ),
+            previous_cursor=(
+                encode_cursor(list(hits[0])) if key and hits else None
+            ),
+        )
+
+    def _page_before(self, rank, rowid) -> KeysetPage:
+        rows = self._fetch((rank, rowid), reverse=True)
+        if len(rows) <= self.per_page:
+            return self._page_after(None)
+        hits = rows[: self.per_page][::-1]
+        return KeysetPage(
+            object_list=self._load(hits),
+            next_cursor=encode_cursor(list(hits[-1])),
+            previous_cursor=encode_cursor(list(hits[0])),
+        )
+
+    def _fetch(self, key, reverse: bool) -> list:
+        sql = [
+            f"SELECT rowid, rank FROM {FTS_TABLE}",
+            f"WHERE {FTS_TABLE} MATCH %s",
+        ]
+        params = [note_match(self.match, self.user.pk)]
+        if key:
+            rank, rowid = key
+            op = "<" if reverse else ">"
+            sql.append(f"AND (rank {op} %s OR (rank = %s AND rowid {op} %s))")
+            params += [rank, rank, rowid]
+        direction = "DESC" if reverse else "ASC"
+        sql.append(f"ORDER BY rank {direction}, rowid {direction} LIMIT %s")
+        params.append(self.per_page + 1)
+
+        with connections[self.queryset.db].cursor() as cursor:
+            cursor.execute(" ".join(sql), params)
+            return [(rank, rowid) for rowid, rank in cursor.fetchall()]
+
+    def _load(self, hits: list) -> list:
+        pks = [rowid for _, rowid in hits]
+        notes = self.queryset.in_bulk(pks)
+        return [notes[pk] for pk in pks if pk in notes]
+
+    @staticmethod
+    def _parse_key(token: str):
+        values = decode_cursor(token)
+        if not values or len(values) != 2:
+            return None
+        rank, rowid = values
+        if not isinstance(rank, (int, float)) or not isinstance(rowid, int):
+            return None
+        return rank, rowid
@@ -0,0 +1,262 @@
+"""Spread notes across databases by user.
+
+Each user's notes live in one of the databases in settings.NOTES_SHARDS. The
+UserShard table in the default database records which one; users without a
+row are placed by a hash of their id, and get a row when they first write a
+note. Users, sessions and the shard map stay in the default database.
+
+Queries for a user's notes should use Note.objects.for_user(). Saving a
+note, Note.objects.create() and Note.objects.bulk_create() route notes to
+their user's shard, and find_notes() looks notes up by id on any shard.
+
+Every shard numbers its notes from its own range of ids, so ids are unique
+across shards and notes keep their ids when they're moved.
+
+The shard map is cached in NOTES_SHARD_CACHE_ALIAS, which must be a cache
+that every process shares, or a process could keep writing a moved user's
+notes to their old shard. With no alias, it isn't cached.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from notes.cache import note_list_cache
+from notes.models import Note, UserShard, keep_timestamps
+
+# Ids on the shard at position n in NOTES_SHARDS start from n * this
+SHARD_ID_STRIDE = 2**40
+
+
+def hash_shard(user_id: int) -> str:
+    """Return the shard that a user's id hashes to."""
+
+    shards = settings.NOTES_SHARDS
+    digest = hashlib.sha256(str(user_id).encode()).digest()
+    return shards[int.from_bytes(digest[:8], "big") % len(shards)]
+
+
+def get_shard(user_id: int, assign: bool = False) -> str:
+    """Return the alias of the database that holds a user's notes.
+
+    Pass assign=True before writing a note, to record the shard of users
+    who don't have one yet.
+    """
+
+    shards = settings.NOTES_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+
+    cache = _get_cache()
+    key = _cache_key(user_id)
+    shard = cache.get(key) if cache else None
+    if shard is None:
+        shard = (
+            UserShard.objects.using(DEFAULT_DB_ALIAS)
+            .filter(user_id=user_id)
+            .values_list("shard", flat=True)
+            .first()
+        )
+        if shard is None:
+            if not assign:
+                # The user has no notes yet
+                return hash_shard(user_id)
+            shard = (
+                UserShard.objects.using(DEFAULT_DB_ALIAS)
+                .get_or_create(
+                    user_id=user_id, defaults={"shard": hash_shard(user_id)}
+                )[0]
+                .shard
+            )
+        if cache:
+            cache.set(key, shard, timeout=settings.NOTES_SHARD_CACHE_TIMEOUT)
+    return shard
+
+
+def set_shard(user_id: int, shard: str):
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user_id, defaults={"shard": shard}
+    )
+    cache = _get_cache()
+    if not cache:
+        return
+    cache.delete(_cache_key(user_id))
+    # Again once the change is visible, in case the old shard was cached
+    # again in the meantime
+    transaction.on_commit(
+        lambda: cache.delete(_cache_key(user_id)), using=DEFAULT_DB_ALIAS
+    )
+
+
+def find_notes(pks, user_id: int = None) -> dict:
+    """Look up notes by id on every shard, starting with the user's own.
+
+    Returns a dict of notes by id, like in_bulk().
+    """
+
+    pks = set(pks)
+    shards = list(settings.NOTES_SHARDS)
+    if user_id is not None and len(shards) > 1:
+        shards.remove(own := get_shard(user_id))
+        shards.insert(0, own)
+
+    notes = {}
+    for alias in shards:
+        if missing := pks - notes.keys():
+            notes.update(Note.objects.on_shard(alias).in_bulk(missing))
+    return notes
+
+
+def move_user_notes(user_id: int, target: str, batch_size: int = 1000):
+    """Move a user's notes to another shard while the site is running.
+
+    The notes are copied in batches, and then anything that changed during
+    the copy is brought up to date in a transaction that switches the user's
+    shard and deletes the originals. Returns the number of notes moved.
+
+    On SQLite the final transaction fails, rolling back the move, if another
+    connection wrote to the source shard while it ran. It's safe to retry.
+    """
+
+    from notes.sync import forget_user, move_change_counter
+
+    source = get_shard(user_id, assign=True)
+    if source == target:
+        return 0
+    notes = Note.objects.filter(user_id=user_id)
+
+    # Clear out anything left by an earlier move that didn't finish
+    notes.using(target).delete()
+    _copy_notes(notes.using(source), target, batch_size)
+
+    # Target commits first, so the user's shard is only switched once their
+    # notes are there, and the source commits last, after the switch
+    with transaction.atomic(using=source), transaction.atomic(
+        using=DEFAULT_DB_ALIAS
+    ), transaction.atomic(using=target):
+        current = dict(
+            notes.using(source)
+            .select_for_update()
+            .values_list("pk", "modified")
+        )
+        copied = dict(notes.using(target).values_list("pk", "modified"))
+        stale = [
+            pk
+            for pk, modified in current.items()
+            if pk not in copied or copied[pk] != modified
+        ]
+        deleted = copied.keys() - current.keys()
+        notes.using(target).filter(pk__in=[*stale, *deleted]).delete()
+        for start in range(0, len(stale), batch_size):
+            stop = start + batch_size
+            _copy_notes(
+                notes.using(source).filter(pk__in=stale[start:stop]),
+                target,
+                batch_size,
+            )
+
+        move_change_counter(user_id, source, target)
+        set_shard(user_id, target)
+        notes.using(source).delete()
+        forget_user(user_id, source)
+
+    note_list_cache.bump_version(user_id)
+    return len(current)
+
+
+def _copy_notes(notes, target: str, batch_size: int):
+    """Copy notes to another shard, keeping their ids and timestamps."""
+
+    last_pk = 0
+    while batch := list(
+        notes.filter(pk__gt=last_pk).order_by("pk")[:batch_size]
+    ):
+        with keep_timestamps():
+            Note.objects.using(target).bulk_create(batch)
+        last_pk = batch[-1].pk
+
+
+def _get_cache():
+    alias = settings.NOTES_SHARD_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _cache_key(user_id: int) -> str:
+    return f"notes:shard:{user_id}"
+
+
+def reserve_note_ids(sender, using, **kwargs):
+    """Start note ids on each shard from the shard's own range.
+
+    Connected to post_migrate. Only SQLite is supported, where the next id
+    comes from the sqlite_sequence table.
+    """
+
+    shards = settings.NOTES_SHARDS
+    connection = connections[using]
+    if using not in shards or connection.vendor != "sqlite":
+        return
+    start = shards.index(using) * SHARD_ID_STRIDE
+    if not start:
+        return
+
+    table = Note._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = %s", [table]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                [table, start],
+            )
+        elif row[0] < start:
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = %s WHERE name = %s",
+                [start, table],
+            )
+
+
+class ShardRouter:
+    """Route notes to their user's shard, when the note or user is known.
+
+    Notes on the default database are left to the next router, so that reads
+    of them can go to replicas. Put this router first.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model is Note:
+            return self._shard_for(hints.get("instance"), assign=False)
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model is Note:
+            return self._shard_for(hints.get("instance"), assign=True)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Notes on any shard refer to users in the default database
+        if isinstance(obj1, Note) or isinstance(obj2, Note):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == "notes" and model_name == "usershard":
+            return db == DEFAULT_DB_ALIAS
+        return None
+
+    def _shard_for(self, instance, assign: bool):
+        if isinstance(instance, Note) and instance._state.db:
+            shard = instance._state.db
+        elif isinstance(instance, Note) and instance.user_id:
+            shard = get_shard(instance.user_id, assign)
+        elif isinstance(instance, User) and instance.pk:
+            shard = get_shard(instance.pk, assign)
+        else:
+            return None
+        if shard == DEFAULT_DB_ALIAS or shard not in settings.NOTES_SHARDS:
+            return None
+        return shard
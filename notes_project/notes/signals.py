@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from notes.cache import note_list_cache
+from notes.events import publish_note_event
+from notes.models import Note
+from notes.sync import forget_user
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def bump_note_list_cache_version(sender, instance, **kwargs):
+    note_list_cache.bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=Note)
+def publish_note_saved(sender, instance, created, **kwargs):
+    publish_note_event("created" if created else "updated", instance)
+
+
+@receiver(post_delete, sender=Note)
+def publish_note_deleted(sender, instance, **kwargs):
+    publish_note_event("deleted", instance)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_notes(sender, instance, **kwargs):
+    # Deleting a user only cascades to notes in the default database
+    for alias in settings.NOTES_SHARDS:
+        if alias != DEFAULT_DB_ALIAS:
+            Note.objects.using(alias).filter(user_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=User)
+def delete_sync_records(sender, instance, **kwargs):
+    # Deleting the user's notes left tombstones
+    for alias in settings.NOTES_SHARDS:
+        forget_user(instance.pk, alias)
@@ -0,0 +1,37 @@
+// Suggest note titles in the search box as the user types
+(function () {
+    const list = document.getElementById("note-title-suggestions");
+    const input = document.querySelector("input[list='note-title-suggestions']");
+    if (!list || !input) {
+        return;
+    }
+
+    let timer = null;
+    let request = null;
+
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(suggest, 100);
+    });
+
+    function suggest() {
+        if (request) {
+            request.abort();
+        }
+        const query = input.value.trim();
+        if (!query) {
+            list.replaceChildren();
+            return;
+        }
+        request = new AbortController();
+        const url = list.dataset.url + "?q=" + encodeURIComponent(query);
+        fetch(url, { signal: request.signal, credentials: "same-origin" })
+            .then((response) => response.json())
+            .then((data) => {
+                list.replaceChildren(
+                    ...data.results.map((note) => new Option(note.title))
+                );
+            })
+            .catch(() => {});
+    }
+})();
@@ -0,0 +1,138 @@
+"""Send clients the notes that changed since they last synced.
+
+Every write to a user's notes takes the next number from the user's
+NoteChangeCounter and stores it in the note's change_seq, and deleting a
+note leaves a NoteTombstone with its number. Triggers added by migration
+0008 do this, so bulk and queryset writes are numbered too. A client keeps
+the number it has synced up to as its change token, and asks for what's
+newer.
+
+SQLite has one writer at a time, so changes are committed in number order
+and a client can't miss one that commits late.
+
+Tombstones are purged after NOTES_SYNC_TOMBSTONE_DAYS. Clients whose token
+is older than the newest purged tombstone, or than a move to another shard,
+have to sync from the start again.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from notes.models import Note, NoteChangeCounter, NoteTombstone
+from notes.sharding import get_shard
+
+
+class ResyncRequired(Exception):
+    """The client's change token can't be used, and it must sync from 0."""
+
+
+def get_changes(user, since: int, limit: int) -> dict:
+    """Return up to limit notes and deleted note ids changed after since.
+
+    The result has the notes, the deleted ids, the token to ask for the next
+    changes with, and whether there are more.
+    """
+
+    shard = get_shard(user.pk)
+    # Reads go to the primary, without a transaction, which would take the
+    # write lock under the IMMEDIATE transaction mode. The counter is read
+    # first and the changes are capped at it, so changes made in between are
+    # left for the next sync
+    counter = (
+        NoteChangeCounter.objects.using(shard)
+        .filter(user_id=user.pk)
+        .values_list("seq", "purged_seq")
+        .first()
+    )
+    seq, purged_seq = counter or (0, 0)
+    if since > seq or 0 < since < purged_seq:
+        raise ResyncRequired
+    if since == seq:
+        return {"notes": [], "deleted": [], "token": seq, "more": False}
+
+    notes = (
+        Note.objects.using(shard)
+        .filter(user=user, change_seq__gt=since, change_seq__lte=seq)
+        .order_by("change_seq")[: limit + 1]
+    )
+    # A first sync doesn't need to know what was deleted
+    tombstones = (
+        NoteTombstone.objects.using(shard)
+        .filter(user_id=user.pk, change_seq__gt=since, change_seq__lte=seq)
+        .order_by("change_seq")[: limit + 1]
+        if since
+        else []
+    )
+    changes = list(
+        heapq.merge(notes, tombstones, key=lambda row: row.change_seq)
+    )
+
+    page = changes[:limit]
+    more = len(changes) > limit
+    return {
+        "notes": [row for row in page if isinstance(row, Note)],
+        "deleted": [
+            row.note_id for row in page if isinstance(row, NoteTombstone)
+        ],
+        # Changes newer than the counter weren't read
+        "token": page[-1].change_seq if more else seq,
+        "more": more,
+    }
+
+
+def purge_tombstones(alias: str, days: int = None) -> int:
+    """Delete tombstones older than days, NOTES_SYNC_TOMBSTONE_DAYS by
+    default, from a shard. Returns the number deleted.
+    """
+
+    if days is None:
+        days = settings.NOTES_SYNC_TOMBSTONE_DAYS
+    old = NoteTombstone.objects.using(alias).filter(
+        deleted__lt=timezone.now() - timedelta(days=days)
+    )
+    newest_purged = (
+        old.filter(user_id=OuterRef("user_id"))
+        .values("user_id")
+        .annotate(newest=Max("change_seq"))
+        .values("newest")
+    )
+    with transaction.atomic(using=alias):
+        NoteChangeCounter.objects.using(alias).filter(
+            user_id__in=old.values("user_id")
+        ).update(purged_seq=Greatest("purged_seq", Subquery(newest_purged)))
+        count, _ = old.delete()
+    return count
+
+
+def move_change_counter(user_id: int, source: str, target: str):
+    """Carry on a user's change numbers on the shard they're moving to.
+
+    The numbers on the target start after any used on either shard, and
+    clients that synced before the move have to sync from the start again,
+    since the target has no tombstones for what they might have missed.
+    """
+
+    counters = NoteChangeCounter.objects.filter(user_id=user_id)
+    seq = max(
+        [
+            *counters.using(source).values_list("seq", flat=True),
+            *counters.using(target).values_list("seq", flat=True),
+            0,
+        ]
+    )
+    NoteChangeCounter.objects.using(target).update_or_create(
+        user_id=user_id, defaults={"seq": seq + 1, "purged_seq": seq + 1}
+    )
+    NoteTombstone.objects.using(target).filter(user_id=user_id).delete()
+
+
+def forget_user(user_id: int, alias: str):
+    """Delete a user's change counter and tombstones from a shard."""
+
+    NoteChangeCounter.objects.using(alias).filter(user_id=user_id).delete()
+    NoteTombstone.objects.using(alias).filter(user_id=user_id).delete()
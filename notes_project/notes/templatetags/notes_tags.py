@@ -0,0 +1,38 @@
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+def note_row_cache_key(note) -> str:
+    """Rows are keyed by modified time, so editing a note replaces its row."""
+
+    modified = note.modified or note.created
+    return f"notes:row:{note.pk}:{int(modified.timestamp() * 1_000_000)}"
+
+
+@register.simple_tag
+def note_rows(notes):
+    """Render the note list rows, taking as many as possible from the cache.
+
+    All of the rows are fetched with a single get_many call, and any missing
+    ones are rendered and stored with a single set_many call.
+    """
+
+    cache = caches[settings.NOTES_CACHE_ALIAS]
+    keys = {note_row_cache_key(note): note for note in notes}
+    rows = cache.get_many(keys)
+
+    missing = {
+        key: render_to_string("notes/note_row.html", {"note": note})
+        for key, note in keys.items()
+        if key not in rows
+    }
+    if missing:
+        cache.set_many(missing, timeout=settings.NOTES_ROW_CACHE_TIMEOUT)
+        rows.update(missing)
+
+    return mark_safe("".join(rows[key] for key in keys))
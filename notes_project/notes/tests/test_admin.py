@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
+
+
+class NoteAdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin")
+        cls.user_1 = UserFactory(username="alice")
+        cls.user_2 = UserFactory(username="bob")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_list(self, query=""):
+        return self.client.get(f"/admin/notes/note/{query}").context["cl"]
+
+
+class NoteChangeListTest(NoteAdminTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            admin.site._registry[Note], "list_per_page", 2
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_follow_id_cursors_both_ways(self):
+        notes = NoteFactory.create_batch(5, user=self.user_1)[::-1]
+        cl = self.get_list()
+        assert cl.result_list == notes[:2]
+        assert cl.previous_url is None
+        cl = self.get_list(cl.next_url)
+        assert cl.result_list == notes[2:4]
+        cl = self.get_list(cl.next_url)
+        assert cl.result_list == notes[4:]
+        assert cl.next_url is None
+        cl = self.get_list(cl.previous_url)
+        assert cl.result_list == notes[2:4]
+
+    def test_later_pages_run_the_same_queries(self):
+        NoteFactory.create_batch(6, user=self.user_1)
+        with CaptureQueriesContext(connection) as first_page:
+            cl = self.get_list()
+        next_url = self.get_list(cl.next_url).next_url
+        with CaptureQueriesContext(connection) as later_page:
+            self.get_list(next_url)
+        assert len(later_page) == len(first_page)
+        assert not [
+            query
+            for query in later_page
+            if "OFFSET" in query["sql"]
+            or "LIMIT" not in query["sql"]
+            and "COUNT(*)" in query["sql"]
+        ]
+
+    @override_settings(NOTES_ADMIN_COUNT_LIMIT=3)
+    def test_counts_stop_at_the_limit(self):
+        NoteFactory.create_batch(5, user=self.user_1)
+        response = self.client.get("/admin/notes/note/")
+        cl = response.context["cl"]
+        assert (cl.result_count, cl.result_count_is_exact) == (3, False)
+        self.assertContains(response, "More than 3 Notes")
+        cl = self.get_list("?user=bob")
+        assert (cl.result_count, cl.result_count_is_exact) == (0, True)
+
+
+class NoteAdminFilterTest(NoteAdminTestCase):
+    def test_notes_can_be_filtered_by_username_or_id(self):
+        note = NoteFactory(user=self.user_2)
+        NoteFactory(user=self.user_1)
+        assert self.get_list("?user=bob").result_list == [note]
+        assert self.get_list(f"?user={self.user_2.pk}").result_list == [note]
+        assert self.get_list("?user=carol").result_list == []
+
+    def test_users_are_not_listed(self):
+        UserFactory.create_batch(3)
+        response = self.client.get("/admin/notes/note/")
+        self.assertNotContains(response, "?user=")
+        self.assertContains(response, 'placeholder="Username or id"')
+
+    def test_the_change_form_does_not_list_users(self):
+        note = NoteFactory(user=self.user_1)
+        response = self.client.get(f"/admin/notes/note/{note.pk}/change/")
+        self.assertNotContains(response, "<option")
+
+
+class NoteAdminSearchTest(NoteAdminTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.note_1 = NoteFactory(user=cls.user_1, title="Shopping list")
+        cls.note_2 = NoteFactory(user=cls.user_2, title="Holiday plans")
+
+    def search(self, term):
+        return self.get_list(f"?q={term}").result_list
+
+    def test_search_by_words_in_the_note(self):
+        assert self.search("shop") == [self.note_1]
+
+    def test_search_by_id_or_username(self):
+        assert self.search(self.note_2.pk) == [self.note_2]
+        assert self.search("alice") == [self.note_1]
+
+    def test_search_does_not_scan_with_like(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search("plans")
+        assert not [query for query in queries if "LIKE" in query["sql"]]
@@ -0,0 +1,311 @@
+import json
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from notes.api import note_version
+from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+
+    def setUp(self):
+        self.client.force_login(self.user_1)
+
+    def send(self, method, path, data=None):
+        if method == "get":
+            return self.client.get(path)
+        return getattr(self.client, method)(
+            path, json.dumps(data), content_type="application/json"
+        )
+
+
+class NoteListApiTest(ApiTestCase):
+    def test_list_returns_the_users_notes_without_content(self):
+        note = NoteFactory(user=self.user_1)
+        NoteFactory(user=self.user_2)
+        data = self.client.get("/api/notes/").json()
+        assert [item["id"] for item in data["results"]] == [note.pk]
+        assert "content" not in data["results"][0]
+
+    @override_settings(NOTES_PAGE_SIZE=1)
+    def test_list_is_paginated_with_cursors(self):
+        note_1, note_2 = NoteFactory.create_batch(2, user=self.user_1)
+        data = self.client.get("/api/notes/").json()
+        assert [item["id"] for item in data["results"]] == [note_2.pk]
+        data = self.client.get(f"/api/notes/?after={data['next']}").json()
+        assert [item["id"] for item in data["results"]] == [note_1.pk]
+
+    def test_create(self):
+        response = self.send("post", "/api/notes/", {"title": "a"})
+        assert response.status_code == 201
+        note = Note.objects.get()
+        assert note.user == self.user_1
+        assert response.json()["id"] == note.pk
+
+    def test_create_with_invalid_data(self):
+        response = self.send("post", "/api/notes/", {"title": ""})
+        assert response.status_code == 400
+        assert "title" in response.json()["errors"]
+        assert not Note.objects.exists()
+
+    def test_create_with_invalid_json(self):
+        response = self.client.post(
+            "/api/notes/", "{", content_type="application/json"
+        )
+        assert response.status_code == 400
+
+    def test_unauthenticated_requests_are_rejected(self):
+        response = Client().get("/api/notes/")
+        assert response.status_code == 401
+
+
+class NoteDetailApiTest(ApiTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.note_1 = NoteFactory(user=cls.user_1, title="a", content="b")
+        cls.note_2 = NoteFactory(user=cls.user_2)
+
+    def test_get(self):
+        data = self.client.get(f"/api/notes/{self.note_1.pk}/").json()
+        assert data["title"] == "a" and data["content"] == "b"
+
+    def test_partial_update_keeps_the_fields_that_are_not_given(self):
+        response = self.send(
+            "patch", f"/api/notes/{self.note_1.pk}/", {"content": "c"}
+        )
+        assert response.status_code == 200
+        self.note_1.refresh_from_db()
+        assert self.note_1.title == "a" and self.note_1.content == "c"
+
+    def test_delete(self):
+        response = self.client.delete(f"/api/notes/{self.note_1.pk}/")
+        assert response.status_code == 204
+        assert not Note.objects.filter(pk=self.note_1.pk).exists()
+
+    def test_notes_belonging_to_other_users_are_forbidden(self):
+        for method in ("get", "patch", "delete"):
+            response = self.send(method, f"/api/notes/{self.note_2.pk}/", {})
+            assert response.status_code == 403
+        assert Note.objects.filter(pk=self.note_2.pk).exists()
+
+    def test_notes_that_do_not_exist_are_not_found(self):
+        response = self.client.get("/api/notes/1000000/")
+        assert response.status_code == 404
+
+    def test_unsupported_methods_return_json(self):
+        response = self.send("put", f"/api/notes/{self.note_1.pk}/", {})
+        assert response.status_code == 405
+        assert response.json()["error"]
+
+
+class NoteBatchApiTest(ApiTestCase):
+    def test_batch_applies_every_operation(self):
+        to_update, to_delete = NoteFactory.create_batch(2, user=self.user_1)
+        response = self.send(
+            "post",
+            "/api/notes/batch/",
+            {
+                "create": [{"title": f"new {i}"} for i in range(200)],
+                "update": [{"id": to_update.pk, "content": "x" * 200}],
+                "delete": [to_delete.pk],
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["created"]) == 200
+        assert data["deleted"] == [to_delete.pk]
+        assert Note.objects.filter(title__startswith="new").count() == 200
+        to_update.refresh_from_db()
+        assert to_update.preview == "x" * 177 + "..."
+        assert not Note.objects.filter(pk=to_delete.pk).exists()
+
+    def test_batch_uses_a_fixed_number_of_queries(self):
+        notes = NoteFactory.create_batch(50, user=self.user_1)
+        # Session, user, then the savepoint, select the notes, bulk insert,
+        # bulk update, select and delete, and release the savepoint
+        with self.assertNumQueries(9):
+            self.send(
+                "post",
+                "/api/notes/batch/",
+                {
+                    "create": [{"title": "new"}] * 100,
+                    "update": [{"id": n.pk, "title": "b"} for n in notes[:25]],
+                    "delete": [note.pk for note in notes[25:]],
+                },
+            )
+
+    def test_batch_updates_notes_that_have_not_changed_since_their_version(
+        self,
+    ):
+        note = NoteFactory(user=self.user_1, title="a")
+        response = self.send(
+            "post",
+            "/api/notes/batch/",
+            {
+                "update": [
+                    {
+                        "id": note.pk,
+                        "version": note_version(note),
+                        "title": "b",
+                    }
+                ]
+            },
+        )
+        assert response.status_code == 200
+        note.refresh_from_db()
+        assert note.title == "b"
+
+    def test_batch_with_a_changed_note_is_a_conflict(self):
+        changed, unchanged = NoteFactory.create_batch(2, user=self.user_1)
+        version = note_version(changed)
+        changed.title = "theirs"
+        changed.save()
+        response = self.send(
+            "post",
+            "/api/notes/batch/",
+            {
+                "update": [
+                    {"id": changed.pk, "version": version, "title": "mine"},
+                    {
+                        "id": unchanged.pk,
+                        "version": note_version(unchanged),
+                        "title": "mine",
+                    },
+                ]
+            },
+        )
+        assert response.status_code == 409
+        data = response.json()
+        assert data["ids"] == [changed.pk]
+        assert data["notes"][0]["title"] == "theirs"
+        assert not Note.objects.filter(title="mine").exists()
+
+    def test_batch_with_another_users_note_changes_nothing(self):
+        mine = NoteFactory(user=self.user_1)
+        theirs = NoteFactory(user=self.user_2)
+        response = self.send(
+            "post",
+            "/api/notes/batch/",
+            {"create": [{"title": "new"}], "delete": [mine.pk, theirs.pk]},
+        )
+        assert response.status_code == 403
+        assert response.json()["ids"] == [theirs.pk]
+        assert Note.objects.count() == 2
+
+    def test_batch_with_a_missing_note_is_not_found(self):
+        response = self.send(
+            "post", "/api/notes/batch/", {"update": [{"id": 1000000}]}
+        )
+        assert response.status_code == 404
+
+    def test_batch_with_an_invalid_operation_changes_nothing(self):
+        response = self.send(
+            "post",
+            "/api/notes/batch/",
+            {"create": [{"title": "ok"}, {"title": ""}]},
+        )
+        assert response.status_code == 400
+        assert response.json()["index"] == 1
+        assert not Note.objects.exists()
+
+    @override_settings(NOTES_API_BATCH_LIMIT=2)
+    def test_batch_size_is_limited(self):
+        response = self.send(
+            "post", "/api/notes/batch/", {"create": [{"title": "a"}] * 3}
+        )
+        assert response.status_code == 400
+
+
+class NoteAutosaveApiTest(ApiTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.note = NoteFactory(
+            user=cls.user_1, title="a", content="hello world"
+        )
+
+    def autosave(self, data, note=None):
+        note = note or self.note
+        return self.send("patch", f"/api/notes/{note.pk}/autosave/", data)
+
+    def version(self):
+        return self.client.get(f"/api/notes/{self.note.pk}/").json()[
+            "modified"
+        ]
+
+    def test_diffs_are_applied_to_the_content(self):
+        version = self.version()
+        response = self.autosave(
+            {"version": version, "diff": [6, "there ", 5]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["version"] != version
+        assert data["preview"] == "hello there world"
+        assert "content" not in data
+        self.note.refresh_from_db()
+        assert self.note.content == "hello there world"
+        assert self.note.modified.isoformat() == data["version"]
+
+    def test_successive_autosaves_use_the_returned_version(self):
+        version = self.autosave(
+            {"version": self.version(), "diff": [5, -6]}
+        ).json()["version"]
+        response = self.autosave({"version": version, "diff": [5, "!"]})
+        assert response.status_code == 200
+        self.note.refresh_from_db()
+        assert self.note.content == "hello!"
+
+    def test_stale_versions_are_rejected_with_the_current_note(self):
+        version = self.version()
+        self.autosave({"version": version, "title": "first"})
+        response = self.autosave({"version": version, "title": "second"})
+        assert response.status_code == 409
+        assert response.json()["note"]["title"] == "first"
+        assert response.json()["note"]["content"] == "hello world"
+        self.note.refresh_from_db()
+        assert self.note.title == "first"
+
+    def test_unchanged_notes_are_not_written(self):
+        version = self.version()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.autosave(
+                {"version": version, "diff": [11], "title": "a"}
+            )
+        assert response.json()["version"] == version
+        assert not [
+            query for query in queries if query["sql"].startswith("UPDATE")
+        ]
+
+    def test_diffs_that_do_not_fit_the_content_are_rejected(self):
+        for diff in ([5], [20], [3, 0, 8], "text", [11, None]):
+            response = self.autosave({"version": self.version(), "diff": diff})
+            assert response.status_code == 400
+
+    def test_changes_are_validated(self):
+        response = self.autosave({"version": self.version(), "title": ""})
+        assert response.status_code == 400
+        assert "title" in response.json()["errors"]
+
+    def test_a_version_is_required(self):
+        assert self.autosave({"diff": [11]}).status_code == 400
+
+    def test_the_list_cache_is_invalidated(self):
+        self.client.get("/")
+        self.autosave({"version": self.version(), "title": "changed"})
+        response = self.client.get("/")
+        assert [note.title for note in response.context["notes"]] == [
+            "changed"
+        ]
+
+    def test_other_users_notes_are_forbidden(self):
+        note = NoteFactory(user=self.user_2)
+        response = self.autosave({"version": None}, note=note)
+        assert response.status_code == 403
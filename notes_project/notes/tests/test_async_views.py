@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path
+from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
+
+# Serve the notes pages with the async views for these tests
+urlpatterns = [
+    path("", include("users.urls")),
+    path("", include("notes.async_urls")),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+        cls.note_1 = NoteFactory(user=cls.user_1, title="mine")
+        cls.note_2 = NoteFactory(user=cls.user_2, title="theirs")
+
+    def setUp(self):
+        cache.clear()
+        self.async_client.force_login(self.user_1)
+
+
+class AsyncNoteListTest(AsyncViewTestCase):
+    async def test_list_shows_the_users_notes(self):
+        response = await self.async_client.get("/")
+        self.assertTemplateUsed(response, "notes/note_list.html")
+        assert response.context["notes"] == [self.note_1]
+
+    async def test_search(self):
+        response = await self.async_client.get("/", {"q": "mine"})
+        assert response.context["notes"] == [self.note_1]
+        response = await self.async_client.get("/", {"q": "theirs"})
+        assert response.context["notes"] == []
+
+    async def test_unchanged_list_returns_not_modified(self):
+        response = await self.async_client.get("/")
+        response = await self.async_client.get(
+            "/", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+    async def test_unauthenticated_user_is_redirected_to_the_login_page(self):
+        response = await AsyncClient().get("/")
+        assert response.status_code == 302
+        assert response.headers["Location"] == "/login/?next=/"
+
+
+class AsyncNoteDetailTest(AsyncViewTestCase):
+    async def test_detail(self):
+        response = await self.async_client.get(f"/{self.note_1.pk}/")
+        self.assertTemplateUsed(response, "notes/note_detail.html")
+        assert response.headers["ETag"]
+
+    async def test_user_cannot_read_a_note_belonging_to_another_user(self):
+        response = await self.async_client.get(f"/{self.note_2.pk}/")
+        assert response.status_code == 403
+
+    async def test_user_cannot_read_a_note_that_does_not_exist(self):
+        response = await self.async_client.get("/1000000/")
+        assert response.status_code == 404
+
+
+class AsyncNoteWriteTest(AsyncViewTestCase):
+    async def test_create(self):
+        response = await self.async_client.post(
+            "/create/", {"title": "a", "content": "b"}
+        )
+        note = await Note.objects.alatest("pk")
+        assert note.user_id == self.user_1.pk
+        assert response.headers["Location"] == f"/{note.pk}/"
+
+    async def test_create_with_invalid_data_reloads_the_form(self):
+        response = await self.async_client.post(
+            "/create/", {"title": "", "content": "b"}
+        )
+        self.assertTemplateUsed(response, "notes/note_form.html")
+
+    async def test_update(self):
+        await self.async_client.post(
+            f"/{self.note_1.pk}/update/", {"title": "a", "content": "b"}
+        )
+        note = await Note.objects.aget(pk=self.note_1.pk)
+        assert note.title == "a" and note.content == "b"
+
+    async def test_user_cannot_update_a_note_belonging_to_another_user(self):
+        response = await self.async_client.post(
+            f"/{self.note_2.pk}/update/", {"title": "a", "content": "b"}
+        )
+        assert response.status_code == 403
+
+    async def test_delete(self):
+        response = await self.async_client.post(f"/{self.note_1.pk}/delete/")
+        assert response.headers["Location"] == "/"
+        assert not await Note.objects.filter(pk=self.note_1.pk).aexists()
+
+    async def test_user_cannot_delete_a_note_belonging_to_another_user(self):
+        response = await self.async_client.post(f"/{self.note_2.pk}/delete/")
+        assert response.status_code == 403
+        assert await Note.objects.filter(pk=self.note_2.pk).aexists()
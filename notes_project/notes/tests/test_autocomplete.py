@@ -0,0 +1,125 @@
+from django.test import TestCase, override_settings
+from notes.autocomplete import TitleIndex, TitleIndexCache, title_indexes
+from notes.factories import NoteFactory
+from notes.models import Note, NoteChangeCounter
+from users.factories import UserFactory
+
+
+class TitleIndexTest(TestCase):
+    def setUp(self):
+        self.index = TitleIndex()
+        self.index.build(
+            [(1, "Shopping list"), (2, "Weekend shop"), (3, "Lists")], seq=1
+        )
+
+    def test_titles_starting_with_the_prefix_come_first(self):
+        assert self.index.search("SHOP", 10) == [
+            (1, "Shopping list"),
+            (2, "Weekend shop"),
+        ]
+        assert self.index.search("list", 10) == [
+            (3, "Lists"),
+            (1, "Shopping list"),
+        ]
+
+    def test_results_are_limited(self):
+        assert self.index.search("s", 1) == [(1, "Shopping list")]
+
+    def test_titles_can_be_changed_and_removed(self):
+        self.index.add(2, "Groceries")
+        self.index.remove(1)
+        assert self.index.search("shop", 10) == []
+        assert self.index.search("gro", 10) == [(2, "Groceries")]
+        assert len(self.index.words) == 0
+
+
+class TitleIndexCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.note = NoteFactory(user=cls.user, title="Shopping list")
+
+    def setUp(self):
+        self.indexes = TitleIndexCache()
+
+    def search(self, prefix):
+        return self.indexes.search(self.user, prefix, 10)
+
+    def test_saves_and_deletes_are_applied_to_the_index(self):
+        assert self.search("shop") == [(self.note.pk, "Shopping list")]
+        new = NoteFactory(user=self.user, title="Shopping for Sunday")
+        Note.objects.filter(pk=self.note.pk).update(title="Groceries")
+        assert self.search("shop") == [(new.pk, "Shopping for Sunday")]
+        new.delete()
+        assert self.search("shop") == []
+        assert self.search("groc") == [(self.note.pk, "Groceries")]
+
+    def test_other_users_notes_are_not_suggested(self):
+        NoteFactory(title="Shopping for someone else")
+        assert self.search("shop") == [(self.note.pk, "Shopping list")]
+
+    def test_unchanged_indexes_only_read_the_change_counter(self):
+        self.search("shop")
+        with self.assertNumQueries(1):  # The counter
+            self.search("list")
+
+    def test_changes_made_after_the_counter_is_read_wait_for_the_next_search(
+        self,
+    ):
+        self.search("shop")
+        new = NoteFactory(user=self.user, title="Shopping for Sunday")
+        NoteFactory(user=self.user, title="Shopping for Monday")
+        new.refresh_from_db()
+        # As if the second note was saved just after the counter was read
+        NoteChangeCounter.objects.filter(user_id=self.user.pk).update(
+            seq=new.change_seq
+        )
+        assert self.search("shop") == [
+            (new.pk, "Shopping for Sunday"),
+            (self.note.pk, "Shopping list"),
+        ]
+
+    @override_settings(NOTES_AUTOCOMPLETE_USERS=1)
+    def test_least_recently_used_indexes_are_evicted(self):
+        other = UserFactory()
+        self.search("shop")
+        self.indexes.search(other, "shop", 10)
+        assert list(self.indexes.indexes) == [other.pk]
+
+
+class NoteAutocompleteApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.note = NoteFactory(user=cls.user, title="Shopping list")
+
+    def setUp(self):
+        title_indexes.clear()
+        self.client.force_login(self.user)
+
+    def test_matching_titles_are_returned(self):
+        data = self.client.get(
+            "/api/notes/autocomplete/", {"q": "shop"}
+        ).json()
+        assert data["results"] == [
+            {
+                "id": self.note.pk,
+                "title": "Shopping list",
+                "url": f"/{self.note.pk}/",
+            }
+        ]
+
+    def test_blank_queries_return_nothing(self):
+        data = self.client.get("/api/notes/autocomplete/", {"q": " "}).json()
+        assert data["results"] == []
+
+    def test_limit_must_be_a_number(self):
+        response = self.client.get(
+            "/api/notes/autocomplete/", {"q": "a", "limit": "x"}
+        )
+        assert response.status_code == 400
+
+    def test_the_search_box_uses_the_suggestions(self):
+        response = self.client.get("/")
+        self.assertContains(response, 'list="note-title-suggestions"')
+        self.assertContains(response, "/api/notes/autocomplete/")
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from notes import benchmarks
+from notes.models import Note
+
+
+class SeedTest(TestCase):
+    def test_notes_are_spread_over_the_users(self):
+        user_ids = benchmarks.seed(notes=10, users=3, batch_size=4)
+        assert User.objects.count() == 3
+        assert Note.objects.count() == 10
+        counts = [
+            Note.objects.filter(user_id=user_id).count()
+            for user_id in user_ids
+        ]
+        assert counts == [4, 3, 3]
+
+    def test_seeding_is_repeatable(self):
+        benchmarks.seed(notes=5, users=1)
+        titles = list(Note.objects.order_by("pk").values_list("title"))
+        Note.objects.all().delete()
+        User.objects.all().delete()
+        benchmarks.seed(notes=5, users=1)
+        assert list(Note.objects.order_by("pk").values_list("title")) == (
+            titles
+        )
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_every_scenario_reports_percentiles_and_queries(self):
+        user_id = benchmarks.seed(notes=60, users=2)[0]
+        benchmark = benchmarks.Benchmark(
+            User.objects.get(pk=user_id), iterations=3, warmup=1
+        )
+        results = benchmark.run()
+        assert list(results) == [
+            "list",
+            "list_next_page",
+            "list_search",
+            "detail",
+            "create",
+            "update",
+            "delete",
+        ]
+        for result in results.values():
+            assert result["iterations"] == 3
+            assert 0 < result["p50_ms"] <= result["p99_ms"]
+            assert result["queries"] > 0
+        # The deleted notes were extras
+        assert Note.objects.count() == 60 + 4
+
+    def test_scenarios_can_be_chosen(self):
+        user_id = benchmarks.seed(notes=2, users=1)[0]
+        benchmark = benchmarks.Benchmark(
+            User.objects.get(pk=user_id), iterations=2, warmup=0
+        )
+        assert list(benchmark.run(["detail"])) == ["detail"]
+
+
+class BaselineTest(TransactionTestCase):
+    # Outside a test transaction, like the benchmark_notes command, so
+    # writes make the same queries
+    def setUp(self):
+        cache.clear()
+
+    def test_query_counts_match_the_baseline(self):
+        baseline = benchmarks.load(
+            settings.BASE_DIR / "benchmarks" / "baseline.json"
+        )
+        user_id = benchmarks.seed(**baseline["dataset"])[0]
+        benchmark = benchmarks.Benchmark(
+            User.objects.get(pk=user_id), iterations=2, warmup=1
+        )
+        results = benchmark.run()
+        assert {
+            name: result["queries"] for name, result in results.items()
+        } == {
+            name: result["queries"]
+            for name, result in baseline["scenarios"].items()
+        }
+
+
+class CompareTest(SimpleTestCase):
+    baseline = {
+        "scenarios": {
+            "list": {"p95_ms": 10.0, "queries": 2},
+            "detail": {"p95_ms": 2.0, "queries": 1},
+        }
+    }
+
+    def results(self, iterations=50, **scenarios):
+        scenarios = {**self.baseline["scenarios"], **scenarios}
+        return {
+            "scenarios": {
+                name: {"iterations": iterations, **result}
+                for name, result in scenarios.items()
+            }
+        }
+
+    def test_results_within_the_threshold_pass(self):
+        results = self.results(list={"p95_ms": 12.0, "queries": 2})
+        assert benchmarks.compare(results, self.baseline, 0.25) == []
+
+    def test_slower_results_are_regressions(self):
+        results = self.results(list={"p95_ms": 13.0, "queries": 2})
+        assert benchmarks.compare(results, self.baseline, 0.25) == [
+            "list: p95 13.0 ms is over 12.5 ms (baseline 10.0 ms)"
+        ]
+
+    def test_small_changes_in_fast_scenarios_are_noise(self):
+        results = self.results(detail={"p95_ms": 2.9, "queries": 1})
+        assert benchmarks.compare(results, self.baseline, 0.25) == []
+
+    def test_latency_of_short_runs_is_not_compared(self):
+        results = self.results(
+            iterations=10,
+            list={"p95_ms": 13.0, "queries": 2},
+            detail={"p95_ms": 2.0, "queries": 2},
+        )
+        assert benchmarks.compare(results, self.baseline, 0.25) == [
+            "detail: 2 queries, baseline 1"
+        ]
+
+    def test_extra_queries_are_regressions(self):
+        results = self.results(detail={"p95_ms": 2.0, "queries": 2})
+        assert benchmarks.compare(results, self.baseline, 0.25) == [
+            "detail: 2 queries, baseline 1"
+        ]
+
+    def test_new_scenarios_are_not_compared(self):
+        results = self.results(create={"p95_ms": 100.0, "queries": 9})
+        assert benchmarks.compare(results, self.baseline, 0.25) == []
@@ -0,0 +1,118 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from notes.cache import note_list_cache
+from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
+
+
+class NoteListCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+
+    def setUp(self):
+        cache.clear()
+        note_list_cache.reset_stats()
+        self.client.force_login(self.user_1)
+
+    def test_repeated_list_requests_are_served_from_the_cache(self):
+        NoteFactory(user=self.user_1)
+        self.client.get("/")
+        with self.assertNumQueries(2):  # Session and user only
+            response = self.client.get("/")
+        assert len(response.context["notes"]) == 1
+        # Each request looks up the page and the list's ETag validators
+        assert note_list_cache.stats() == {"hits": 2, "misses": 2}
+
+    def test_each_search_query_and_page_is_cached_separately(self):
+        self.client.get("/")
+        self.client.get("/?q=one")
+        self.client.get("/?q=one&after=abc")
+        # Three pages, and the validators which all the pages share
+        assert note_list_cache.stats() == {"hits": 2, "misses": 4}
+
+    def test_saving_a_note_invalidates_the_users_cached_pages(self):
+        note = NoteFactory(user=self.user_1, title="old")
+        self.client.get("/")
+        note.title = "new"
+        note.save()
+        response = self.client.get("/")
+        assert response.context["notes"][0].title == "new"
+
+    def test_deleting_a_note_invalidates_the_users_cached_pages(self):
+        note = NoteFactory(user=self.user_1)
+        self.client.get("/")
+        note.delete()
+        response = self.client.get("/")
+        assert list(response.context["notes"]) == []
+
+    def test_views_invalidate_the_users_cached_pages(self):
+        self.client.get("/")
+        version = note_list_cache.get_version(self.user_1.pk)
+        self.client.post("/create/", {"title": "a", "content": "b"})
+        assert note_list_cache.get_version(self.user_1.pk) > version
+
+    def test_queryset_writes_can_be_invalidated_by_bumping_the_version(self):
+        note = NoteFactory(user=self.user_1, title="old")
+        self.client.get("/")
+        Note.objects.filter(pk=note.pk).update(title="new")
+        note_list_cache.bump_version(self.user_1.pk)
+        response = self.client.get("/")
+        assert response.context["notes"][0].title == "new"
+
+    def test_other_users_cached_pages_are_not_invalidated(self):
+        version = note_list_cache.get_version(self.user_2.pk)
+        NoteFactory(user=self.user_1)
+        assert note_list_cache.get_version(self.user_2.pk) == version
+
+    def test_an_evicted_version_does_not_reuse_old_pages(self):
+        self.client.get("/")
+        cache.delete(f"notes:version:{self.user_1.pk}")
+        self.client.get("/")
+        # The page and the validators, twice
+        assert note_list_cache.stats() == {"hits": 0, "misses": 4}
+
+    async def test_async_pages_are_cached_until_the_version_is_bumped(self):
+        user_id = self.user_1.pk
+        values = iter(["first", "second"])
+
+        async def default():
+            return next(values)
+
+        assert await note_list_cache.aget_or_set(user_id, {}, default) == (
+            "first"
+        )
+        assert await note_list_cache.aget_or_set(user_id, {}, default) == (
+            "first"
+        )
+        await note_list_cache.abump_version(user_id)
+        assert await note_list_cache.aget_or_set(user_id, {}, default) == (
+            "second"
+        )
+
+    async def test_bumping_an_evicted_version_starts_a_new_one(self):
+        await cache.adelete(f"notes:version:{self.user_1.pk}")
+        await note_list_cache.abump_version(self.user_1.pk)
+        assert await note_list_cache.aget_version(self.user_1.pk) > 0
+
+
+class FileBasedNoteListCacheTest(NoteListCacheTest):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": (
+                        "django.core.cache.backends.filebased.FileBasedCache"
+                    ),
+                    "LOCATION": directory.name,
+                }
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
@@ -0,0 +1,127 @@
+import json
+import tempfile
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from notes.factories import NoteFactory
+from notes.models import Note
+from pytz import UTC
+from users.factories import UserFactory
+
+
+class ExportImportTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "notes.ndjson"
+
+    def export(self, *args):
+        call_command("export_notes", str(self.path), *args, stderr=StringIO())
+        return [
+            json.loads(line) for line in self.path.read_text().splitlines()
+        ]
+
+    def import_(self, records, *args):
+        self.path.write_text(
+            "".join(json.dumps(record) + "\n" for record in records)
+        )
+        stderr = StringIO()
+        call_command(
+            "import_notes",
+            str(self.path),
+            *args,
+            stdout=StringIO(),
+            stderr=stderr,
+        )
+        return stderr.getvalue()
+
+
+class ExportNotesTest(ExportImportTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1 = UserFactory(username="alice")
+        cls.user_2 = UserFactory(username="bob")
+        cls.note_1 = NoteFactory(
+            user=cls.user_1,
+            title="a",
+            content="b",
+            custom_created=datetime(2024, 1, 1, tzinfo=UTC),
+        )
+        cls.note_2 = NoteFactory(user=cls.user_2)
+
+    def test_each_note_is_written_on_its_own_line(self):
+        records = self.export()
+        assert len(records) == 2
+        assert records[0] == {
+            "user": "alice",
+            "title": "a",
+            "content": "b",
+            "created": "2024-01-01T00:00:00Z",
+            "modified": records[0]["modified"],
+        }
+
+    def test_notes_can_be_filtered_by_user(self):
+        records = self.export("--user", "bob")
+        assert [record["user"] for record in records] == ["bob"]
+
+    def test_notes_are_read_in_chunks(self):
+        records = self.export("--chunk-size", "1")
+        assert len(records) == 2
+
+
+class ImportNotesTest(ExportImportTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory(username="alice")
+
+    def record(self, **kwargs):
+        return {
+            "user": "alice",
+            "title": "a",
+            "content": "b",
+            "created": "2020-05-01T12:00:00Z",
+            "modified": "2021-05-01T12:00:00Z",
+            **kwargs,
+        }
+
+    def test_timestamps_are_kept(self):
+        self.import_([self.record()])
+        note = Note.objects.get()
+        assert note.user == self.user
+        assert note.created == datetime(2020, 5, 1, 12, tzinfo=UTC)
+        assert note.modified == datetime(2021, 5, 1, 12, tzinfo=UTC)
+
+    def test_auto_timestamps_work_again_after_importing(self):
+        self.import_([self.record()])
+        note = NoteFactory()
+        assert note.created.year > 2021
+
+    def test_notes_are_inserted_in_batches_with_progress(self):
+        records = [self.record(title=str(i)) for i in range(5)]
+        with self.assertNumQueries(4):  # One user lookup, three inserts
+            output = self.import_(records, "--batch-size", "2")
+        assert Note.objects.count() == 5
+        assert "Imported 5 notes" in output
+
+    def test_previews_are_set(self):
+        self.import_([self.record(content="c" * 200)])
+        assert Note.objects.get().preview == "c" * 177 + "..."
+
+    def test_unknown_users_are_an_error(self):
+        with self.assertRaisesMessage(CommandError, "user 'carol'"):
+            self.import_([self.record(user="carol")])
+
+    def test_invalid_lines_are_an_error(self):
+        self.path.write_text("not json\n")
+        with self.assertRaisesMessage(CommandError, "Line 1"):
+            call_command("import_notes", str(self.path), stderr=StringIO())
+
+    def test_exported_notes_can_be_imported(self):
+        NoteFactory.create_batch(3, user=self.user)
+        records = self.export()
+        Note.objects.all().delete()
+        self.import_(records)
+        assert self.export() == records
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.views import View
+from notes.factories import NoteFactory
+from notes.views import ConditionalGetMixin
+from users.factories import UserFactory
+
+
+class ConditionalGetMixinTest(SimpleTestCase):
+    def test_views_without_validators_are_always_sent(self):
+        class PageView(ConditionalGetMixin, View):
+            def get(self, request):
+                return HttpResponse("page")
+
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH="*")
+        response = PageView.as_view()(request)
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+
+
+class NoteDetailConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+        cls.note_1 = NoteFactory(user=cls.user_1)
+        cls.note_2 = NoteFactory(user=cls.user_2)
+
+    def setUp(self):
+        self.client.force_login(self.user_1)
+
+    def test_response_includes_validators(self):
+        response = self.client.get(f"/{self.note_1.pk}/")
+        assert response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+        assert "private" in response.headers["Cache-Control"]
+
+    def test_matching_etag_returns_not_modified_without_rendering(self):
+        etag = self.client.get(f"/{self.note_1.pk}/").headers["ETag"]
+        with self.assertNumQueries(3):  # Session, user and note
+            response = self.client.get(
+                f"/{self.note_1.pk}/", HTTP_IF_NONE_MATCH=etag
+            )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        self.assertTemplateNotUsed(response, "notes/note_detail.html")
+
+    def test_unchanged_last_modified_returns_not_modified(self):
+        last_modified = self.client.get(f"/{self.note_1.pk}/").headers[
+            "Last-Modified"
+        ]
+        response = self.client.get(
+            f"/{self.note_1.pk}/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == 304
+
+    def test_editing_the_note_changes_the_etag(self):
+        etag = self.client.get(f"/{self.note_1.pk}/").headers["ETag"]
+        self.note_1.title = "changed"
+        self.note_1.save()
+        response = self.client.get(
+            f"/{self.note_1.pk}/", HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_other_users_notes_are_still_forbidden(self):
+        response = self.client.get(
+            f"/{self.note_2.pk}/", HTTP_IF_NONE_MATCH="*"
+        )
+        assert response.status_code == 403
+
+
+class NoteListConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user_1)
+
+    def test_matching_etag_returns_not_modified_without_querying_notes(self):
+        NoteFactory(user=self.user_1)
+        etag = self.client.get("/").headers["ETag"]
+        with self.assertNumQueries(2):  # Session and user only
+            response = self.client.get("/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        self.assertTemplateNotUsed(response, "notes/note_list.html")
+
+    def test_creating_a_note_changes_the_etag(self):
+        etag = self.client.get("/").headers["ETag"]
+        NoteFactory(user=self.user_1)
+        response = self.client.get("/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+    def test_deleting_a_note_changes_the_etag(self):
+        NoteFactory(user=self.user_1)
+        note = NoteFactory(user=self.user_1)
+        etag = self.client.get("/").headers["ETag"]
+        note.delete()
+        response = self.client.get("/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+    def test_other_users_changes_do_not_change_the_etag(self):
+        etag = self.client.get("/").headers["ETag"]
+        NoteFactory(user=self.user_2)
+        response = self.client.get("/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_unauthenticated_user_is_still_redirected(self):
+        self.client.logout()
+        response = self.client.get("/", HTTP_IF_NONE_MATCH="*")
+        self.assertRedirects(response, "/login/?next=/")
@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+from notes.diffs import DiffError, apply_diff, make_diff
+
+
+class DiffTest(SimpleTestCase):
+    def test_operations_keep_delete_and_insert(self):
+        assert apply_diff("hello world", [5, -6, "!"]) == "hello!"
+        assert apply_diff("", ["new"]) == "new"
+        assert apply_diff("abc", [-3]) == ""
+
+    def test_diffs_must_cover_the_whole_text(self):
+        for diff in ([5], [12], [5, -7], [True, 10]):
+            with self.assertRaises(DiffError):
+                apply_diff("hello world", diff)
+
+    def test_lengths_count_code_points(self):
+        assert apply_diff("🙂 hi", [2, -2, "yo"]) == "🙂 yo"
+
+    def test_made_diffs_only_cover_the_changed_middle(self):
+        assert make_diff("hello world", "hello there world") == [
+            6,
+            "there ",
+            5,
+        ]
+        assert make_diff("aaa", "aa") == [2, -1]
+        assert make_diff("same", "same") == [4]
+        assert make_diff("", "") == []
+
+    def test_made_diffs_apply_to_the_old_text(self):
+        pairs = [("abcab", "abab"), ("aab", "ab"), ("", "x"), ("ab", "ba")]
+        for old, new in pairs:
+            assert apply_diff(old, make_diff(old, new)) == new
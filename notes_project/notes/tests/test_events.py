@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from notes.events import RESYNC, InProcessBroker, get_broker
+from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
+
+
+class InProcessBrokerTest(TestCase):
+    async def test_events_reach_the_users_subscriptions(self):
+        broker = InProcessBroker()
+        mine = broker.subscribe(1)
+        theirs = broker.subscribe(2)
+        # Events can be published from other threads
+        thread = threading.Thread(
+            target=broker.publish, args=(1, {"type": "created"})
+        )
+        thread.start()
+        thread.join()
+        assert await asyncio.wait_for(mine.get(), 1) == {"type": "created"}
+        assert not theirs.events
+
+    async def test_unsubscribed_subscriptions_get_nothing(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+        assert broker.count() == 1
+        broker.unsubscribe(subscription)
+        broker.publish(1, {"type": "created"})
+        await asyncio.sleep(0)
+        assert not subscription.events
+        assert broker.count() == 0
+
+    @override_settings(NOTES_EVENTS_QUEUE_SIZE=2)
+    async def test_subscriptions_that_fall_behind_are_told_to_resync(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+        for i in range(3):
+            broker.publish(1, {"type": "updated", "id": i})
+        await asyncio.sleep(0)
+        assert list(subscription.events) == [RESYNC]
+
+
+class PublishNoteEventTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(get_broker(), "publish")
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def events(self):
+        return [call.args[1] for call in self.publish.call_args_list]
+
+    def test_saves_and_deletes_are_published_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            note = Note.objects.create(user=UserFactory(), title="a")
+            assert not self.publish.called
+        with self.captureOnCommitCallbacks(execute=True):
+            note.title = "b"
+            note.save()
+        pk = note.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            note.delete()
+
+        assert self.publish.call_args.args[0] == note.user_id
+        assert [(event["type"], event["id"]) for event in self.events()] == [
+            ("created", pk),
+            ("updated", pk),
+            ("deleted", pk),
+        ]
+        assert self.events()[1]["title"] == "b"
+
+    def test_api_bulk_writes_are_published(self):
+        user = UserFactory()
+        note = NoteFactory(user=user)
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/notes/batch/",
+                {"create": [{"title": "new"}], "update": [{"id": note.pk}]},
+                content_type="application/json",
+            )
+        assert [event["type"] for event in self.events()] == [
+            "created",
+            "updated",
+        ]
+
+
+class NoteEventsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def setUp(self):
+        self.async_client.force_login(self.user)
+
+    async def read(self, response):
+        return await asyncio.wait_for(anext(response.streaming_content), 1)
+
+    async def test_the_users_note_changes_are_streamed(self):
+        response = await self.async_client.get("/api/notes/events/")
+        assert response.headers["Content-Type"] == "text/event-stream"
+        assert (await self.read(response)).startswith(b"retry:")
+
+        note = await sync_to_async(NoteFactory)(user=self.user, title="a")
+        get_broker().publish(self.user.pk, {"type": "created", "id": note.pk})
+        event, data = (await self.read(response)).decode().splitlines()[:2]
+        assert event == "event: created"
+        assert json.loads(data.removeprefix("data: "))["id"] == note.pk
+
+        get_broker().publish(self.user.pk, RESYNC)
+        assert (await self.read(response)).startswith(b"event: resync")
+        # The stream ends after telling the client to resync
+        with self.assertRaises(StopAsyncIteration):
+            await self.read(response)
+        assert get_broker().count() == 0
+
+    @override_settings(
+        NOTES_EVENTS_HEARTBEAT=0.01, NOTES_EVENTS_IDLE_TIMEOUT=0.05
+    )
+    async def test_idle_streams_get_heartbeats_and_are_closed(self):
+        response = await self.async_client.get("/api/notes/events/")
+        chunks = [chunk async for chunk in response.streaming_content]
+        assert b": heartbeat\n\n" in chunks
+        assert get_broker().count() == 0
+
+    @override_settings(NOTES_EVENTS_HEARTBEAT=0.01, NOTES_EVENTS_MAX_AGE=0.05)
+    async def test_busy_streams_are_closed_after_their_max_age(self):
+        response = await self.async_client.get("/api/notes/events/")
+        chunks = []
+        async for chunk in response.streaming_content:
+            chunks.append(chunk)
+            get_broker().publish(self.user.pk, {"type": "deleted", "id": 1})
+        assert any(chunk.startswith(b"event: deleted") for chunk in chunks)
+        assert get_broker().count() == 0
+
+    @override_settings(NOTES_EVENTS_MAX_CONNECTIONS=0)
+    async def test_open_streams_are_limited(self):
+        response = await self.async_client.get("/api/notes/events/")
+        assert response.status_code == 503
+
+    async def test_unauthenticated_requests_are_rejected(self):
+        response = await AsyncClient().get("/api/notes/events/")
+        assert response.status_code == 401
+
+    def test_wsgi_requests_are_not_streamed(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/notes/events/")
+        assert response.status_code == 501
+        assert get_broker().count() == 0
@@ -0,0 +1,106 @@
+import io
+import os
+import zipfile
+from datetime import datetime
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.utils import timezone
+from notes.archive import CHUNK_SIZE, iter_archive, note_filename
+from notes.factories import NoteFactory
+from notes.models import Note
+from pytz import UTC
+from users.factories import UserFactory
+
+
+def read_archive(data: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        return {
+            name: archive.read(name).decode() for name in archive.namelist()
+        }
+
+
+class ArchiveTest(TestCase):
+    def test_notes_are_markdown_files_named_from_their_title(self):
+        modified = datetime(2024, 1, 2, 3, 4, 6, tzinfo=UTC)
+        data = b"".join(iter_archive([(7, "Hello, world", "Text", modified)]))
+        assert read_archive(data) == {
+            "hello-world-7.md": "# Hello, world\n\nText\n"
+        }
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            date_time = archive.getinfo("hello-world-7.md").date_time
+        assert date_time == timezone.localtime(modified).timetuple()[:6]
+
+    def test_untitled_notes_get_a_default_name(self):
+        assert note_filename(3, "???") == "note-3.md"
+
+    def test_large_archives_are_sent_in_chunks(self):
+        now = timezone.now()
+        rows = (
+            (pk, "title", os.urandom(1024).hex(), now) for pk in range(200)
+        )
+        chunks = list(iter_archive(rows))
+        assert len(chunks) > 1
+        assert max(map(len, chunks[:-1])) < 2 * CHUNK_SIZE
+        assert len(read_archive(b"".join(chunks))) == 200
+
+
+class NoteExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+        cls.old = NoteFactory(user=cls.user_1, title="old", content="a")
+        cls.large = NoteFactory(
+            user=cls.user_1, title="large", content="b" * 10_000
+        )
+        NoteFactory(user=cls.user_2, title="theirs")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user_1)
+        self.async_client.force_login(self.user_1)
+
+    def test_the_users_notes_are_downloaded(self):
+        response = self.client.get("/export/")
+        assert response["Content-Type"] == "application/zip"
+        assert response["Content-Disposition"].startswith("attachment;")
+        files = read_archive(b"".join(response.streaming_content))
+        assert sorted(files) == [
+            f"large-{self.large.pk}.md",
+            f"old-{self.old.pk}.md",
+        ]
+        # Compressed content is decompressed
+        assert files[f"large-{self.large.pk}.md"].endswith("b" * 10_000 + "\n")
+
+    def test_unchanged_notes_are_not_downloaded_again(self):
+        response = self.client.get("/export/")
+        response = self.client.get(
+            "/export/", headers={"If-None-Match": response["ETag"]}
+        )
+        assert response.status_code == 304
+
+    def test_since_only_includes_notes_modified_after_it(self):
+        Note.objects.filter(pk=self.old.pk).update(
+            modified=datetime(2020, 1, 1, tzinfo=UTC)
+        )
+        response = self.client.get(
+            "/export/", {"since": "2021-01-01T00:00:00Z"}
+        )
+        files = read_archive(b"".join(response.streaming_content))
+        assert list(files) == [f"large-{self.large.pk}.md"]
+
+    def test_invalid_since_times_are_rejected(self):
+        response = self.client.get("/export/", {"since": "yesterday"})
+        assert response.status_code == 400
+
+    def test_unauthenticated_user_is_redirected_to_the_login_page(self):
+        response = Client().get("/export/")
+        assert response.status_code == 302
+
+    async def test_archives_are_streamed_from_asgi(self):
+        response = await self.async_client.get("/export/")
+        # Rather than read into a list first
+        assert response.is_async
+        data = b"".join([chunk async for chunk in response.streaming_content])
+        assert len(read_archive(data)) == 2
@@ -0,0 +1,147 @@
+import importlib
+import io
+import json
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import TestCase
+from notes.factories import NoteFactory
+from notes.fields import CompressedText
+from notes.models import Note
+from users.factories import UserFactory
+
+migration = importlib.import_module(
+    "notes.migrations.0007_compress_note_content"
+)
+
+# Repetitive, like a log, and long enough to be compressed
+LOG = "".join(f"INFO request {n} served in 12 ms\n" for n in range(5000))
+
+
+def stored_content(note):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT typeof(content), length(content) FROM notes_note "
+            "WHERE id = %s",
+            [note.pk],
+        )
+        return cursor.fetchone()
+
+
+class CompressedTextFieldTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def test_small_content_is_stored_as_text(self):
+        note = NoteFactory(user=self.user, content="short")
+        assert stored_content(note) == ("text", 5)
+
+    def test_large_content_is_stored_compressed(self):
+        note = NoteFactory(user=self.user, content=LOG)
+        storage, length = stored_content(note)
+        assert storage == "blob"
+        assert length < len(LOG) / 10
+        assert Note.objects.get(pk=note.pk).content == LOG
+
+    def test_content_is_decompressed_when_used(self):
+        pk = NoteFactory(user=self.user, content=LOG).pk
+        note = Note.objects.get(pk=pk)
+        assert isinstance(note.__dict__["content"], CompressedText)
+        assert note.preview_content == LOG[:177] + "..."
+        assert note.__dict__["content"] == LOG
+
+    def test_saving_other_fields_keeps_the_compressed_content(self):
+        pk = NoteFactory(user=self.user, content=LOG).pk
+        note = Note.objects.get(pk=pk)
+        note.title = "changed"
+        note.save()
+        assert isinstance(note.__dict__["content"], CompressedText)
+        assert Note.objects.get(pk=pk).content == LOG
+
+    def test_saving_deferred_content_loads_it(self):
+        pk = NoteFactory(user=self.user, content=LOG).pk
+        note = Note.objects.defer("content").get(pk=pk)
+        note.save(update_fields=["content"])
+        assert Note.objects.get(pk=pk).content == LOG
+
+    def test_queryset_updates_are_compressed(self):
+        note = NoteFactory(user=self.user, content="short")
+        Note.objects.filter(pk=note.pk).update(content=LOG)
+        assert stored_content(note)[0] == "blob"
+        assert Note.objects.get(pk=note.pk).preview == LOG[:177] + "..."
+
+    def test_expression_updates_use_and_store_compressed_content(self):
+        note = NoteFactory(user=self.user, content=LOG)
+        Note.objects.filter(pk=note.pk).update(
+            content=Concat(F("content"), Value("done"))
+        )
+        assert stored_content(note)[0] == "blob"
+        note = Note.objects.get(pk=note.pk)
+        assert note.content == LOG + "done"
+        assert note.preview == LOG[:177] + "..."
+
+    def test_bulk_updates_are_compressed(self):
+        note = NoteFactory(user=self.user, content="short")
+        note.content = LOG
+        Note.objects.bulk_update([note], ["content"])
+        assert stored_content(note)[0] == "blob"
+
+    def test_compressed_content_is_exported_as_text(self):
+        NoteFactory(user=self.user, content=LOG)
+        stdout = io.StringIO()
+        call_command("export_notes", stdout=stdout, stderr=io.StringIO())
+        assert json.loads(stdout.getvalue())["content"] == LOG
+
+
+class CompressedSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def search(self, query):
+        return list(self.client.get(f"/?q={query}").context["notes"])
+
+    def test_compressed_content_is_searchable(self):
+        note = NoteFactory(user=self.user, title="a", content=LOG + "zebra")
+        assert self.search("zebra") == [note]
+
+    def test_changed_compressed_content_is_reindexed(self):
+        note = NoteFactory(user=self.user, title="a", content=LOG + "zebra")
+        self.client.post(
+            f"/{note.pk}/update/", {"title": "a", "content": LOG + "yak"}
+        )
+        assert self.search("zebra") == []
+        assert self.search("yak") == [note]
+        self.client.post(f"/{note.pk}/delete/")
+        assert self.search("yak") == []
+
+
+class CompressContentMigrationTest(TestCase):
+    def test_existing_large_content_is_compressed_and_decompressed(self):
+        note = NoteFactory(content=LOG + "zebra")
+        modified = note.modified
+        schema_editor = SimpleNamespace(connection=connection)
+        migration.decompress_content(apps, schema_editor)
+        assert stored_content(note)[0] == "text"
+
+        migration.compress_content(apps, schema_editor)
+        assert stored_content(note)[0] == "blob"
+        note.refresh_from_db()
+        assert note.content == LOG + "zebra"
+        assert note.modified == modified
+        assert list(
+            Note.objects.raw(
+                "SELECT rowid AS id FROM notes_note_fts "
+                "WHERE notes_note_fts MATCH 'zebra'"
+            )
+        ) == [note]
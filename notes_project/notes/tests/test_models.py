@@ -1,5 +1,9 @@
+from django.db.models import F, Value
+from django.db.models.functions import Concat
 from django.test import TestCase
 from notes.factories import NoteFactory
+from notes.models import Note
+from users.factories import UserFactory
 
 
 class NoteTest(TestCase):
@@ -45,3 +49,52 @@ class NoteTest(TestCase):
 
     def test_get_absolute_url(self):
         assert self.note.get_absolute_url() == f"/{self.note.pk}/"
+
+
+class NotePreviewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def test_preview_is_stored_when_a_note_is_saved(self):
+        note = NoteFactory(content="x" * 200)
+        note.refresh_from_db()
+        assert note.preview == "x" * 177 + "..."
+
+    def test_preview_matches_preview_content(self):
+        note = NoteFactory(content="Less than 180 characters!")
+        assert note.preview == note.preview_content
+
+    def test_preview_is_updated_with_update_fields(self):
+        note = NoteFactory(content="old")
+        note.content = "new"
+        note.save(update_fields=["content"])
+        note.refresh_from_db()
+        assert note.preview == "new"
+
+    def test_preview_is_set_by_bulk_create(self):
+        Note.objects.bulk_create(
+            [Note(user=self.user, title="a", content="y" * 181)]
+        )
+        assert Note.objects.get().preview == "y" * 177 + "..."
+
+    def test_preview_is_set_by_bulk_update(self):
+        note = NoteFactory(content="old")
+        note.content = "new"
+        Note.objects.bulk_update([note], ["content"])
+        note.refresh_from_db()
+        assert note.preview == "new"
+
+    def test_preview_is_set_by_queryset_update(self):
+        note = NoteFactory(content="old")
+        Note.objects.filter(pk=note.pk).update(content="new")
+        note.refresh_from_db()
+        assert note.preview == "new"
+
+    def test_preview_is_set_by_queryset_update_with_an_expression(self):
+        note = NoteFactory(content="z" * 179)
+        Note.objects.filter(pk=note.pk).update(
+            content=Concat(F("content"), Value("zz"))
+        )
+        note.refresh_from_db()
+        assert note.preview == note.preview_content == "z" * 177 + "..."
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from django.db import connection
+from django.test import TestCase
+from notes.factories import NoteFactory
+from notes.models import Note
+from notes.pagination import KeysetPaginator, decode_cursor, encode_cursor
+from pytz import UTC
+from users.factories import UserFactory
+
+
+class CursorTest(TestCase):
+    def test_cursor_round_trips_its_values(self):
+        values = ["2024-01-01T00:00:00+00:00", 12]
+        assert decode_cursor(encode_cursor(values)) == values
+
+    def test_decoding_garbage_returns_none(self):
+        assert decode_cursor("%%%") is None
+        assert decode_cursor("") is None
+        assert decode_cursor(encode_cursor({"a": 1})) is None
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.notes = [
+            NoteFactory(
+                user=cls.user,
+                custom_created=datetime(2024, 1, day, tzinfo=UTC),
+            )
+            for day in range(1, 8)
+        ]
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(
+            Note.objects.filter(user=self.user), per_page=3
+        )
+
+    def test_walking_forward_visits_every_note_once(self):
+        seen = []
+        page = self.paginator.get_page()
+        seen += page.object_list
+        while page.has_next:
+            page = self.paginator.get_page(after=page.next_cursor)
+            seen += page.object_list
+        assert seen == self.notes[::-1]
+
+    def test_first_page_has_no_previous_cursor(self):
+        assert not self.paginator.get_page().has_previous
+
+    def test_cursor_with_the_wrong_shape_is_ignored(self):
+        page = self.paginator.get_page(after=encode_cursor(["x", "y"]))
+        assert page.object_list == self.notes[:-4:-1]
+
+    def test_page_query_seeks_the_user_created_index(self):
+        page = self.paginator.get_page()
+        queryset = self.paginator.queryset.order_by("-created", "-id")
+        queryset = queryset.filter(created__lte=page.object_list[-1].created)
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        assert "note_user_created_id_idx" in plan
@@ -0,0 +1,144 @@
+import importlib
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from notes.factories import NoteFactory
+from notes.models import Note
+from notes.search import build_match_expression, fts5_enabled
+from users.factories import UserFactory
+
+migration = importlib.import_module("notes.migrations.0009_note_fts_owner")
+
+
+class BuildMatchExpressionTest(TestCase):
+    def test_each_word_becomes_a_prefix_search_item(self):
+        assert build_match_expression("diary  shop") == '"diary"* OR "shop"*'
+
+    def test_double_quotes_are_escaped(self):
+        assert build_match_expression('say"hi') == '"say""hi"*'
+
+    def test_items_without_word_characters_are_left_out(self):
+        assert build_match_expression("!! ??") == ""
+
+
+class FullTextSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user_1)
+
+    def search(self, query, **params):
+        return self.client.get("/", {"q": query, **params})
+
+    def test_search_index_is_available_on_sqlite(self):
+        assert fts5_enabled()
+
+    def test_searching_matches_note_content(self):
+        note = NoteFactory(user=self.user_1, title="a", content="groceries")
+        response = self.search("groceries")
+        assert list(response.context["notes"]) == [note]
+
+    def test_searching_matches_word_prefixes(self):
+        note = NoteFactory(user=self.user_1, title="shopping list", content="")
+        response = self.search("shop")
+        assert list(response.context["notes"]) == [note]
+
+    def test_title_matches_rank_above_content_matches(self):
+        in_content = NoteFactory(
+            user=self.user_1, title="a", content="holiday plans"
+        )
+        in_title = NoteFactory(user=self.user_1, title="holiday", content="b")
+        response = self.search("holiday")
+        assert list(response.context["notes"]) == [in_title, in_content]
+
+    def test_search_results_are_scoped_to_the_user(self):
+        NoteFactory(user=self.user_2, title="secret")
+        response = self.search("secret")
+        assert list(response.context["notes"]) == []
+
+    def test_searching_for_the_owner_token_does_not_match_every_note(self):
+        NoteFactory(user=self.user_1, title="a", content="b")
+        response = self.search(f"u{self.user_1.pk}")
+        assert list(response.context["notes"]) == []
+
+    def test_notes_given_to_another_user_move_with_them(self):
+        note = NoteFactory(user=self.user_2, title="secret")
+        Note.objects.filter(pk=note.pk).update(user=self.user_1)
+        assert list(self.search("secret").context["notes"]) == [note]
+
+    def test_the_index_filters_by_user_without_reading_notes(self):
+        NoteFactory(user=self.user_1, title="plans")
+        with CaptureQueriesContext(connection) as queries:
+            self.search("plans")
+        fts_query = next(q["sql"] for q in queries if "MATCH" in q["sql"])
+        assert "user_id" not in fts_query
+        assert f'owner : "u{self.user_1.pk}"' in fts_query
+
+    def test_updated_notes_are_reindexed(self):
+        note = NoteFactory(user=self.user_1, title="before", content="")
+        Note.objects.filter(pk=note.pk).update(title="after")
+        assert list(self.search("before").context["notes"]) == []
+        assert list(self.search("after").context["notes"]) == [note]
+
+    def test_deleted_notes_are_removed_from_the_index(self):
+        note = NoteFactory(user=self.user_1, title="gone")
+        note.delete()
+        assert list(self.search("gone").context["notes"]) == []
+
+    @override_settings(NOTES_PAGE_SIZE=2)
+    def test_search_results_can_be_paged_forwards_and_backwards(self):
+        notes = NoteFactory.create_batch(
+            5, user=self.user_1, title="same", content=""
+        )
+        page_1 = self.search("same").context
+        page_2 = self.search("same", after=page_1["page"].next_cursor).context
+        page_3 = self.search("same", after=page_2["page"].next_cursor).context
+        seen = [*page_1["notes"], *page_2["notes"], *page_3["notes"]]
+        self.assertCountEqual(seen, notes)
+        assert not page_3["page"].has_next
+
+        response = self.search("same", before=page_3["page"].previous_cursor)
+        assert list(response.context["notes"]) == list(page_2["notes"])
+
+    def test_queries_the_index_cannot_handle_fall_back_to_icontains(self):
+        note = NoteFactory(user=self.user_1, title="shopping list!!")
+        response = self.search("!!")
+        assert list(response.context["notes"]) == [note]
+
+    def test_databases_without_the_index_fall_back_to_icontains(self):
+        NoteFactory(user=self.user_1, title="a", content="groceries")
+        with mock.patch("notes.views.fts5_enabled", return_value=False):
+            response = self.search("groceries")
+        # icontains only searches titles
+        assert list(response.context["notes"]) == []
+
+
+class NoteOwnerSearchMigrationTest(TestCase):
+    def test_the_owner_column_can_be_removed_and_added_again(self):
+        note = NoteFactory(title="holiday")
+        with connection.cursor() as cursor:
+            schema_editor = SimpleNamespace(
+                connection=connection, execute=cursor.execute
+            )
+            migration.unindex_owners(apps, schema_editor)
+            cursor.execute(
+                "SELECT rowid FROM notes_note_fts "
+                "WHERE notes_note_fts MATCH 'holiday' AND user_id = %s",
+                [note.user_id],
+            )
+            assert cursor.fetchall() == [(note.pk,)]
+
+            migration.index_owners(apps, schema_editor)
+            cursor.execute(
+                "SELECT rowid FROM notes_note_fts WHERE notes_note_fts MATCH %s",
+                [f'owner : "u{note.user_id}" AND holiday'],
+            )
+            assert cursor.fetchall() == [(note.pk,)]
@@ -0,0 +1,292 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from notes.factories import NoteFactory
+from notes.models import Note, NoteTombstone, UserShard
+from notes.sharding import (
+    SHARD_ID_STRIDE,
+    find_notes,
+    get_shard,
+    hash_shard,
+    move_user_notes,
+    set_shard,
+)
+from users.factories import UserFactory
+
+SHARD = "notes_shard_2"
+
+
+class ShardedTestCase(TestCase):
+    """Add a second shard, in a temporary SQLite file.
+
+    The shard isn't one of the test databases, so it's emptied after each
+    test rather than rolled back.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(
+            NOTES_SHARDS=["default", SHARD]
+        )
+        cls.settings_override.enable()
+        connections.settings[SHARD] = connections.configure_settings(
+            {
+                "default": connections.settings["default"],
+                SHARD: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": str(Path(cls.directory.name) / "shard.sqlite3"),
+                },
+            }
+        )[SHARD]
+        call_command("migrate", database=SHARD, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[SHARD].close()
+        del connections[SHARD]
+        del connections.settings[SHARD]
+        cls.settings_override.disable()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1, cls.user_2 = UserFactory.create_batch(2)
+        set_shard(cls.user_1.pk, "default")
+        set_shard(cls.user_2.pk, SHARD)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(Note.objects.using(SHARD).delete)
+
+
+class ShardRoutingTest(ShardedTestCase):
+    def test_notes_are_saved_to_their_users_shard(self):
+        note_1 = NoteFactory(user=self.user_1)
+        note_2 = NoteFactory(user=self.user_2)
+        assert note_1._state.db == "default"
+        assert note_2._state.db == SHARD
+        assert Note.objects.using(SHARD).get().pk == note_2.pk
+
+    def test_bulk_created_notes_are_split_between_shards(self):
+        Note.objects.bulk_create(
+            [
+                Note(user=self.user_1, title="a"),
+                Note(user=self.user_2, title="b"),
+                Note(user=self.user_2, title="c"),
+            ]
+        )
+        assert Note.objects.for_user(self.user_1).count() == 1
+        assert Note.objects.for_user(self.user_2).count() == 2
+        assert Note.objects.using(SHARD).count() == 2
+
+    def test_shards_use_separate_ranges_of_ids(self):
+        note_1 = NoteFactory(user=self.user_1)
+        note_2 = NoteFactory(user=self.user_2)
+        assert note_1.pk < SHARD_ID_STRIDE < note_2.pk
+
+    def test_users_without_a_shard_are_assigned_one_when_they_write(self):
+        user = UserFactory()
+        assert get_shard(user.pk) == hash_shard(user.pk)
+        assert not UserShard.objects.filter(user=user).exists()
+        note = NoteFactory(user=user)
+        assert note._state.db == hash_shard(user.pk)
+        assert UserShard.objects.get(user=user).shard == hash_shard(user.pk)
+
+    def test_notes_are_found_on_any_shard(self):
+        note_1 = NoteFactory(user=self.user_1)
+        note_2 = NoteFactory(user=self.user_2)
+        notes = find_notes([note_1.pk, note_2.pk, 0], self.user_1.pk)
+        assert notes == {note_1.pk: note_1, note_2.pk: note_2}
+
+    def test_updates_and_deletes_go_to_the_notes_shard(self):
+        note = NoteFactory(user=self.user_2, title="old")
+        note.title = "new"
+        note.save()
+        assert Note.objects.using(SHARD).get().title == "new"
+        note.delete()
+        assert not Note.objects.using(SHARD).exists()
+
+    def test_the_shard_map_is_not_cached_by_default(self):
+        get_shard(self.user_2.pk)
+        with self.assertNumQueries(1):
+            assert get_shard(self.user_2.pk) == SHARD
+
+    @override_settings(NOTES_SHARD_CACHE_ALIAS="default")
+    def test_the_shard_map_can_be_cached(self):
+        get_shard(self.user_2.pk)
+        with self.assertNumQueries(0):
+            assert get_shard(self.user_2.pk) == SHARD
+        set_shard(self.user_2.pk, "default")
+        assert get_shard(self.user_2.pk) == "default"
+
+    def test_deleting_a_user_deletes_their_notes_on_other_shards(self):
+        NoteFactory(user=self.user_2)
+        self.user_2.delete()
+        assert not Note.objects.using(SHARD).exists()
+
+
+class ShardedViewsTest(ShardedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user_2)
+
+    def test_the_list_page_shows_notes_from_the_users_shard(self):
+        note = NoteFactory(user=self.user_2, title="one", content="")
+        NoteFactory(user=self.user_1)
+        response = self.client.get("/")
+        assert list(response.context["notes"]) == [note]
+        response = self.client.get("/?q=one")
+        assert list(response.context["notes"]) == [note]
+
+    def test_notes_on_the_users_shard_can_be_viewed_and_changed(self):
+        note = NoteFactory(user=self.user_2)
+        assert self.client.get(f"/{note.pk}/").status_code == 200
+        self.client.post(
+            f"/{note.pk}/update/", {"title": "new", "content": "b"}
+        )
+        assert Note.objects.using(SHARD).get().title == "new"
+        self.client.post(f"/{note.pk}/delete/")
+        assert not Note.objects.using(SHARD).exists()
+
+    def test_other_users_notes_on_other_shards_are_forbidden(self):
+        note = NoteFactory(user=self.user_1)
+        assert self.client.get(f"/{note.pk}/").status_code == 403
+
+    def test_created_notes_go_to_the_users_shard(self):
+        self.client.post("/create/", {"title": "a", "content": "b"})
+        assert Note.objects.using(SHARD).get().title == "a"
+
+    def test_the_batch_api_writes_to_the_users_shard(self):
+        note = NoteFactory(user=self.user_2)
+        response = self.client.post(
+            "/api/notes/batch/",
+            {"create": [{"title": "a"}], "delete": [note.pk]},
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+        assert list(
+            Note.objects.using(SHARD).values_list("title", flat=True)
+        ) == ["a"]
+
+    def test_autosaves_write_to_the_users_shard(self):
+        note = NoteFactory(user=self.user_2, content="abc")
+        response = self.client.patch(
+            f"/api/notes/{note.pk}/autosave/",
+            {"version": note.modified.isoformat(), "diff": [3, "d"]},
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+        assert Note.objects.using(SHARD).get().content == "abcd"
+
+
+class RebalanceShardsTest(ShardedTestCase):
+    def test_moving_a_user_keeps_their_notes_and_ids(self):
+        notes = NoteFactory.create_batch(3, user=self.user_1, content="")
+        assert move_user_notes(self.user_1.pk, SHARD, batch_size=2) == 3
+        assert get_shard(self.user_1.pk) == SHARD
+        assert not Note.objects.using("default").exists()
+        moved = Note.objects.for_user(self.user_1)
+        assert sorted(note.pk for note in moved) == [note.pk for note in notes]
+        assert [note.created for note in moved.order_by("pk")] == [
+            note.created for note in notes
+        ]
+
+    def test_moved_notes_can_be_searched(self):
+        NoteFactory(user=self.user_1, title="findable", content="")
+        move_user_notes(self.user_1.pk, SHARD)
+        self.client.force_login(self.user_1)
+        response = self.client.get("/?q=findable")
+        assert len(response.context["notes"]) == 1
+
+    def test_clients_sync_from_the_start_after_a_move(self):
+        notes = NoteFactory.create_batch(2, user=self.user_1)
+        self.client.force_login(self.user_1)
+        token = self.client.get("/api/notes/sync/").json()["token"]
+        move_user_notes(self.user_1.pk, SHARD)
+
+        response = self.client.get(f"/api/notes/sync/?since={token}")
+        assert response.status_code == 410
+        data = self.client.get("/api/notes/sync/").json()
+        assert [note["id"] for note in data["notes"]] == [
+            note.pk for note in notes
+        ]
+        assert not NoteTombstone.objects.filter(user_id=self.user_1.pk)
+        deleted_pk = notes[0].pk
+        Note.objects.for_user(self.user_1).filter(pk=deleted_pk).delete()
+        data = self.client.get(f"/api/notes/sync/?since={data['token']}")
+        assert data.json()["deleted"] == [deleted_pk]
+
+    def test_the_command_moves_users_to_a_shard(self):
+        NoteFactory(user=self.user_1)
+        stdout = io.StringIO()
+        call_command(
+            "rebalance_shards", self.user_1.username, to=SHARD, stdout=stdout
+        )
+        assert Note.objects.using(SHARD).count() == 1
+        assert "Moved 1 notes" in stdout.getvalue()
+
+    def test_the_command_moves_users_to_their_hashed_shard(self):
+        user = UserFactory()
+        set_shard(
+            user.pk, "default" if hash_shard(user.pk) == SHARD else SHARD
+        )
+        NoteFactory(user=user)
+        call_command("rebalance_shards", stdout=io.StringIO())
+        assert get_shard(user.pk) == hash_shard(user.pk)
+        assert Note.objects.for_user(user).count() == 1
+
+
+class ShardedAdminTest(ShardedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser("admin")
+        self.client.force_login(self.admin)
+
+    def test_the_admin_list_merges_notes_from_every_shard(self):
+        notes = [
+            NoteFactory(user=self.user_1),
+            NoteFactory(user=self.user_2),
+            NoteFactory(user=self.user_1),
+        ]
+        response = self.client.get("/admin/notes/note/")
+        assert response.context["cl"].result_count == 3
+        assert list(response.context["cl"].result_list) == sorted(
+            notes, key=lambda note: note.pk, reverse=True
+        )
+
+    def test_the_admin_list_can_show_one_shard(self):
+        note = NoteFactory(user=self.user_2)
+        NoteFactory(user=self.user_1)
+        response = self.client.get(f"/admin/notes/note/?shard={SHARD}")
+        assert list(response.context["cl"].result_list) == [note]
+
+    def test_the_admin_list_pages_across_shards(self):
+        for _ in range(3):
+            NoteFactory(user=self.user_1)
+            NoteFactory(user=self.user_2)
+        with mock.patch.object(admin.site._registry[Note], "list_per_page", 4):
+            response = self.client.get("/admin/notes/note/")
+            next_url = response.context["cl"].next_url
+            response = self.client.get(f"/admin/notes/note/{next_url}")
+        assert len(response.context["cl"].result_list) == 2
+
+    def test_notes_on_any_shard_can_be_changed_in_the_admin(self):
+        note = NoteFactory(user=self.user_2)
+        response = self.client.get(f"/admin/notes/note/{note.pk}/change/")
+        assert response.status_code == 200
+        self.client.post(
+            f"/admin/notes/note/{note.pk}/change/",
+            {"user": self.user_2.pk, "title": "new", "content": ""},
+        )
+        assert Note.objects.using(SHARD).get().title == "new"
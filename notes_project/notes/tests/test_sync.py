@@ -0,0 +1,177 @@
+import importlib
+import io
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from notes.factories import NoteFactory
+from notes.models import Note, NoteChangeCounter, NoteTombstone
+from users.factories import UserFactory
+
+migration = importlib.import_module("notes.migrations.0008_note_sync")
+
+
+class SyncApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other_user = UserFactory.create_batch(2)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def sync(self, since=0):
+        response = self.client.get(f"/api/notes/sync/?since={since}")
+        assert response.status_code == 200
+        return response.json()
+
+    def ids(self, data):
+        return [note["id"] for note in data["notes"]]
+
+    def test_the_first_sync_returns_every_note(self):
+        notes = NoteFactory.create_batch(2, user=self.user)
+        NoteFactory(user=self.other_user)
+        data = self.sync()
+        assert self.ids(data) == [note.pk for note in notes]
+        assert data["notes"][0]["content"] == notes[0].content
+        assert data["deleted"] == []
+        assert data["more"] is False
+
+    def test_syncing_with_no_changes_only_reads_the_counter(self):
+        NoteFactory.create_batch(3, user=self.user)
+        token = self.sync()["token"]
+        with self.assertNumQueries(3):  # Session, user and counter
+            data = self.sync(token)
+        assert data == {
+            "notes": [],
+            "deleted": [],
+            "token": token,
+            "more": False,
+        }
+
+    def test_changes_made_after_the_counter_is_read_wait_for_the_next_sync(
+        self,
+    ):
+        first, second = NoteFactory.create_batch(2, user=self.user)
+        first.refresh_from_db()
+        # As if the second note was saved just after the counter was read
+        NoteChangeCounter.objects.filter(user_id=self.user.pk).update(
+            seq=first.change_seq
+        )
+        data = self.sync()
+        assert self.ids(data) == [first.pk]
+        assert data["token"] == first.change_seq
+
+    def test_created_and_changed_notes_are_returned(self):
+        note_1, note_2 = NoteFactory.create_batch(2, user=self.user)
+        token = self.sync()["token"]
+        note_1.title = "changed"
+        note_1.save()
+        note_3 = NoteFactory(user=self.user)
+        data = self.sync(token)
+        assert self.ids(data) == [note_1.pk, note_3.pk]
+        assert data["notes"][0]["title"] == "changed"
+        assert data["token"] > token
+
+    def test_deleted_notes_are_returned_by_id(self):
+        note_1, note_2 = NoteFactory.create_batch(2, user=self.user)
+        token = self.sync()["token"]
+        self.client.post(f"/{note_1.pk}/delete/")
+        Note.objects.filter(pk=note_2.pk).delete()
+        data = self.sync(token)
+        assert data["notes"] == []
+        assert data["deleted"] == [note_1.pk, note_2.pk]
+
+    def test_queryset_and_bulk_writes_are_numbered(self):
+        note_1, note_2 = NoteFactory.create_batch(2, user=self.user)
+        token = self.sync()["token"]
+        Note.objects.filter(pk=note_1.pk).update(title="a")
+        note_2.title = "b"
+        Note.objects.bulk_update([note_2], ["title"])
+        assert self.ids(self.sync(token)) == [note_1.pk, note_2.pk]
+
+    def test_notes_given_to_another_user_are_deleted_for_the_old_one(self):
+        note = NoteFactory(user=self.user)
+        token = self.sync()["token"]
+        note.user = self.other_user
+        note.save()
+        assert self.sync(token)["deleted"] == [note.pk]
+        self.client.force_login(self.other_user)
+        assert self.ids(self.sync()) == [note.pk]
+
+    @override_settings(NOTES_SYNC_PAGE_SIZE=2)
+    def test_changes_are_paged(self):
+        notes = NoteFactory.create_batch(3, user=self.user)
+        token = self.sync(self.sync()["token"])["token"]
+        deleted_pk = notes[0].pk
+        notes[0].delete()
+        notes[1].save()
+        note_4 = NoteFactory(user=self.user)
+
+        data = self.sync(token)
+        assert data["deleted"] == [deleted_pk]
+        assert self.ids(data) == [notes[1].pk]
+        assert data["more"] is True
+        data = self.sync(data["token"])
+        assert self.ids(data) == [note_4.pk]
+        assert data["more"] is False
+
+    def test_tokens_from_the_future_must_resync(self):
+        NoteFactory(user=self.user)
+        response = self.client.get("/api/notes/sync/?since=100")
+        assert response.status_code == 410
+
+    def test_invalid_tokens_are_rejected(self):
+        for since in ("a", "-1"):
+            response = self.client.get(f"/api/notes/sync/?since={since}")
+            assert response.status_code == 400
+
+    def test_tokens_older_than_purged_tombstones_must_resync(self):
+        note_1, note_2 = NoteFactory.create_batch(2, user=self.user)
+        token = self.sync()["token"]
+        note_1.delete()
+        NoteTombstone.objects.update(
+            deleted=timezone.now() - timedelta(days=31)
+        )
+        stdout = io.StringIO()
+        call_command("purge_note_tombstones", stdout=stdout)
+        assert "Deleted 1 tombstones" in stdout.getvalue()
+
+        response = self.client.get(f"/api/notes/sync/?since={token}")
+        assert response.status_code == 410
+        assert self.ids(self.sync()) == [note_2.pk]
+
+    def test_recent_tombstones_are_kept(self):
+        NoteFactory(user=self.user).delete()
+        call_command("purge_note_tombstones", stdout=io.StringIO())
+        assert NoteTombstone.objects.count() == 1
+
+    def test_deleting_a_user_deletes_their_sync_records(self):
+        NoteFactory(user=self.other_user)
+        self.other_user.delete()
+        assert not NoteTombstone.objects.exists()
+        assert not NoteChangeCounter.objects.filter(
+            user_id=self.other_user.pk
+        ).exists()
+
+
+class NumberExistingNotesTest(TestCase):
+    def test_existing_notes_are_numbered_in_id_order(self):
+        user = UserFactory()
+        notes = NoteFactory.create_batch(3, user=user)
+        Note.objects.update(change_seq=0)
+        NoteChangeCounter.objects.all().delete()
+
+        with connection.cursor() as cursor:
+            schema_editor = SimpleNamespace(
+                connection=connection, execute=cursor.execute
+            )
+            migration.number_existing_notes(apps, schema_editor)
+
+        assert list(
+            Note.objects.order_by("pk").values_list("pk", "change_seq")
+        ) == [(note.pk, seq) for seq, note in enumerate(notes, start=1)]
+        assert NoteChangeCounter.objects.get(user_id=user.pk).seq == 3
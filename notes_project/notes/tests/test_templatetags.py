@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from notes.factories import NoteFactory
+from notes.templatetags.notes_tags import note_row_cache_key, note_rows
+from users.factories import UserFactory
+
+
+class NoteRowsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.notes = NoteFactory.create_batch(3, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rendered_rows_are_cached(self):
+        html = note_rows(self.notes)
+        for note in self.notes:
+            assert note.title in cache.get(note_row_cache_key(note))
+        assert html == note_rows(self.notes)
+
+    def test_cached_rows_are_not_rendered_again(self):
+        note_rows(self.notes)
+        with mock.patch(
+            "notes.templatetags.notes_tags.render_to_string"
+        ) as render:
+            note_rows(self.notes)
+        render.assert_not_called()
+
+    def test_a_page_of_rows_is_one_cache_round_trip(self):
+        note_rows(self.notes)
+        with mock.patch.object(
+            cache, "get_many", wraps=cache.get_many
+        ) as get_many:
+            note_rows(self.notes)
+        get_many.assert_called_once()
+
+    def test_rows_keep_the_order_of_the_notes(self):
+        note_rows(self.notes[:1])
+        html = note_rows(self.notes[::-1])
+        positions = [html.index(note.title) for note in self.notes[::-1]]
+        assert positions == sorted(positions)
+
+    def test_editing_a_note_replaces_its_cached_row(self):
+        note = self.notes[0]
+        note_rows([note])
+        note.title = "edited"
+        note.save()
+        assert "edited" in note_rows([note])
+
+
+class NoteListRowsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_list_page_shows_edited_notes(self):
+        note = NoteFactory(user=self.user, title="before")
+        self.client.post(
+            f"/{note.pk}/update/", {"title": "after", "content": "b"}
+        )
+        response = self.client.get("/")
+        self.assertContains(response, "after")
+        self.assertNotContains(response, "before")
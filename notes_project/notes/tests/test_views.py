@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from notes.factories import NoteFactory
 from notes.models import Note
 from notes.views import NoteListView
@@ -14,6 +15,7 @@ class NoteListTest(TestCase):
         cls.user_1, cls.user_2 = UserFactory.create_batch(2)
 
     def setUp(self):
+        cache.clear()
         self.client.force_login(self.user_1)
 
     def test_get_request_renders_the_note_list_template(self):
@@ -65,6 +67,80 @@ class NoteListTest(TestCase):
         notes = response.context["notes"]
         self.assertCountEqual(notes, [note_1, note_2])
 
+    @override_settings(NOTES_PAGE_SIZE=2)
+    def test_notes_are_split_into_pages_using_the_next_cursor(self):
+        note_1, note_2, note_3 = [
+            NoteFactory(
+                user=self.user_1,
+                custom_created=datetime(2024, 1, day, tzinfo=UTC),
+            )
+            for day in (1, 2, 3)
+        ]
+        response = self.client.get("/")
+        page = response.context["page"]
+        assert list(response.context["notes"]) == [note_3, note_2]
+        assert not page.has_previous
+
+        response = self.client.get(f"/?after={page.next_cursor}")
+        page = response.context["page"]
+        assert list(response.context["notes"]) == [note_1]
+        assert not page.has_next
+
+    @override_settings(NOTES_PAGE_SIZE=2)
+    def test_previous_cursor_returns_to_the_previous_page(self):
+        notes = [
+            NoteFactory(
+                user=self.user_1,
+                custom_created=datetime(2024, 1, day, tzinfo=UTC),
+            )
+            for day in (1, 2, 3, 4, 5)
+        ]
+        response = self.client.get("/")
+        response = self.client.get(
+            f"/?after={response.context['page'].next_cursor}"
+        )
+        response = self.client.get(
+            f"/?after={response.context['page'].next_cursor}"
+        )
+        assert list(response.context["notes"]) == [notes[0]]
+
+        response = self.client.get(
+            f"/?before={response.context['page'].previous_cursor}"
+        )
+        assert list(response.context["notes"]) == [notes[2], notes[1]]
+
+    @override_settings(NOTES_PAGE_SIZE=1)
+    def test_notes_created_at_the_same_time_are_paged_by_id(self):
+        created = datetime(2024, 1, 1, tzinfo=UTC)
+        note_1 = NoteFactory(user=self.user_1, custom_created=created)
+        note_2 = NoteFactory(user=self.user_1, custom_created=created)
+
+        response = self.client.get("/")
+        assert list(response.context["notes"]) == [note_2]
+        response = self.client.get(
+            f"/?after={response.context['page'].next_cursor}"
+        )
+        assert list(response.context["notes"]) == [note_1]
+
+    @override_settings(NOTES_PAGE_SIZE=1)
+    def test_the_search_query_is_kept_in_the_pagination_links(self):
+        NoteFactory.create_batch(2, user=self.user_1, title="one")
+        response = self.client.get("/?q=one")
+        self.assertContains(response, "?q=one&after=")
+
+    def test_note_content_is_not_loaded_for_the_list(self):
+        NoteFactory(user=self.user_1, content="a" * 1000)
+        response = self.client.get("/")
+        note = response.context["notes"][0]
+        assert "content" in note.get_deferred_fields()
+        self.assertContains(response, "a" * 177 + "...")
+        self.assertNotContains(response, "a" * 178)
+
+    def test_an_invalid_cursor_returns_the_first_page(self):
+        note = NoteFactory(user=self.user_1)
+        response = self.client.get("/?after=not-a-cursor")
+        assert list(response.context["notes"]) == [note]
+
 
 class GetSearchQObjectTest(TestCase):
     @classmethod
@@ -199,6 +275,14 @@ class NoteDetailTest(TestCase):
         response = self.client.get(f"/{self.note_2.pk}/")
         assert response.status_code == 403
 
+    def test_note_is_only_fetched_once(self):
+        with self.assertNumQueries(3):  # Session, user and note
+            self.client.get(f"/{self.note_1.pk}/")
+
+    def test_ownership_check_for_another_users_note_is_one_query(self):
+        with self.assertNumQueries(3):  # Session, user and note
+            self.client.get(f"/{self.note_2.pk}/")
+
     def test_user_cannot_read_a_note_that_does_not_exist(self):
         response = self.client.get("/1000000/")
         assert response.status_code == 404
@@ -235,6 +319,16 @@ class NoteUpdateTest(TestCase):
         )
         self.assertRedirects(response, f"/{self.note_1.pk}/")
 
+    def test_note_is_only_fetched_once_when_rendering_the_form(self):
+        with self.assertNumQueries(3):  # Session, user and note
+            self.client.get(f"/{self.note_1.pk}/update/")
+
+    def test_note_is_only_fetched_once_when_updating(self):
+        with self.assertNumQueries(4):  # Session, user, note and update
+            self.client.post(
+                f"/{self.note_1.pk}/update/", {"title": "a", "content": "b"}
+            )
+
     def test_user_cannot_update_a_note_belonging_to_another_user(self):  # 403
         response = self.client.post(
             f"/{self.note_2.pk}/update/",
@@ -307,6 +401,14 @@ class NoteDeleteTest(TestCase):
         response = self.client.post(f"/{self.note_1.pk}/delete/")
         self.assertRedirects(response, "/")
 
+    def test_note_is_only_fetched_once_when_confirming_a_delete(self):
+        with self.assertNumQueries(3):  # Session, user and note
+            self.client.get(f"/{self.note_1.pk}/delete/")
+
+    def test_note_is_only_fetched_once_when_deleting(self):
+        with self.assertNumQueries(4):  # Session, user, note and delete
+            self.client.post(f"/{self.note_1.pk}/delete/")
+
     def test_user_cannot_delete_a_note_belonging_to_another_user(self):
         response = self.client.post(f"/{self.note_2.pk}/delete/")
         assert response.status_code == 403
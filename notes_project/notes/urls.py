@@ -1,16 +1,58 @@
+from django.conf import settings
 from django.urls import path
+from notes import async_urls
+from notes.api import (
+    NoteAutocompleteApiView,
+    NoteAutosaveApiView,
+    NoteBatchApiView,
+    NoteDetailApiView,
+    NoteListApiView,
+    NoteSyncApiView,
+)
+from notes.async_views import NoteEventsView
 from notes.views import (
     NoteCreateView,
     NoteDeleteView,
     NoteDetailView,
+    NoteExportView,
     NoteListView,
     NoteUpdateView,
 )
 
-urlpatterns = [
+page_urlpatterns = [
     path("", NoteListView.as_view(), name="notes"),
     path("create/", NoteCreateView.as_view(), name="note-create"),
     path("<int:pk>/", NoteDetailView.as_view(), name="note-detail"),
     path("<int:pk>/update/", NoteUpdateView.as_view(), name="note-update"),
     path("<int:pk>/delete/", NoteDeleteView.as_view(), name="note-delete"),
+    path("export/", NoteExportView.as_view(), name="note-export"),
+]
+
+if settings.NOTES_ASYNC_VIEWS:
+    page_urlpatterns = async_urls.urlpatterns
+
+urlpatterns = page_urlpatterns + [
+    path("api/notes/", NoteListApiView.as_view(), name="api-notes"),
+    path(
+        "api/notes/batch/", NoteBatchApiView.as_view(), name="api-note-batch"
+    ),
+    path("api/notes/sync/", NoteSyncApiView.as_view(), name="api-note-sync"),
+    path(
+        "api/notes/autocomplete/",
+        NoteAutocompleteApiView.as_view(),
+        name="api-note-autocomplete",
+    ),
+    path(
+        "api/notes/events/", NoteEventsView.as_view(), name="api-note-events"
+    ),
+    path(
+        "api/notes/<int:pk>/",
+        NoteDetailApiView.as_view(),
+        name="api-note-detail",
+    ),
+    path(
+        "api/notes/<int:pk>/autosave/",
+        NoteAutosaveApiView.as_view(),
+        name="api-note-autosave",
+    ),
 ]
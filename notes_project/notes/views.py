@@ -1,5 +1,20 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max
+from django.db.models.functions import Coalesce
 from django.db.models.query import Q
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+    quote_etag,
+)
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.views import View
 from django.views.generic import (
     CreateView,
     DeleteView,
@@ -7,39 +22,173 @@ from django.views.generic import (
     ListView,
     UpdateView,
 )
+from notes.archive import aiter_chunks, iter_archive
+from notes.cache import note_list_cache
 from notes.forms import SearchForm
 from notes.models import Note
+from notes.pagination import KeysetPaginator
+from notes.search import (
+    FullTextSearchPaginator,
+    build_match_expression,
+    fts5_enabled,
+)
+from notes.sharding import find_notes
 
 # Generic views use a template at <app>/<model>_<viewtype>.html
 # Create and update views share a template at <app>/<model>_form.html
 
 
+# Aggregates used to validate the list pages, cached with the pages
+NOTE_LIST_SUMMARY = {"latest": Max("modified"), "count": Count("id")}
+NOTE_LIST_SUMMARY_PARAMS = {"validators": True}
+
+
+def note_validators(note: Note):
+    """Return the (etag, last_modified) validators for a note's page."""
+
+    modified = note.modified or note.created
+    etag = quote_etag(
+        f"note-{note.pk}-{int(modified.timestamp() * 1_000_000)}"
+    )
+    return etag, modified
+
+
+def set_validators(response, etag, last_modified):
+    """Add validator and caching headers to a page response."""
+
+    if response.status_code not in (200, 304):
+        return
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(
+            int(last_modified.timestamp())
+        )
+    # Pages are per user, so shared caches must not store them and browsers
+    # should always revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Cookie",))
+
+
+def get_not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the client's copy is current, else None."""
+
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=(
+            int(last_modified.timestamp()) if last_modified else None
+        ),
+    )
+
+
+def note_list_validators(user_id: int, summary: dict):
+    """Return the (etag, last_modified) validators for a user's list pages.
+
+    Every page is validated by the user's newest modified time and their
+    note count, which also changes when a note is deleted.
+    """
+
+    latest = summary["latest"]
+    etag = quote_etag(
+        "notes-{}-{}-{}".format(
+            user_id,
+            summary["count"],
+            int(latest.timestamp() * 1_000_000) if latest else 0,
+        )
+    )
+    return etag, latest
+
+
+def get_note_list_validators(user):
+    """Return the list page validators for a user, using the cached summary
+    of their notes.
+    """
+
+    summary = note_list_cache.get_or_set(
+        user.pk,
+        NOTE_LIST_SUMMARY_PARAMS,
+        lambda: Note.objects.for_user(user).aggregate(**NOTE_LIST_SUMMARY),
+    )
+    return note_list_validators(user.pk, summary)
+
+
 class BelongsToUserMixin(LoginRequiredMixin, UserPassesTestMixin):
-    """Users must be authenticated and own the requested view object."""
+    """Users must be authenticated and own the requested view object.
+
+    The object fetched for the ownership check is kept and reused by the
+    view, so each request only selects it once. Notes are looked up on every
+    shard, starting with the user's, so other users' notes are still 403s.
+    """
+
+    def get_object(self, queryset=None):
+        if not hasattr(self, "_object"):
+            pk = self.kwargs[self.pk_url_kwarg]
+            self._object = find_notes([pk], self.request.user.pk).get(pk)
+            if self._object is None:
+                raise Http404("No note found matching the query")
+        return self._object
 
     def test_func(self):
-        obj = self.get_object()
-        if obj and obj.user:
-            return self.request.user == obj.user
-        return False
+        # Compare ids so the note's user doesn't need to be fetched
+        return self.get_object().user_id == self.request.user.pk
 
 
-class NoteListView(LoginRequiredMixin, ListView):
-    model = Note
-    context_object_name = "notes"
+class ConditionalGetMixin:
+    """Answer GET requests with 304 Not Modified when the client's copy of
+    the page is still current, without running the rest of the view.
 
-    def get(self, request, *args, **kwargs):
-        form = SearchForm(request.GET)
-        search_query = request.GET.get("q", "")
+    Put this after any access mixins so validators are only computed for
+    requests that are allowed to see the page.
+    """
+
+    def get_validators(self):
+        """Return an (etag, last_modified) pair, either of which may be None.
+
+        last_modified is a datetime. Without either, the page is always sent.
+        """
+
+        return None, None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
 
-        filter_q_obj = self.get_search_q_object(search_query) & Q(
-            user=self.request.user
+        etag, last_modified = self.get_validators()
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        set_validators(response, etag, last_modified)
+        return response
+
+
+class InvalidatesNoteListCacheMixin:
+    """Bump the user's note list cache version after a successful write."""
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        note_list_cache.bump_version(self.request.user.pk)
+        return response
+
+
+class NoteSearchMixin:
+    """Build the paginator for a page of the user's notes or search results."""
+
+    def get_paginator(self, search_query: str):
+        """Use the full-text search index when possible, else icontains."""
+
+        queryset = Note.objects.for_user(self.request.user).only(
+            "id", "title", "preview", "created", "modified"
         )
-        self.object_list = Note.objects.filter(filter_q_obj).order_by(
-            "-created"
+        match = build_match_expression(search_query)
+        if match and fts5_enabled(queryset.db):
+            return FullTextSearchPaginator(
+                queryset, match, self.request.user, settings.NOTES_PAGE_SIZE
+            )
+        return KeysetPaginator(
+            queryset.filter(self.get_search_q_object(search_query)),
+            settings.NOTES_PAGE_SIZE,
         )
-        context = {"form": form, "notes": self.object_list}
-        return self.render_to_response(context)
 
     def get_search_q_object(self, search_query: str) -> Q:
         """Build a Q object to filter Notes by their titles.
@@ -47,6 +196,9 @@ class NoteListView(LoginRequiredMixin, ListView):
         Each group of characters separated by spaces is treated as a separate
         search item. i.e. if there are 2 notes, 'Note One' and 'Note Two,
         searching by 'one two' will return both notes.
+
+        This is the fallback for databases without the full-text search index
+        and for queries that the index can't handle, like '!!'.
         """
 
         q_obj = Q()
@@ -59,7 +211,40 @@ class NoteListView(LoginRequiredMixin, ListView):
         return q_obj
 
 
-class NoteCreateView(LoginRequiredMixin, CreateView):
+class NoteListView(
+    LoginRequiredMixin, ConditionalGetMixin, NoteSearchMixin, ListView
+):
+    model = Note
+    context_object_name = "notes"
+    template_name = "notes/note_list.html"
+
+    def get_validators(self):
+        return get_note_list_validators(self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        form = SearchForm(request.GET)
+        search_query = request.GET.get("q", "")
+
+        params = {
+            "q": search_query,
+            "after": request.GET.get("after"),
+            "before": request.GET.get("before"),
+        }
+        page = note_list_cache.get_or_set(
+            request.user.pk,
+            params,
+            lambda: self.get_paginator(search_query).get_page(
+                after=params["after"], before=params["before"]
+            ),
+        )
+        self.object_list = page.object_list
+        context = {"form": form, "notes": self.object_list, "page": page}
+        return self.render_to_response(context)
+
+
+class NoteCreateView(
+    InvalidatesNoteListCacheMixin, LoginRequiredMixin, CreateView
+):
     model = Note
     context_object_name = "note"
     fields = ("title", "content")
@@ -69,17 +254,22 @@ class NoteCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class NoteDetailView(BelongsToUserMixin, DetailView):
+class NoteDetailView(BelongsToUserMixin, ConditionalGetMixin, DetailView):
     model = Note
     context_object_name = "note"
     fields = ("title", "content")
 
+    def get_validators(self):
+        return note_validators(self.get_object())
+
     def form_valid(self, form):
         form.instance.user = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdateView(BelongsToUserMixin, UpdateView):
+class NoteUpdateView(
+    InvalidatesNoteListCacheMixin, BelongsToUserMixin, UpdateView
+):
     model = Note
     context_object_name = "note"
     fields = ("title", "content")
@@ -89,7 +279,53 @@ class NoteUpdateView(BelongsToUserMixin, UpdateView):
         return super().form_valid(form)
 
 
-class NoteDeleteView(BelongsToUserMixin, DeleteView):
+class NoteDeleteView(
+    InvalidatesNoteListCacheMixin, BelongsToUserMixin, DeleteView
+):
     model = Note
     context_object_name = "note"
     success_url = "/"
+
+
+class NoteExportView(LoginRequiredMixin, ConditionalGetMixin, View):
+    """Download the user's notes as a ZIP archive of Markdown files.
+
+    The archive is built while it's sent, from notes read in chunks. It has
+    the same validators as the list page, so it can be downloaded again
+    conditionally, and ?since=<ISO 8601 time> only includes the notes
+    modified after that time.
+    """
+
+    chunk_size = 500
+
+    def get_validators(self):
+        return get_note_list_validators(self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        notes = Note.objects.for_user(request.user)
+        if "since" in request.GET:
+            since = parse_datetime(request.GET["since"])
+            if since is None:
+                return HttpResponseBadRequest("Invalid since time.")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            notes = notes.filter(modified__gt=since)
+
+        rows = (
+            notes.order_by("pk")
+            .values_list(
+                "pk", "title", "content", Coalesce("modified", "created")
+            )
+            .iterator(chunk_size=self.chunk_size)
+        )
+        chunks = iter_archive(rows)
+        if isinstance(request, ASGIRequest):
+            chunks = aiter_chunks(chunks)
+        filename = f"notes-{timezone.localdate():%Y-%m-%d}.zip"
+        return StreamingHttpResponse(
+            chunks,
+            content_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            },
+        )
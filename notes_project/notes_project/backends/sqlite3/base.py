@@ -0,0 +1,43 @@
+"""SQLite database backend tuned for concurrent production use.
+
+Use it by setting ENGINE to "notes_project.backends.sqlite3". Two extra
+OPTIONS are supported on top of the standard sqlite3 backend's:
+
+* "pragmas": a dict of PRAGMAs to set on every new connection, such as
+  {"journal_mode": "WAL", "synchronous": "NORMAL"}.
+* "transaction_mode": "DEFERRED" (the default), "IMMEDIATE" or "EXCLUSIVE".
+  IMMEDIATE takes the write lock when a transaction starts, so a writer
+  waits for the busy timeout instead of failing with "database is locked"
+  when it tries to upgrade a read lock part way through.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        for name in self.pragmas:
+            if not name.isidentifier():
+                raise ImproperlyConfigured(f"Invalid SQLite pragma {name!r}.")
+
+        self.transaction_mode = params.pop("transaction_mode", "DEFERRED")
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                "transaction_mode must be one of "
+                f"{', '.join(TRANSACTION_MODES)}."
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
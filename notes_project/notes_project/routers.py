@@ -0,0 +1,106 @@
+"""Send reads to replica databases and writes to the primary.
+
+Replicas are listed in settings.DATABASE_REPLICAS. Reads go to a random
+replica, except while the current request is pinned to the primary, which
+happens for a while after a user writes (see PrimaryPinningMiddleware) and
+for the rest of any request that writes. That way a user never reads from a
+replica that hasn't caught up with their own changes yet.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or pinned_to_primary.get()
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Reads for the rest of the request should see this write
+        pinned_to_primary.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, so they're never migrated
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class PrimaryPinningMiddleware:
+    """Pin a user's reads to the primary for a while after they write.
+
+    Any request with an unsafe method, like a form POST, sets a cookie that
+    pins the user's requests to the primary for
+    DATABASE_REPLICA_PIN_SECONDS, so the page they're redirected to can't be
+    served from a replica that's behind.
+    """
+
+    cookie_name = "primary_pin"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = pinned_to_primary.set(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            pinned_to_primary.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = pinned_to_primary.set(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            pinned_to_primary.reset(token)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(
+                self.cookie_name,
+                str(int(time.time()) + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def is_pinned(self, request) -> bool:
+        try:
+            until = int(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return False
+        return until > time.time()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -35,6 +36,7 @@ ALLOWED_HOSTS = [".localhost", "127.0.0.1", "[::1]"]
 INSTALLED_APPS = [
     "notes.apps.NotesConfig",
     "users.apps.UsersConfig",
+    "monitoring.apps.MonitoringConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -46,11 +48,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "monitoring.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Before the session middleware, so sessions are read from the primary
+    # just after they change
+    "notes_project.routers.PrimaryPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "monitoring.profiling.RequestProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -86,6 +93,110 @@ DATABASES = {
     }
 }
 
+# Set NOTES_DB_MODE=production to tune SQLite for concurrent readers and
+# writers, and to keep connections open between requests
+NOTES_DB_MODE = os.environ.get("NOTES_DB_MODE", "development")
+
+if NOTES_DB_MODE == "production":
+    DATABASES["default"].update(
+        {
+            "ENGINE": "notes_project.backends.sqlite3",
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Seconds to wait for a lock, which sets busy_timeout
+                "timeout": 20,
+                "transaction_mode": "IMMEDIATE",
+                "pragmas": {
+                    "journal_mode": "WAL",
+                    "synchronous": "NORMAL",
+                    "mmap_size": 256 * 1024 * 1024,
+                    # Negative values are in KiB, so this is 64 MiB
+                    "cache_size": -64 * 1024,
+                    "temp_store": "MEMORY",
+                },
+            },
+        }
+    )
+
+# Set NOTES_DB_REPLICAS to a comma-separated list of database files to send
+# reads to them. They must be kept up to date with the primary, e.g. with
+# "manage.py copy_to_replicas" for local testing
+DATABASE_REPLICAS = []
+
+for number, name in enumerate(
+    filter(None, os.environ.get("NOTES_DB_REPLICAS", "").split(",")), start=1
+):
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": name.strip(),
+        # Tests run against the primary's test database
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Set NOTES_DB_SHARDS to a comma-separated list of database files to spread
+# users' notes across them as well as the default database. Only add shards
+# to the end of the list, and run "manage.py rebalance_shards" afterwards
+NOTES_SHARDS = ["default"]
+
+for number, name in enumerate(
+    filter(None, os.environ.get("NOTES_DB_SHARDS", "").split(",")), start=2
+):
+    alias = f"notes_shard_{number}"
+    DATABASES[alias] = {**DATABASES["default"], "NAME": name.strip()}
+    NOTES_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    "notes.sharding.ShardRouter",
+    "notes_project.routers.ReadReplicaRouter",
+]
+
+# Seconds that a user's reads go to the primary after they write
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Set NOTES_SHARED_CACHE_URL to a Redis URL, e.g. redis://127.0.0.1:6379/0,
+# to keep sessions and users in a cache that every process sees. This needs
+# the redis package
+NOTES_SHARED_CACHE_URL = os.environ.get("NOTES_SHARED_CACHE_URL")
+
+if NOTES_SHARED_CACHE_URL:
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": NOTES_SHARED_CACHE_URL,
+    }
+
+
+# Sessions and authentication
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/
+
+# A process's own cache would keep sessions that have been logged out, and
+# users that have changed, elsewhere, so they're only cached when the cache
+# is shared
+if NOTES_SHARED_CACHE_URL:
+    # Sessions are read from the cache and written through to the database
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+    SESSION_CACHE_ALIAS = "shared"
+    AUTHENTICATION_BACKENDS = ["users.backends.CachedModelBackend"]
+    USERS_CACHE_ALIAS = "shared"
+else:
+    SESSION_ENGINE = "django.contrib.sessions.backends.db"
+    AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"]
+    USERS_CACHE_ALIAS = "default"
+
+USERS_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -136,3 +247,66 @@ LOGOUT_REDIRECT_URL = "login"
 # Django Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# Notes
+NOTES_PAGE_SIZE = 25
+# List pages, their validators and rendered rows. Versions bumped in one
+# process's own cache aren't seen by the others, so with more than one
+# process this must be the shared cache
+NOTES_CACHE_ALIAS = "shared" if NOTES_SHARED_CACHE_URL else "default"
+NOTES_CACHE_TIMEOUT = 300
+# The map of users to shards is only cached when every process shares the
+# cache, so that none of them writes a moved user's notes to the old shard
+NOTES_SHARD_CACHE_ALIAS = "shared" if NOTES_SHARED_CACHE_URL else None
+NOTES_SHARD_CACHE_TIMEOUT = 60 * 60
+NOTES_ROW_CACHE_TIMEOUT = 60 * 60 * 24
+NOTES_API_BATCH_LIMIT = 1000
+# Notes counted on the admin list, which shows "more than" past this
+NOTES_ADMIN_COUNT_LIMIT = 10_000
+# Changes per response from the sync API
+NOTES_SYNC_PAGE_SIZE = 200
+# Days to keep deleted notes' tombstones for clients that sync
+NOTES_SYNC_TOMBSTONE_DAYS = 30
+# Titles suggested by the search box, and the number of users whose title
+# index is kept in memory per process
+NOTES_AUTOCOMPLETE_LIMIT = 10
+NOTES_AUTOCOMPLETE_USERS = 1000
+# Push note changes to open pages. The default broker only reaches
+# connections in the same process
+NOTES_EVENTS_BROKER = "notes.events.InProcessBroker"
+# Open event streams per process
+NOTES_EVENTS_MAX_CONNECTIONS = 5000
+# Events kept for a slow connection before it's told to reload
+NOTES_EVENTS_QUEUE_SIZE = 100
+# Seconds between heartbeats, without events before a stream is closed, and
+# before it's closed anyway. Streams aren't closed when their clients
+# disconnect, so these are kept short
+NOTES_EVENTS_HEARTBEAT = 15
+NOTES_EVENTS_IDLE_TIMEOUT = 60
+NOTES_EVENTS_MAX_AGE = 60 * 5
+# How long browsers wait before reconnecting
+NOTES_EVENTS_RETRY_MS = 5000
+# Serve the notes pages with the async views when running under ASGI
+NOTES_ASYNC_VIEWS = False
+
+# Monitoring
+# Record SQL, template and total time for every request
+MONITORING_ENABLED = True
+# Send the times to browsers in a Server-Timing header
+MONITORING_SERVER_TIMING = True
+# Save queries that take at least this many milliseconds, or None
+MONITORING_SLOW_QUERY_MS = 100
+# Bearer token required by /metrics. Without one, only these addresses can
+# read the metrics. Loopback addresses aren't allowed, as a reverse proxy on
+# the same machine would make every request come from one, so set the token
+# to read the metrics locally
+MONITORING_METRICS_TOKEN = os.environ.get("MONITORING_METRICS_TOKEN", "")
+MONITORING_METRICS_ALLOWED_IPS = []
+# Profile requests from staff with a profiling token: "cprofile",
+# "sampling" or None to turn it off. See monitoring.profiling
+MONITORING_PROFILER = "cprofile"
+MONITORING_PROFILE_DIR = BASE_DIR / "profiles"
+MONITORING_PROFILE_KEEP = 50
+MONITORING_PROFILE_TOKEN_MAX_AGE = 60 * 60
+# Seconds between stack samples, for the sampling profiler
+MONITORING_PROFILE_INTERVAL = 0.001
@@ -0,0 +1,118 @@
+import time
+
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from notes.models import Note
+
+from notes_project.routers import (
+    PrimaryPinningMiddleware,
+    ReadReplicaRouter,
+    pinned_to_primary,
+)
+
+
+class RouterTestCase(SimpleTestCase):
+    def setUp(self):
+        # Writes made while setting up tests would otherwise pin this thread
+        token = pinned_to_primary.set(False)
+        self.addCleanup(pinned_to_primary.reset, token)
+        self.router = ReadReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReadReplicaRouterTest(RouterTestCase):
+    def test_reads_go_to_a_replica(self):
+        assert self.router.db_for_read(Note) == "replica_1"
+
+    def test_writes_go_to_the_primary(self):
+        assert self.router.db_for_write(Note) == "default"
+
+    def test_reads_go_to_the_primary_after_a_write(self):
+        self.router.db_for_write(Note)
+        assert self.router.db_for_read(Note) == "default"
+
+    def test_replicas_are_not_migrated(self):
+        assert self.router.allow_migrate("replica_1", "notes") is False
+        assert self.router.allow_migrate("default", "notes") is None
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_the_primary_without_replicas(self):
+        assert self.router.db_for_read(Note) == "default"
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica_1"], DATABASE_REPLICA_PIN_SECONDS=10
+)
+class PrimaryPinningMiddlewareTest(RouterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.databases_read = []
+        self.middleware = PrimaryPinningMiddleware(self.view)
+
+    def view(self, request):
+        self.databases_read.append(self.router.db_for_read(Note))
+        return HttpResponse()
+
+    def request(self, method="get", pinned_until=None):
+        request = getattr(RequestFactory(), method)("/")
+        if pinned_until is not None:
+            request.COOKIES["primary_pin"] = str(pinned_until)
+        return self.middleware(request)
+
+    def test_writes_set_the_pin_cookie(self):
+        response = self.request("post")
+        cookie = response.cookies["primary_pin"]
+        assert cookie["max-age"] == 10
+        assert int(cookie.value) > time.time()
+
+    def test_reads_do_not_set_the_pin_cookie(self):
+        response = self.request()
+        assert "primary_pin" not in response.cookies
+
+    def test_requests_with_the_pin_cookie_read_from_the_primary(self):
+        self.request(pinned_until=int(time.time()) + 10)
+        assert self.databases_read == ["default"]
+
+    def test_requests_with_an_expired_pin_read_from_replicas(self):
+        self.request(pinned_until=int(time.time()) - 1)
+        self.request(pinned_until="invalid")
+        assert self.databases_read == ["replica_1", "replica_1"]
+
+    def test_the_pin_does_not_outlast_the_request(self):
+        self.request(pinned_until=int(time.time()) + 10)
+        assert self.router.db_for_read(Note) == "replica_1"
+
+    async def test_async_requests_are_pinned_for_the_request(self):
+        async def view(request):
+            return self.view(request)
+
+        middleware = PrimaryPinningMiddleware(view)
+        request = RequestFactory().post("/")
+        request.COOKIES["primary_pin"] = str(int(time.time()) + 10)
+        response = await middleware(request)
+        assert self.databases_read == ["default"]
+        assert "primary_pin" in response.cookies
+        assert self.router.db_for_read(Note) == "replica_1"
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReadReplicaRouterTransactionTest(TestCase):
+    def test_reads_in_a_transaction_go_to_the_primary(self):
+        token = pinned_to_primary.set(False)
+        self.addCleanup(pinned_to_primary.reset, token)
+        with transaction.atomic():
+            assert ReadReplicaRouter().db_for_read(Note) == "default"
+
+
+class CopyToReplicasCommandTest(SimpleTestCase):
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_replicas_must_be_configured(self):
+        with self.assertRaisesMessage(CommandError, "No replicas"):
+            call_command("copy_to_replicas")
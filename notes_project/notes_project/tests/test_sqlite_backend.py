@@ -0,0 +1,150 @@
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+PRODUCTION_OPTIONS = {
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+    "pragmas": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+    },
+}
+
+
+class SQLiteBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "db.sqlite3"
+
+    def connect(self, options=PRODUCTION_OPTIONS):
+        """Return a handler whose connections are local to each thread."""
+
+        handler = ConnectionHandler(
+            {
+                "default": {
+                    "ENGINE": "notes_project.backends.sqlite3",
+                    "NAME": str(self.path),
+                    "OPTIONS": options,
+                }
+            }
+        )
+        self.addCleanup(handler.close_all)
+        return handler
+
+
+class SQLiteBackendTest(SQLiteBackendTestCase):
+    def test_pragmas_are_set_on_new_connections(self):
+        connection = self.connect()["default"]
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            assert cursor.fetchone() == ("wal",)
+            cursor.execute("PRAGMA synchronous")
+            assert cursor.fetchone() == (1,)
+            cursor.execute("PRAGMA busy_timeout")
+            assert cursor.fetchone() == (20000,)
+            cursor.execute("PRAGMA cache_size")
+            assert cursor.fetchone() == (-65536,)
+
+    def test_invalid_pragma_names_are_rejected(self):
+        connection = self.connect({"pragmas": {"x; DROP": 1}})["default"]
+        with self.assertRaises(ImproperlyConfigured):
+            connection.ensure_connection()
+
+    def test_invalid_transaction_modes_are_rejected(self):
+        connection = self.connect({"transaction_mode": "LATER"})["default"]
+        with self.assertRaises(ImproperlyConfigured):
+            connection.ensure_connection()
+
+    def test_transactions_start_in_the_configured_mode(self):
+        connection = self.connect()["default"]
+        statements = []
+
+        def record_sql(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record_sql):
+            connection._start_transaction_under_autocommit()
+            connection.cursor().execute("COMMIT")
+        assert statements[0] == "BEGIN IMMEDIATE"
+
+
+class SQLiteConcurrencyTest(SQLiteBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.handler = self.connect()
+        with self.handler["default"].cursor() as cursor:
+            cursor.execute("CREATE TABLE note (id INTEGER PRIMARY KEY, n INT)")
+
+    def write(self, rows, hold=0.0):
+        connection = self.handler["default"]
+        try:
+            for n in range(rows):
+                connection.set_autocommit(False)
+                connection._start_transaction_under_autocommit()
+                with connection.cursor() as cursor:
+                    cursor.execute("INSERT INTO note (n) VALUES (%s)", [n])
+                time.sleep(hold)
+                connection.commit()
+                connection.set_autocommit(True)
+        finally:
+            connection.close()
+
+    def read(self):
+        connection = self.handler["default"]
+        try:
+            started = time.monotonic()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM note")
+                cursor.fetchone()
+            return time.monotonic() - started
+        finally:
+            connection.close()
+
+    def test_readers_do_not_block_behind_a_writer(self):
+        writing = threading.Event()
+        done = threading.Event()
+
+        def slow_writer():
+            connection = self.handler["default"]
+            with connection.cursor() as cursor:
+                cursor.execute("BEGIN EXCLUSIVE")
+                cursor.execute("INSERT INTO note (n) VALUES (1)")
+                writing.set()
+                done.wait(5)
+                cursor.execute("COMMIT")
+            connection.close()
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        try:
+            writing.wait(5)
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                durations = list(pool.map(lambda _: self.read(), range(8)))
+        finally:
+            done.set()
+            writer.join()
+        # Without WAL, readers would wait for the busy timeout here
+        assert max(durations) < 1
+
+    def test_parallel_writers_and_readers_do_not_fail(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            writes = [pool.submit(self.write, 25) for _ in range(4)]
+            reads = [pool.submit(self.read) for _ in range(50)]
+            for future in writes + reads:
+                future.result()
+
+        connection = self.handler["default"]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM note")
+            assert cursor.fetchone() == (100,)
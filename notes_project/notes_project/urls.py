@@ -21,4 +21,5 @@ urlpatterns = [
     path("", include("users.urls")),
     path("", include("notes.urls")),
     path("admin/", admin.site.urls),
+    path("", include("monitoring.urls")),
 ]
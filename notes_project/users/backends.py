@@ -0,0 +1,41 @@
+"""Load the authenticated user from the cache.
+
+AuthenticationMiddleware loads the user on every request. CachedModelBackend
+keeps users in the cache between requests, so only the first request after
+a user changes needs to select them. Users are removed from the cache when
+they're saved, deleted or log out, or when their groups or permissions
+change (see users.signals). Queryset updates like User.objects.update()
+don't send those signals, so remove the users they change with
+forget_user().
+
+The cache has to be shared by every process, so the backend is only used
+when NOTES_SHARED_CACHE_URL is set.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[settings.USERS_CACHE_ALIAS]
+
+
+def user_cache_key(user_id) -> str:
+    return f"users:user:{user_id}"
+
+
+def forget_user(user_id):
+    get_cache().delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        cache = get_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout=settings.USERS_CACHE_TIMEOUT)
+        return user
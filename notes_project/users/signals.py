@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from users.backends import forget_user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_changed_user(sender, instance, **kwargs):
+    # Saving covers password changes, which must end other sessions
+    forget_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def forget_user_with_changed_permissions(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        user_ids = [instance.pk] if action.startswith("post_") else []
+    elif action == "pre_clear":
+        # Changed from the group or permission side, which is the instance
+        user_ids = instance.user_set.values_list("pk", flat=True)
+    else:
+        user_ids = pk_set if action in ("post_add", "post_remove") else []
+    for user_id in user_ids:
+        forget_user(user_id)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from users.backends import CachedModelBackend, user_cache_key
+from users.factories import UserFactory
+
+
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTHENTICATION_BACKENDS=["users.backends.CachedModelBackend"],
+)
+class CachedModelBackendTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory(custom_password="abcd1234*")
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+
+    def test_users_are_loaded_from_the_cache_after_the_first_time(self):
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+        assert user == self.user
+
+    def test_inactive_users_are_not_cached(self):
+        self.user.is_active = False
+        self.user.save()
+        assert self.backend.get_user(self.user.pk) is None
+        assert cache.get(user_cache_key(self.user.pk)) is None
+
+    def test_saving_a_user_removes_them_from_the_cache(self):
+        self.backend.get_user(self.user.pk)
+        self.user.first_name = "New"
+        self.user.save()
+        assert self.backend.get_user(self.user.pk).first_name == "New"
+
+    def test_changing_a_users_groups_removes_them_from_the_cache(self):
+        group = Group.objects.create(name="editors")
+        self.backend.get_user(self.user.pk)
+        self.user.groups.add(group)
+        assert cache.get(user_cache_key(self.user.pk)) is None
+
+        self.backend.get_user(self.user.pk)
+        group.user_set.clear()
+        assert cache.get(user_cache_key(self.user.pk)) is None
+
+    def test_changing_a_users_password_ends_their_other_sessions(self):
+        self.client.force_login(self.user)
+        assert self.client.get("/").status_code == 200
+        self.user.set_password("efgh5678*")
+        self.user.save()
+        response = self.client.get("/")
+        self.assertRedirects(response, "/login/?next=/")
+
+    def test_logging_out_removes_the_user_from_the_cache(self):
+        self.client.force_login(self.user)
+        self.client.get("/")
+        assert cache.get(user_cache_key(self.user.pk)) is not None
+        self.client.post("/logout/")
+        assert cache.get(user_cache_key(self.user.pk)) is None